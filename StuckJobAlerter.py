@@ -52,8 +52,24 @@ job_params = JobParams(dbutils)
 print(f"Secret scope name: {job_params.secret_scope_name}")
 print(f"Token secret names: {job_params.token_secret_names}")
 print(f"Slack webhook secret name: {job_params.slack_webhook_secret_name}")
+print(f"Alert routes: {job_params.alert_routes or 'None (post all alerts to the Slack webhook)'}")
 print(f"Run Duration Threshold: {job_params.run_duration_threshold_hrs} hours")
+print(f"Task Duration Threshold: {job_params.task_duration_threshold_hrs} hours")
+print(f"Max job runs per workspace: {job_params.max_runs_per_workspace or 'No limit'}")
+print(f"Job run listing windows: {job_params.list_windows}")
+print(f"REST API request budget per workspace: {job_params.request_budget_per_workspace or 'No limit'}")
+print(f"Max REST API concurrency per workspace: {job_params.max_concurrency_per_workspace or 'None (fixed concurrency)'}")
+print(f"Hedge slow REST API calls after: {f'p{job_params.hedge_percentile:g} latency' if job_params.hedge_percentile > 0 else 'Never (hedging disabled)'}")
 print(f"Workspaces to check: {job_params.workspaces_to_check}")
+print(f"Alert ledger path: {job_params.alert_ledger_path or 'None (alert on every stuck run each scan)'}")
+print(f"Node type cache path: {job_params.node_type_cache_path or 'None (list node types once per run)'}")
+print(f"Estimated cost per core hour: {job_params.cost_per_core_hour}")
+print(f"Metadata cache path: {job_params.metadata_cache_path or 'None (look up job and cluster info on every run)'}")
+print(f"Scan checkpoint path: {job_params.scan_checkpoint_path or 'None (interrupted scans start over)'}")
+print(f"Cluster activity window: {f'{job_params.cluster_activity_window_hours} hours' if job_params.cluster_activity_window_hours > 0 else 'None (activity probe disabled)'}")
+print(f"Profile output directory: {job_params.profile_output_dir or 'None (profiling disabled)'}")
+print(f"Cancel job runs after: {f'{job_params.cancel_after_hours} hours' if job_params.cancel_after_hours > 0 else 'Never'}"
+      f"{' (dry run)' if job_params.remediation_dry_run else ''}")
 
 # COMMAND ----------
 
@@ -89,6 +105,14 @@ secrets_helper = SecretsHelper(current_workspace_url, current_workspace_token)
 # COMMAND ----------
 
 from stuck_job_alerter import JobAlerter
+from utils.adaptive_concurrency import AdaptiveConcurrency
+from utils.cluster_activity import ClusterActivityProbe
+from utils.http_transport import HedgedTransport
+from utils.job_run_table import JobRunTable
+from utils.metadata_cache import MetadataCache
+from utils.node_type_catalog import NodeTypeCatalog
+from utils.request_budget import RequestBudget
+from utils.scan_checkpoint import ScanCheckpoint
 
 # COMMAND ----------
 
@@ -111,7 +135,33 @@ try:
     for token_secret in job_params.token_secret_names:
         workspace_tokens.append(secrets_helper.get_secret(scope_name=job_params.secret_scope_name, key=token_secret))
 
-    job_alerter = JobAlerter(logger, workspace_tokens, workspace_urls)
+    # Node types are used to annotate stuck runs with their cluster size and estimated cost
+    node_type_catalog = NodeTypeCatalog(job_params.node_type_cache_path or None,
+                                        cost_per_core_hour=job_params.cost_per_core_hour)
+    # Job settings and cluster specs are reused across runs of this notebook until they are stale
+    metadata_cache = MetadataCache(job_params.metadata_cache_path or None)
+    # Recent cluster events tell runs on idle (or thrashing) clusters apart from busy long runs
+    cluster_activity_probe = None
+    if job_params.cluster_activity_window_hours > 0:
+        cluster_activity_probe = ClusterActivityProbe(window_hours=job_params.cluster_activity_window_hours)
+    # REST API calls are counted per workspace (and capped, if a budget is set) to leave room for production workloads
+    request_budget = RequestBudget(job_params.request_budget_per_workspace)
+    # Duplicate idempotent GETs that take longer than usual, so that slow calls do not set the scan time
+    hedged_transport = None
+    if job_params.hedge_percentile > 0:
+        hedged_transport = HedgedTransport(percentile=job_params.hedge_percentile)
+    # Concurrency of REST API calls adapts to what each workspace tolerates (backing off on throttling)
+    adaptive_concurrency = None
+    if job_params.max_concurrency_per_workspace > 0:
+        adaptive_concurrency = AdaptiveConcurrency(initial_limit=min(8, job_params.max_concurrency_per_workspace),
+                                                   max_limit=job_params.max_concurrency_per_workspace)
+    # Scan progress is checkpointed, so that a scan interrupted by the task timeout resumes where it stopped
+    scan_checkpoint = ScanCheckpoint(job_params.scan_checkpoint_path) if job_params.scan_checkpoint_path else None
+    job_alerter = JobAlerter(logger, workspace_tokens, workspace_urls, node_type_catalog=node_type_catalog,
+                             metadata_cache=metadata_cache, cluster_activity_probe=cluster_activity_probe,
+                             list_windows=job_params.list_windows, request_budget=request_budget,
+                             transport=hedged_transport, adaptive_concurrency=adaptive_concurrency,
+                             scan_checkpoint=scan_checkpoint)
 except ValueError as ve:
     logger.error("Failed to instantiate JobAlerter class: " + repr(ve))
 except TypeError as te:
@@ -124,16 +174,42 @@ except TypeError as te:
 
 # COMMAND ----------
 
+# Optionally profile the scan and Slack rendering (stopped after rendering below)
+scan_profiler = None
+if job_params.profile_output_dir:
+    from utils.scan_profiler import SamplingProfiler
+    scan_profiler = SamplingProfiler()
+    scan_profiler.start()
+
 # Get info for multiple job runs
 job_runs_lists = job_alerter.get_job_runs(
     active_runs_only=True, older_than_hours=job_params.run_duration_threshold_hrs,
-    limit=1000, simplified_output=True, include_streaming_jobs=False)
+    limit=1000, simplified_output=True, include_streaming_jobs=False,
+    task_older_than_hours=job_params.task_duration_threshold_hrs, top_k=job_params.max_runs_per_workspace,
+    lazy_enrichment=True)
 
+if scan_checkpoint is not None and scan_checkpoint.resumed:
+    print(f"Resumed the interrupted scan from its checkpoint ({scan_checkpoint.path}).")
 print(f"Job runs older than {job_params.run_duration_threshold_hrs:.2f} hours:")
 pretty_print_json(job_runs_lists)
 
 print("\nNumber of job runs: ")
 pretty_print_json(get_counts_in_dict_list(job_runs_lists))
+if job_params.max_runs_per_workspace > 0:
+    print("\nNumber of job runs found before keeping the longest running ones: ")
+    pretty_print_json(job_alerter.qualifying_run_counts)
+
+print("\nREST API calls per workspace (consumed versus budget): ")
+pretty_print_json(request_budget.report())
+if hedged_transport is not None:
+    print("\nHedged REST API calls per workspace: ")
+    pretty_print_json(hedged_transport.stats())
+if adaptive_concurrency is not None:
+    print("\nREST API concurrency limit per workspace: ")
+    pretty_print_json(adaptive_concurrency.metrics())
+
+print(f"\nMetadata cache: {metadata_cache.hits} hits, {metadata_cache.misses} misses")
+metadata_cache.save()
 
 
 # COMMAND ----------
@@ -147,6 +223,24 @@ pretty_print_json(durations_dict)
 
 # COMMAND ----------
 
+# Stuck job runs with the highest estimated cost so far (requires cost_per_core_hour)
+if job_params.cost_per_core_hour > 0:
+    print("Stuck job runs by estimated cost so far:")
+    for run in JobRunTable.from_job_runs_lists(job_runs_lists).top_k_by("estimated_cost_so_far", 10):
+        if "estimated_cost_so_far" in run:
+            print(f"{run['estimated_cost_so_far']:.2f} ({run['estimated_cost_per_hour']:.2f}/hour): {run['run_page_url']}")
+
+# COMMAND ----------
+
+# Optionally record this scan's stuck job runs in the scan history store
+if job_params.scan_history_path:
+    from utils.scan_history import ScanHistoryStore
+    scan_history = ScanHistoryStore(job_params.scan_history_path, retention_days=90)
+    print(f"Recorded {scan_history.append_scan(job_runs_lists)} job runs in the scan history ({len(scan_history)} total).")
+    scan_history.close()
+
+# COMMAND ----------
+
 # MAGIC %md
 # MAGIC # Slackbot Integration
 # MAGIC
@@ -168,6 +262,15 @@ from slackbot.slackbot import Slackbot
 webhook = secrets_helper.get_secret(scope_name=job_params.secret_scope_name, key=job_params.slack_webhook_secret_name)
 slackbot = Slackbot(webhook)
 
+# Optionally route alerts to per-team webhooks (runs matching no route still go to the webhook above)
+alert_router = None
+if job_params.alert_routes:
+    from slackbot.alert_router import AlertRouter, RoutingRule
+    route_webhooks = {secret_name: secrets_helper.get_secret(scope_name=job_params.secret_scope_name, key=secret_name)
+                      for _, _, secret_name in job_params.alert_routes}
+    alert_router = AlertRouter([RoutingRule(kind, value, route_webhooks[secret_name])
+                                for kind, value, secret_name in job_params.alert_routes], default_webhook=webhook)
+
 # COMMAND ----------
 
 # MAGIC %md
@@ -175,10 +278,61 @@ slackbot = Slackbot(webhook)
 
 # COMMAND ----------
 
-workspace_payloads = slackbot.construct_workspace_payloads(job_runs_lists, job_params.run_duration_threshold_hrs)
-pretty_print_json(workspace_payloads)
+if job_params.alert_ledger_path:
+    # Only notify on new, escalated, updated and resolved runs (plus a periodic digest of ongoing ones)
+    from slackbot.alert_ledger import AlertLedger
+    threshold = job_params.run_duration_threshold_hrs
+    # Tiers at 1x, 2x, 4x and 8x the threshold, or from 1 hour if the threshold is 0 (which would put every run
+    # in the top tier from the first scan)
+    tier_base_hrs = threshold if threshold > 0 else 1.0
+    alert_ledger = AlertLedger(job_params.alert_ledger_path,
+                               severity_tiers_hrs=[tier_base_hrs, 2 * tier_base_hrs, 4 * tier_base_hrs, 8 * tier_base_hrs])
+    alert_diffs = alert_ledger.update(job_runs_lists, incomplete_workspaces=job_alerter.incomplete_workspaces)
+    routed_alerts = alert_router.route_alert_diffs(alert_diffs) if alert_router else {webhook: alert_diffs}
+    routed_payloads = {route_webhook: slackbot.construct_alert_payloads(webhook_diffs, threshold)
+                       for route_webhook, webhook_diffs in routed_alerts.items()}
+else:
+    # The number of runs not shown is only known per workspace, so it is left out of routed alerts
+    total_counts = job_alerter.qualifying_run_counts if job_params.max_runs_per_workspace > 0 and not alert_router else None
+    routed_runs = alert_router.route(job_runs_lists) if alert_router else {webhook: job_runs_lists}
+    routed_payloads = {route_webhook: slackbot.construct_workspace_payloads(webhook_runs_lists, job_params.run_duration_threshold_hrs,
+                                                                            total_counts=total_counts)
+                       for route_webhook, webhook_runs_lists in routed_runs.items()}
+for workspace_payloads in routed_payloads.values(): # Webhook URLs are secrets, so they are not printed
+    pretty_print_json(workspace_payloads)
+
+if scan_profiler is not None:
+    scan_profiler.stop()
+    profile_paths = scan_profiler.write(job_params.profile_output_dir, name="stuck_job_alerter")
+    print(f"\n{scan_profiler.summary()}\nWrote profile to: {', '.join(profile_paths)}")
+
+# COMMAND ----------
+
+# Post messages for all workspaces, to each destination webhook in parallel
+responses = slackbot.post_routed_payloads(routed_payloads)
+
+# Only record alert state once the messages have been sent
+if job_params.alert_ledger_path:
+    alert_ledger.save()
+
+# The scan's results have been used, so the next run of the notebook scans from scratch
+if scan_checkpoint is not None:
+    scan_checkpoint.finish()
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC # Remediation
+# MAGIC
+# MAGIC Optionally cancel stuck job runs that exceed a hard ceiling (`cancel_after_hours`). See `remediation.py`.
 
 # COMMAND ----------
 
-# Post messages for all workspaces
-responses = slackbot.post_workspace_payloads(workspace_payloads)
+if job_params.cancel_after_hours > 0:
+    from remediation import RemediationPolicy, Remediator
+    remediator = Remediator(job_alerter, [RemediationPolicy("cancel_after_hours", job_params.cancel_after_hours)],
+                            audit_log_path=job_params.remediation_audit_log_path or None,
+                            dry_run=job_params.remediation_dry_run)
+    for action in remediator.run(job_runs_lists):
+        print(f"{action.status}: {action.run_name} ({action.time_from_start_hours:.2f} hours) in {action.workspace_url}"
+              f"{f' - {action.error}' if action.error else ''}")
@@ -152,4 +152,35 @@ print(f"\nJob runs older than {run_duration_threshold_hrs:.2f} hours:")
 pretty_print_json(job_runs_lists)
 
 print("\nNumber of job runs: ")
-pretty_print_json(get_counts_in_dict_list(job_runs_lists))
\ No newline at end of file
+pretty_print_json(get_counts_in_dict_list(job_runs_lists))
+
+# COMMAND ----------
+
+# Same job runs as a columnar table, e.g. for the longest running runs or counts per creator
+job_runs_table = job_alerter.get_job_runs(
+    active_runs_only=True, older_than_hours=run_duration_threshold_hrs,
+    limit=1000, simplified_output=True, include_streaming_jobs=False, as_table=True)
+
+print("Longest running job runs:")
+for run in job_runs_table.top_k_by_duration(5):
+    print(f"{run['time_from_start_hours']:.2f} hours: {run['run_page_url']}")
+
+print("\nNumber of job runs per creator: ")
+pretty_print_json(job_runs_table.group_counts("creator_user_name"))
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC ### Pipelined Scan and Alert
+# MAGIC Posts each workspace's alerts as soon as that workspace has been scanned (see `alert_pipeline.py`).
+
+# COMMAND ----------
+
+from alert_pipeline import AlertPipeline
+from slackbot.slackbot import Slackbot
+
+slackbot = Slackbot("https://hooks.slack.com/services/ABCDEFG/1234567/xyz123foobar") # Use Databricks Secrets in practice
+pipeline = AlertPipeline(job_alerter, slackbot, run_duration_threshold_hrs, scan_workers=2)
+result = pipeline.run(post=False, active_runs_only=True, older_than_hours=run_duration_threshold_hrs,
+                      limit=1000, simplified_output=True, include_streaming_jobs=False)
+print(f"Time to first alert: {result.first_alert_s:.2f} s, total time: {result.total_s:.2f} s")
+pretty_print_json(get_counts_in_dict_list(result.job_runs_lists))
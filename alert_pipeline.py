@@ -0,0 +1,172 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from utils.scan_profiler import SamplingProfiler
+
+_END = object() # Sentinel marking the end of a stage's output
+
+@dataclass
+class PipelineResult:
+    """Outputs and timings of a single AlertPipeline run."""
+    job_runs_lists: dict[str, list[dict]] = field(default_factory=dict)
+    workspace_payloads: dict[str, list[dict]] = field(default_factory=dict)
+    workspace_responses: dict[str, list] = field(default_factory=dict)
+    first_alert_s: float | None = None # Time from start until the first workspace's alerts were posted
+    total_s: float = 0.0
+    profile_paths: tuple[str, str] | None = None # Collapsed stacks and summary files, if profiled
+
+class AlertPipeline:
+    """
+    Runs the scan -> render -> post flow of the StuckJobAlerter notebook as a pipeline, so that each
+    workspace's alerts are posted as soon as that workspace has been scanned, instead of after all of them.
+
+    Stages are connected by bounded queues: when posting to Slack is slower than scanning, scanners block
+    (backpressure) rather than piling up rendered payloads in memory. Total wall time approaches
+    max(scan time, post time) instead of their sum.
+
+    With a scan checkpoint (the one given to the JobAlerter), each workspace's scan and post are committed as
+    they complete, so a run resumed after a failure neither rescans nor reposts the workspaces that were done.
+    """
+
+    def __init__(self, job_alerter, slackbot, run_duration_threshold_hrs: float, alert_ledger=None,
+                 scan_workers: int = 1, queue_size: int = 2, scan_checkpoint=None) -> None:
+        """
+        Args:
+            job_alerter: JobAlerter instance used to scan each of its workspaces.
+            slackbot: Slackbot instance used to render and post alerts.
+            run_duration_threshold_hrs: Threshold shown in the alert message headers.
+            alert_ledger: Optional AlertLedger. If given, only alert-worthy changes are posted (see AlertLedger).
+                          The ledger is updated in memory; the caller is responsible for saving it.
+            scan_workers: Number of workspaces to scan concurrently.
+            queue_size: Maximum number of workspaces waiting between two stages.
+            scan_checkpoint: Optional ScanCheckpoint (see utils/scan_checkpoint.py) that the job alerter scans with.
+                             Workspaces are committed as "posted" once their alerts have been posted, and skipped
+                             when posting resumed runs. The caller is responsible for calling its finish().
+        """
+        if scan_workers < 1 or queue_size < 1:
+            raise ValueError("AlertPipeline: scan_workers and queue_size must be >= 1.")
+        self.job_alerter = job_alerter
+        self.slackbot = slackbot
+        self.run_duration_threshold_hrs = run_duration_threshold_hrs
+        self.alert_ledger = alert_ledger
+        self.scan_workers = scan_workers
+        self.queue_size = queue_size
+        self.scan_checkpoint = scan_checkpoint
+
+    def run(self, post: bool = True, profile: bool = False, profile_dir: str = "profiles",
+            **scan_kwargs) -> PipelineResult:
+        """
+        Scan all workspaces, rendering and (optionally) posting each workspace's alerts as soon as it is scanned.
+
+        Args:
+            post: If False, render payloads without posting them (e.g. for a dry run).
+            profile: If True, run under a SamplingProfiler (see utils/scan_profiler.py) and write its collapsed
+                     stacks and top functions summary to profile_dir (paths are in the result's profile_paths).
+            profile_dir: Directory for the profile output files.
+            scan_kwargs: Keyword arguments for JobAlerter.get_workspace_job_runs(), e.g. older_than_hours.
+        """
+        if profile:
+            with SamplingProfiler() as profiler:
+                result = self.run(post=post, **scan_kwargs)
+            result.profile_paths = profiler.write(profile_dir, name="pipeline")
+            return result
+
+        result = PipelineResult()
+        render_queue = queue.Queue(maxsize=self.queue_size)
+        post_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+        start = time.perf_counter()
+
+        def put(q: queue.Queue, item) -> None:
+            """Put with backpressure, giving up if another stage has failed."""
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def get(q: queue.Queue):
+            """Get the next item, or the end sentinel if another stage has failed."""
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            return _END
+
+        def fail(e: Exception) -> None:
+            errors.append(e)
+            stop.set()
+
+        def scan_workspace(url: str) -> None:
+            try:
+                job_runs_list = self.job_alerter.get_workspace_job_runs(url, **scan_kwargs)
+                put(render_queue, (url, job_runs_list))
+            except Exception as e:
+                fail(e)
+
+        def scan() -> None:
+            with ThreadPoolExecutor(max_workers=self.scan_workers) as executor:
+                for url in self.job_alerter.workspace_urls:
+                    executor.submit(scan_workspace, url)
+            put(render_queue, _END)
+
+        def render() -> None:
+            try:
+                while (item := get(render_queue)) is not _END:
+                    url, job_runs_list = item
+                    result.job_runs_lists[url] = job_runs_list
+                    job_runs_lists = {url: job_runs_list}
+                    if self.alert_ledger is not None:
+                        alert_diffs = self.alert_ledger.update(
+                            job_runs_lists, incomplete_workspaces=self.job_alerter.incomplete_workspaces)
+                        payloads = self.slackbot.construct_alert_payloads(alert_diffs, self.run_duration_threshold_hrs)
+                    else:
+                        payloads = self.slackbot.construct_workspace_payloads(job_runs_lists, self.run_duration_threshold_hrs)
+                    if url in payloads:
+                        result.workspace_payloads[url] = payloads[url]
+                        put(post_queue, (url, payloads[url]))
+            except Exception as e:
+                fail(e)
+            put(post_queue, _END)
+
+        def post_alerts() -> None:
+            try:
+                while (item := get(post_queue)) is not _END:
+                    url, payloads = item
+                    if post:
+                        if self.__is_posted(url):
+                            continue
+                        result.workspace_responses[url] = self.slackbot.post_payloads(payloads)
+                        if self.scan_checkpoint is not None:
+                            self.scan_checkpoint.commit_stage(url, "posted")
+                    if result.first_alert_s is None:
+                        result.first_alert_s = time.perf_counter() - start
+            except Exception as e:
+                fail(e)
+
+        threads = [threading.Thread(target=target, name=f"AlertPipeline-{target.__name__}", daemon=True)
+                   for target in [scan, render, post_alerts]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        result.total_s = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+        # Keep workspace order consistent with JobAlerter.get_job_runs()
+        order = {url: i for i, url in enumerate(self.job_alerter.workspace_urls)}
+        result.job_runs_lists = dict(sorted(result.job_runs_lists.items(), key=lambda item: order[item[0]]))
+        return result
+
+    def __is_posted(self, workspace_url: str) -> bool:
+        """Whether the workspace's alerts were already posted by an earlier (interrupted) run of the checkpointed scan."""
+        if self.scan_checkpoint is None:
+            return False
+        state = self.scan_checkpoint.workspace(workspace_url)
+        return state is not None and "posted" in state["stages"]
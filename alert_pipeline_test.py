@@ -0,0 +1,82 @@
+import threading
+import time
+import pytest
+from alert_pipeline import AlertPipeline
+
+class FakeJobAlerter:
+    def __init__(self, scan_delays_s: dict[str, float], events: list | None = None,
+                 wait_for: dict[str, threading.Event] | None = None):
+        self.scan_delays_s = scan_delays_s
+        self.workspace_urls = list(scan_delays_s)
+        self.incomplete_workspaces = set()
+        self.events = [] if events is None else events
+        self.wait_for = wait_for or {} # Workspace URL -> event its scan waits for before finishing
+
+    def get_workspace_job_runs(self, workspace_url, **kwargs):
+        time.sleep(max(self.scan_delays_s[workspace_url], 0))
+        if self.scan_delays_s[workspace_url] < 0:
+            raise RuntimeError("scan failed")
+        if workspace_url in self.wait_for and not self.wait_for[workspace_url].wait(timeout=10):
+            raise RuntimeError("scan waited for an event that did not happen")
+        self.events.append(("scanned", workspace_url))
+        return [{"run_id": 1, "time_from_start_hours": 3.0}]
+
+class FakeSlackbot:
+    def __init__(self, post_delay_s: float, events: list | None = None):
+        self.post_delay_s = post_delay_s
+        self.posted = []
+        self.events = [] if events is None else events
+        self.first_post = threading.Event()
+
+    def construct_workspace_payloads(self, job_runs_lists, run_duration_threshold_hrs):
+        return {url: [{"blocks": []}, {"blocks": runs}] for url, runs in job_runs_lists.items()}
+
+    def post_payloads(self, payloads):
+        time.sleep(self.post_delay_s)
+        self.posted.append(payloads)
+        self.events.append(("posted", len(self.posted)))
+        self.first_post.set()
+        return [200 for _ in payloads]
+
+def test_pipeline_overlaps_scan_and_post():
+    # The last workspace's scan only finishes once the first alert is posted, so the run would fail (instead of
+    # being slow) if posting waited for the whole scan
+    events = []
+    slackbot = FakeSlackbot(post_delay_s=0.0, events=events)
+    job_alerter = FakeJobAlerter({"https://a": 0.0, "https://b": 0.0, "https://c": 0.0}, events=events,
+                                 wait_for={"https://c": slackbot.first_post})
+    result = AlertPipeline(job_alerter, slackbot, 2.0).run(older_than_hours=2.0)
+
+    assert list(result.job_runs_lists) == ["https://a", "https://b", "https://c"]
+    assert len(slackbot.posted) == 3
+    assert events.index(("posted", 1)) < events.index(("scanned", "https://c"))
+    assert result.first_alert_s <= result.total_s
+
+def test_pipeline_dry_run_and_errors():
+    result = AlertPipeline(FakeJobAlerter({"https://a": 0.0}), FakeSlackbot(0.0), 2.0).run(post=False)
+    assert result.workspace_responses == {}
+    assert len(result.workspace_payloads["https://a"]) == 2
+
+    with pytest.raises(RuntimeError):
+        AlertPipeline(FakeJobAlerter({"https://a": 0.0, "https://b": -1}), FakeSlackbot(0.0), 2.0).run()
+
+def test_pipeline_profile(tmp_path):
+    result = AlertPipeline(FakeJobAlerter({"https://a": 0.05}), FakeSlackbot(0.05), 2.0).run(
+        profile=True, profile_dir=str(tmp_path))
+    collapsed_path, summary_path = result.profile_paths
+    with open(collapsed_path) as f:
+        collapsed = f.read()
+    assert "get_workspace_job_runs" in collapsed and "post_payloads" in collapsed
+    with open(summary_path) as f:
+        assert f.readline().endswith("ms)\n")
+
+def test_pipeline_skips_posted_workspaces_on_resume(tmp_path):
+    from utils.scan_checkpoint import ScanCheckpoint
+    checkpoint = ScanCheckpoint(str(tmp_path / "checkpoint.jsonl"))
+    checkpoint.open({"older_than_hours": 2.0}) # Opened by JobAlerter.get_workspace_job_runs() in a real scan
+    checkpoint.commit_stage("https://a", "posted")
+    slackbot = FakeSlackbot(0.0)
+    result = AlertPipeline(FakeJobAlerter({"https://a": 0.0, "https://b": 0.0}), slackbot, 2.0,
+                           scan_checkpoint=checkpoint).run(older_than_hours=2.0)
+    assert list(result.workspace_responses) == ["https://b"] and len(slackbot.posted) == 1
+    assert checkpoint.workspace("https://b")["stages"] == {"posted"}
@@ -0,0 +1,43 @@
+"""
+Benchmark of the JSON codec backends (see utils/json_codec.py) on representative payloads:
+- Decode: expanded /jobs/runs/list pages (25 runs x 100 tasks, i.e. the multi-megabyte case).
+- Encode: Slack webhook payloads as produced by Slackbot.construct_workspace_payloads().
+
+Usage (from the repository root): python -m benchmarks.json_codec_benchmark
+"""
+import timeit
+from benchmarks.synthetic_runs import make_runs_list_page, make_simplified_runs
+from utils import json_codec
+
+def bench(label: str, func, number: int) -> float:
+    """Time the given function, returning the best per-call time (in ms) over a few repeats."""
+    best_s = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"  {label:<40} {best_s * 1000:9.3f} ms")
+    return best_s
+
+def main() -> None:
+    backends = json_codec.available_backends()
+    print(f"Available backends: {backends} (default: {json_codec.DEFAULT_BACKEND})")
+
+    page_bytes = json_codec.dumps(make_runs_list_page(num_runs=25, tasks_per_run=100))
+    slack_payloads = [{"blocks": [{"type": "section", "text": {"type": "mrkdwn", "text": f"*Run name:*\n{r['run_name']}"}},
+                                  {"type": "divider"}]} for r in make_simplified_runs(1000)]
+
+    results = {}
+    print(f"\nDecode /jobs/runs/list page ({len(page_bytes) / 1e6:.2f} MB):")
+    for backend in backends:
+        results[("decode", backend)] = bench(backend, lambda: json_codec.loads(page_bytes, backend=backend), 5)
+
+    print(f"\nEncode {len(slack_payloads)} Slack payloads:")
+    for backend in backends:
+        results[("encode", backend)] = bench(
+            backend, lambda: [json_codec.dumps(p, backend=backend) for p in slack_payloads], 20)
+
+    if json_codec.ORJSON_BACKEND in backends:
+        print("\nSpeedup vs. stdlib:")
+        for op in ["decode", "encode"]:
+            speedup = results[(op, json_codec.STDLIB_BACKEND)] / results[(op, json_codec.ORJSON_BACKEND)]
+            print(f"  {op}: {speedup:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Memory footprint benchmark of a large scan, with per-run byte budgets for each stage.
+
+Synthetic /jobs/runs/list pages (expanded tasks, 100 tasks per run) are served by an in-memory transport and fed
+through JobAlerter.get_job_runs(), JobAlerter.__simplify_job_runs_list() and Slackbot.construct_workspace_payloads().
+The peak and retained memory of each stage is measured with tracemalloc and compared against STAGE_BUDGETS
+(bytes per run, plus, for the listing stages, a fixed peak allowance for the few pages of expanded runs in flight at a
+time). The scan runs on
+small single-node drivers, so a stage whose memory grows past its budget is a regression even if it is still fast.
+In particular, get_job_runs(simplified_output=True) must only hold one page of expanded runs at a time.
+
+Usage (from the repository root): python -m benchmarks.memory_benchmark [num_runs] [tasks_per_run]
+Exits with status 1 if any stage exceeds its budget. Note: tracemalloc slows down allocations several times.
+"""
+import gc
+import importlib.util
+import logging
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from benchmarks.synthetic_runs import make_runs_list_page
+from stuck_job_alerter import JobAlerter
+from utils import json_codec
+from utils.http_transport import HttpTransport
+
+WORKSPACE = "https://myenv.cloud.databricks.com"
+RUNS_PER_PAGE = 25 # REST API maximum for /jobs/runs/list
+
+# Stage -> (peak bytes per run, retained bytes per run), for runs with 100 tasks
+STAGE_BUDGETS = {
+    "get_job_runs (expanded)": (350000, 300000),
+    "simplify_job_runs_list": (1500, 1500),
+    "construct_workspace_payloads": (6000, 6000),
+    "get_job_runs (simplified)": (4000, 4000),
+}
+# Peak memory allowed on top of the per-run budgets of the listing (get_job_runs) stages, for the few pages of
+# expanded runs in flight at a time
+PAGES_IN_FLIGHT = 3
+EXPANDED_RUN_BYTES = STAGE_BUDGETS["get_job_runs (expanded)"][0]
+
+@dataclass
+class StageMemory:
+    stage: str
+    peak_bytes: int     # Peak traced memory during the stage, above the memory in use before it
+    retained_bytes: int # Memory still in use after the stage (i.e. its output), above the memory in use before it
+
+class SyntheticResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+        self.status_code = 200
+
+class SyntheticDatabricks(HttpTransport):
+    """
+    In-memory stand-in for the REST API endpoints used by a scan, serving num_runs synthetic expanded runs.
+    Page contents are encoded once per variant and reused (with unique run IDs), so the benchmark's own input does not
+    grow with num_runs.
+    """
+
+    def __init__(self, num_runs: int, tasks_per_run: int = 100, num_page_variants: int = 4):
+        self.num_pages = -(-num_runs // RUNS_PER_PAGE)
+        self.num_runs = num_runs
+        self.pages = [json_codec.dumps(make_runs_list_page(RUNS_PER_PAGE, tasks_per_run, seed=seed, next_page_token=None))
+                      for seed in range(num_page_variants)]
+        self.job = json_codec.dumps({"job_id": 1, "settings": {"name": "pipeline", "tags": {"team": "data"}}})
+        self.cluster = json_codec.dumps({"cluster_id": "c1", "cluster_name": "job-cluster", "num_workers": 2,
+                                         "node_type_id": "m5d.large", "driver_node_type_id": "m5d.large",
+                                         "cluster_cores": 6.0, "cluster_memory_mb": 24576})
+
+    def get(self, url, headers=None, params=None):
+        endpoint = url.split("/api/2.2", 1)[1]
+        if endpoint == "/jobs/runs/list":
+            index = int((params or {}).get("page_token", 0))
+            page = json_codec.loads(self.pages[index % len(self.pages)])
+            last_page_runs = self.num_runs - index * RUNS_PER_PAGE
+            if last_page_runs < RUNS_PER_PAGE:
+                page["runs"] = page["runs"][:last_page_runs]
+            for i, run in enumerate(page["runs"]):
+                # Unique run IDs (and hence Slack lines) per page, as in a real scan
+                run["run_id"] = index * RUNS_PER_PAGE + i
+                run["run_page_url"] = f"{WORKSPACE}/?o=1#job/{run['job_id']}/run/{run['run_id']}"
+            if index + 1 < self.num_pages:
+                page["next_page_token"] = str(index + 1)
+            return SyntheticResponse(json_codec.dumps(page))
+        if endpoint == "/jobs/get":
+            return SyntheticResponse(self.job)
+        if endpoint == "/clusters/get":
+            return SyntheticResponse(self.cluster)
+        return SyntheticResponse(b'{"error_code": "ENDPOINT_NOT_FOUND"}')
+
+def import_slackbot():
+    """
+    Return the Slackbot class of slackbot/slackbot.py, imported under an alias module name: under pytest, the name
+    "slackbot" may be taken by the top-level module that slackbot/slackbot_test.py imports, shadowing the package.
+    """
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "slackbot", "slackbot.py")
+    spec = importlib.util.spec_from_file_location("benchmarks_slackbot", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Slackbot
+
+def measure(stage: str, func):
+    """Run func under tracemalloc (which must be started) and return its result and StageMemory."""
+    gc.collect()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    return result, StageMemory(stage, peak - before, current - before)
+
+def run_stages(num_runs: int, tasks_per_run: int = 100, slackbot=None) -> list[StageMemory]:
+    """
+    Measure the memory of each scan stage for the given number of synthetic runs.
+    The Slack payload stage is only measured if a Slackbot is given.
+    """
+    job_alerter = JobAlerter(logging.getLogger(__name__), ["token"], [WORKSPACE],
+                             transport=SyntheticDatabricks(num_runs, tasks_per_run))
+    simplify = job_alerter._JobAlerter__simplify_job_runs_list
+    scan_kwargs = {"active_runs_only": True, "older_than_hours": 0.0, "limit": 0, "include_streaming_jobs": False}
+
+    stages = []
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        job_runs_lists, memory = measure("get_job_runs (expanded)", lambda: job_alerter.get_job_runs(**scan_kwargs))
+        stages.append(memory)
+        simplified, memory = measure("simplify_job_runs_list",
+                                     lambda: {url: simplify(runs) for url, runs in job_runs_lists.items()})
+        stages.append(memory)
+        del job_runs_lists
+        if slackbot is not None:
+            _, memory = measure("construct_workspace_payloads",
+                                lambda: slackbot.construct_workspace_payloads(simplified, 2.0))
+            stages.append(memory)
+        del simplified
+        _, memory = measure("get_job_runs (simplified)",
+                            lambda: job_alerter.get_job_runs(simplified_output=True, **scan_kwargs))
+        stages.append(memory)
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return stages
+
+def find_budget_violations(stages: list[StageMemory], num_runs: int, tasks_per_run: int = 100) -> list[str]:
+    """Return a description of each stage whose peak or retained memory per run exceeds its budget."""
+    violations = []
+    tasks_scale = tasks_per_run / 100
+    for stage in stages:
+        peak_budget, retained_budget = STAGE_BUDGETS[stage.stage]
+        # Only the listing stages hold pages of expanded runs in flight; the others are held to their per-run budgets
+        peak_allowance = PAGES_IN_FLIGHT * RUNS_PER_PAGE * EXPANDED_RUN_BYTES * tasks_scale \
+            if stage.stage.startswith("get_job_runs") else 0
+        if stage.stage.startswith("get_job_runs (expanded)"):
+            # The expanded output holds every task, so its budget scales with the number of tasks per run
+            peak_budget, retained_budget = peak_budget * tasks_scale, retained_budget * tasks_scale
+        for label, used, budget, allowance in [("peak", stage.peak_bytes, peak_budget, peak_allowance),
+                                               ("retained", stage.retained_bytes, retained_budget, 0)]:
+            if used > budget * num_runs + allowance:
+                violations.append(f"{stage.stage}: {label} {used / num_runs:.0f} bytes/run > budget {budget:.0f} "
+                                  f"bytes/run (+{allowance / 2 ** 20:.1f} MiB)")
+    return violations
+
+def main(num_runs: int = 50000, tasks_per_run: int = 100) -> int:
+    stages = run_stages(num_runs, tasks_per_run, import_slackbot()("https://hooks.slack.com/services/benchmark"))
+    print(f"{num_runs} runs with {tasks_per_run} tasks each:")
+    for stage in stages:
+        print(f"{stage.stage:<32} peak {stage.peak_bytes / 2 ** 20:9.1f} MiB ({stage.peak_bytes / num_runs:8.0f} B/run), "
+              f"retained {stage.retained_bytes / 2 ** 20:9.1f} MiB ({stage.retained_bytes / num_runs:8.0f} B/run)")
+    violations = find_budget_violations(stages, num_runs, tasks_per_run)
+    for violation in violations:
+        print(f"OVER BUDGET: {violation}")
+    return 1 if violations else 0
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000, int(sys.argv[2]) if len(sys.argv) > 2 else 100))
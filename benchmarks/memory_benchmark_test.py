@@ -0,0 +1,20 @@
+from benchmarks.memory_benchmark import STAGE_BUDGETS, find_budget_violations, import_slackbot, run_stages
+
+def test_scan_stages_within_memory_budgets():
+    # A small scan keeps this fast; budgets are per run (plus a few pages in flight for listing), so they hold at any size
+    num_runs, tasks_per_run = 200, 20
+    stages = run_stages(num_runs, tasks_per_run, import_slackbot()("https://hooks.slack.com/services/test"))
+    assert [stage.stage for stage in stages] == ["get_job_runs (expanded)", "simplify_job_runs_list",
+                                                 "construct_workspace_payloads", "get_job_runs (simplified)"]
+    assert find_budget_violations(stages, num_runs, tasks_per_run) == []
+    # Payload construction gets no in-flight allowance: its per-run budget alone decides
+    payloads = stages[2]
+    assert payloads.peak_bytes <= STAGE_BUDGETS["construct_workspace_payloads"][0] * num_runs
+    assert find_budget_violations([payloads], num_runs // 2, tasks_per_run) != [] # Over budget at half the runs
+
+def test_simplified_scan_does_not_retain_expanded_runs():
+    num_runs, tasks_per_run = 200, 20
+    expanded, _, simplified = run_stages(num_runs, tasks_per_run)
+    assert simplified.retained_bytes * 10 < expanded.retained_bytes
+    # Runs are processed page by page, so the peak stays well below that of holding every expanded run
+    assert simplified.peak_bytes * 2 < expanded.peak_bytes
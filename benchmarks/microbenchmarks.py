@@ -0,0 +1,171 @@
+"""
+Micro-benchmark suite for the per-run hot paths of the alerter, at 10, 1k and 100k synthetic runs, with stored
+baselines and regression thresholds.
+
+Each case is checked in two ways:
+- Against its stored baseline (benchmarks/baselines.json): a case fails if it is more than --tolerance slower.
+  Baselines are machine specific, so regenerate them with --save when changing machines.
+- For scaling: a case fails if its time per run at the largest size is more than MAX_SCALING_FACTOR times its
+  time per run at the middle size. This catches superlinear behavior (e.g. quadratic loops) on any machine.
+  microbenchmarks_test.py runs this check under pytest, at smaller sizes.
+
+Usage (from the repository root):
+    python -m benchmarks.microbenchmarks [--save] [--tolerance 0.5] [--sizes 10,1000,100000] [--cases name,...]
+Exits with status 1 if any case regressed.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import time
+from benchmarks.memory_benchmark import import_slackbot
+from benchmarks.synthetic_runs import make_runs, make_simplified_runs
+from stuck_job_alerter import JobAlerter
+from utils.parsing_helpers import get_counts_in_dict_list
+from workflow_parameters.job_parameters import JobParams
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_SIZES = [10, 1000, 100000]
+MAX_SCALING_FACTOR = 10.0 # Quadratic behavior shows as ~100x per run between 1k and 100k runs
+WORKSPACE = "https://myenv.cloud.databricks.com"
+
+def make_alerter() -> JobAlerter:
+    return JobAlerter(logging.getLogger(__name__), ["token"], [WORKSPACE])
+
+def setup_simplify(num_runs: int):
+    runs = make_runs(num_runs, tasks_per_run=1)
+    simplify = make_alerter()._JobAlerter__simplify_job_runs_list
+    return lambda: simplify(runs)
+
+def setup_filter(num_runs: int):
+    runs = make_runs(num_runs, tasks_per_run=1)
+    for i, run in enumerate(runs):
+        if i % 3 == 0:
+            run["status"] = {"state": "QUEUED"}
+    filter_job_runs = JobAlerter._JobAlerter__filter_job_runs
+    return lambda: filter_job_runs(runs, True, 2.0)
+
+def setup_parse_durations(num_runs: int):
+    # Synthetic runs share 500 distinct run names, so the number of duplicates per name grows with num_runs
+    runs = make_simplified_runs(num_runs)
+    parse_job_run_durations = make_alerter().parse_job_run_durations
+    return lambda: parse_job_run_durations(runs)
+
+def setup_workspace_payloads(num_runs: int):
+    job_runs_lists = {WORKSPACE: make_simplified_runs(num_runs)}
+    Slackbot = import_slackbot()
+    # A new Slackbot per call, so that every call renders with a cold cache
+    return lambda: Slackbot("https://hooks.slack.com/services/benchmark").construct_workspace_payloads(job_runs_lists, 2.0)
+
+def setup_tags_to_text(num_runs: int):
+    tags_list = [run["job_tags"] for run in make_simplified_runs(num_runs)]
+    Slackbot = import_slackbot()
+    return lambda: [Slackbot.tags_to_text(tags) for tags in tags_list]
+
+def setup_parse_str_list(num_runs: int):
+    str_list = "[" + ", ".join(f"https://workspace-{i}.cloud.databricks.com" for i in range(num_runs)) + "]"
+    return lambda: JobParams.parse_str_list(str_list)
+
+def setup_counts(num_runs: int):
+    # One workspace per 10 runs, as get_counts_in_dict_list is used on job_runs_lists
+    runs = make_simplified_runs(num_runs)
+    job_runs_lists = {f"https://workspace-{i}.cloud.databricks.com": runs[i:i + 10] for i in range(0, num_runs, 10)}
+    return lambda: get_counts_in_dict_list(job_runs_lists)
+
+# Case name -> setup function returning the callable to time for a given number of runs
+CASES = {
+    "simplify_job_runs_list": setup_simplify,
+    "filter_job_runs": setup_filter,
+    "parse_job_run_durations": setup_parse_durations,
+    "construct_workspace_payloads": setup_workspace_payloads,
+    "tags_to_text": setup_tags_to_text,
+    "parse_str_list": setup_parse_str_list,
+    "get_counts_in_dict_list": setup_counts,
+}
+
+def time_case(func, num_runs: int, repeats: int | None = None) -> float:
+    """Return the best-of-k wall time of func in seconds (by default, fewer repeats for large inputs)."""
+    if repeats is None:
+        repeats = 3 if num_runs >= 100000 else 10 if num_runs >= 1000 else 200
+    best = float("inf")
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+def run_suite(case_names: list[str], sizes: list[int]) -> dict[str, dict[str, float]]:
+    results = {}
+    for name in case_names:
+        results[name] = {}
+        for num_runs in sizes:
+            results[name][str(num_runs)] = time_case(CASES[name](num_runs), num_runs)
+            print(f"{name:<42} {num_runs:>7} runs: {results[name][str(num_runs)] * 1000:10.3f} ms")
+    return results
+
+def find_regressions(results: dict[str, dict[str, float]], baselines: dict[str, dict[str, float]],
+                     tolerance: float, max_scaling_factor: float = MAX_SCALING_FACTOR) -> list[str]:
+    """
+    Return a description of each baseline or scaling regression in the results.
+    The scaling check compares the two largest sizes: lower max_scaling_factor when they are less than 100x apart.
+    """
+    regressions = []
+    for name, timings in results.items():
+        for size, seconds in timings.items():
+            baseline = baselines.get(name, {}).get(size)
+            # Sub-millisecond timings are too noisy to compare against a baseline
+            if baseline is not None and seconds > 0.001 and seconds > baseline * (1 + tolerance):
+                regressions.append(f"{name} at {size} runs: {seconds * 1000:.3f} ms "
+                                   f"vs baseline {baseline * 1000:.3f} ms")
+
+        sizes = sorted(int(size) for size in timings)
+        if len(sizes) >= 2:
+            small, large = sizes[-2], sizes[-1]
+            per_run_small = timings[str(small)] / small
+            per_run_large = timings[str(large)] / large
+            if per_run_large > per_run_small * max_scaling_factor:
+                regressions.append(f"{name}: {per_run_large * 1e6:.2f} us/run at {large} runs vs "
+                                   f"{per_run_small * 1e6:.2f} us/run at {small} runs (superlinear scaling)")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baselines.")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown vs. baseline (0.5 = 50%%).")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument("--cases", default=",".join(CASES))
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run_suite(args.cases.split(","), sizes)
+
+    if args.save:
+        baselines = {}
+        if os.path.exists(BASELINES_PATH):
+            with open(BASELINES_PATH, "r") as f:
+                baselines = json.load(f)
+        for name, timings in results.items():
+            baselines.setdefault(name, {}).update(timings)
+        with open(BASELINES_PATH, "w") as f:
+            json.dump(baselines, f, indent=4, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baselines to {BASELINES_PATH}")
+
+    baselines = {}
+    if os.path.exists(BASELINES_PATH) and not args.save:
+        with open(BASELINES_PATH, "r") as f:
+            baselines = json.load(f)
+    regressions = find_regressions(results, baselines, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,15 @@
+from benchmarks.microbenchmarks import CASES, find_regressions, time_case
+
+def test_cases_scale_linearly():
+    # Only the scaling check, as baselines are machine specific. Between 3k and 30k runs, quadratic behavior shows as
+    # ~10x the time per run, while linear cases stay below ~4x: data falling out of the CPU caches alone costs that
+    # much. (At 1k runs, cases that touch little data per run are still cache resident and scale worse.)
+    results = {name: {str(num_runs): time_case(CASES[name](num_runs), num_runs, repeats=3)
+                      for num_runs in [3000, 30000]}
+               for name in CASES}
+    assert find_regressions(results, {}, tolerance=0.5, max_scaling_factor=6.0) == []
+
+def test_find_regressions_flags_superlinear_scaling():
+    results = {"linear": {"3000": 0.003, "30000": 0.09}, "quadratic": {"3000": 0.003, "30000": 0.3}}
+    regressions = find_regressions(results, {}, tolerance=0.5, max_scaling_factor=6.0)
+    assert len(regressions) == 1 and regressions[0].startswith("quadratic:")
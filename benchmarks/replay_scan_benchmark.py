@@ -0,0 +1,50 @@
+"""
+Offline benchmark/regression check of a full stuck job scan against recorded production traffic.
+
+Record a cassette by passing a RecordingTransport to JobAlerter (see README.md), then replay it here:
+    python -m benchmarks.replay_scan_benchmark <cassette.jsonl.gz> <workspace_url> [latency_scale] [--profile DIR]
+
+A latency_scale of 1.0 replays each response with its recorded latency, 0.0 measures pure CPU time.
+Scan arguments must match the ones used while recording so that the same requests are made.
+With --profile, the scan and the Slack rendering of its results run under a sampling profiler, whose collapsed
+stacks and top functions summary are written to the given directory.
+"""
+import argparse
+import logging
+import time
+from slackbot.slackbot import Slackbot
+from stuck_job_alerter import JobAlerter
+from utils.http_transport import ReplayTransport
+from utils.parsing_helpers import get_counts_in_dict_list
+from utils.scan_profiler import SamplingProfiler
+
+def main(cassette_path: str, workspace_url: str, latency_scale: float = 0.0, profile_dir: str | None = None) -> None:
+    transport = ReplayTransport(cassette_path, latency_scale=latency_scale)
+    job_alerter = JobAlerter(logging.getLogger(__name__), ["REDACTED"], [workspace_url], transport=transport)
+
+    profiler = SamplingProfiler()
+    if profile_dir:
+        profiler.start()
+    start = time.perf_counter()
+    job_runs_lists = job_alerter.get_job_runs(active_runs_only=True, older_than_hours=0.0, limit=1000,
+                                              simplified_output=True, include_streaming_jobs=False)
+    elapsed = time.perf_counter() - start
+    if profile_dir:
+        Slackbot("https://hooks.slack.com/services/replay").construct_workspace_payloads(job_runs_lists, 0.0)
+        profiler.stop()
+    print(f"Replayed scan (latency scale {latency_scale}) in {elapsed:.3f} s")
+    print(f"Job runs per workspace: {get_counts_in_dict_list(job_runs_lists)}")
+
+    if profile_dir:
+        collapsed_path, summary_path = profiler.write(profile_dir, name="replay_scan")
+        print(f"\n{profiler.summary(10)}")
+        print(f"\nWrote {collapsed_path} and {summary_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette_path")
+    parser.add_argument("workspace_url")
+    parser.add_argument("latency_scale", nargs="?", type=float, default=0.0)
+    parser.add_argument("--profile", metavar="DIR", help="Profile the scan and write the results to this directory.")
+    args = parser.parse_args()
+    main(args.cassette_path, args.workspace_url, args.latency_scale, args.profile)
@@ -0,0 +1,24 @@
+"""
+Benchmark of Slack block rendering (see utils/block_renderer.py) for many job runs, cold and warm cache.
+
+Usage (from the repository root): python -m benchmarks.slack_render_benchmark [num_runs]
+"""
+import sys
+import time
+from benchmarks.synthetic_runs import make_simplified_runs
+from slackbot.slackbot import Slackbot
+
+def main(num_runs: int = 10000) -> None:
+    job_runs_lists = {"https://myenv.cloud.databricks.com": make_simplified_runs(num_runs)}
+    slackbot = Slackbot("https://hooks.slack.com/services/benchmark")
+
+    for label in ["cold cache", "warm cache"]:
+        start = time.perf_counter()
+        workspace_payloads = slackbot.construct_workspace_payloads(job_runs_lists, 2.0)
+        elapsed = time.perf_counter() - start
+        num_payloads = sum(len(payloads) for payloads in workspace_payloads.values())
+        print(f"Rendered {num_runs} runs into {num_payloads} payloads ({label}): {elapsed * 1000:.1f} ms "
+              f"({elapsed / num_runs * 1e6:.1f} us/run)")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
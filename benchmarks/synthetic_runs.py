@@ -0,0 +1,98 @@
+"""
+Synthetic Databricks REST API payloads shaped like real /jobs/runs/list responses, for offline benchmarks.
+Run the benchmarks in this directory from the repository root, e.g.: python -m benchmarks.json_codec_benchmark
+"""
+import random
+
+HOUR_MS = 3600000
+NOW_MS = 1760000000000 # Fixed "now" so that generated data is reproducible
+
+def make_task(run_id: int, task_index: int, state: str, rng: random.Random) -> dict:
+    """Return a single expanded task as found in the "tasks" array of a job run."""
+    cluster_id = f"{rng.randint(1000, 9999)}-{rng.randint(100000, 999999)}-abc{task_index % 10}"
+    return {
+        "task_key": f"task_{task_index}",
+        "run_id": run_id * 1000 + task_index,
+        "job_cluster_key": f"job_cluster_{task_index % 3}",
+        "state": {"life_cycle_state": state, "state_message": ""},
+        "status": {"state": state},
+        "start_time": NOW_MS - rng.randint(1, 48) * HOUR_MS,
+        "setup_duration": rng.randint(0, 300000),
+        "execution_duration": rng.randint(0, 3000000),
+        "cleanup_duration": 0,
+        "cluster_instance": {"cluster_id": cluster_id, "spark_context_id": str(rng.getrandbits(63))},
+        "notebook_task": {"notebook_path": f"/Repos/team/pipeline/step_{task_index}", "source": "WORKSPACE"},
+        "depends_on": [{"task_key": f"task_{task_index - 1}"}] if task_index > 0 else [],
+        "attempt_number": 0,
+    }
+
+def make_run(run_id: int, tasks_per_run: int = 10, rng: random.Random | None = None,
+             run_name: str | None = None) -> dict:
+    """Return a single expanded job run. One task (roughly in the middle) is RUNNING, the rest have terminated."""
+    rng = rng or random.Random(run_id)
+    running_index = tasks_per_run // 2
+    tasks = [make_task(run_id, i, "RUNNING" if i == running_index else "TERMINATED", rng)
+             for i in range(tasks_per_run)]
+    job_id = rng.randint(1, 10 ** 15)
+    return {
+        "job_id": job_id,
+        "run_id": run_id,
+        "run_name": run_name if run_name is not None else f"pipeline_{job_id % 500}",
+        "creator_user_name": f"user{job_id % 37}@example.com",
+        "run_page_url": f"https://myenv.cloud.databricks.com/?o=1#job/{job_id}/run/{run_id}",
+        "format": "MULTI_TASK",
+        "run_type": "JOB_RUN",
+        "trigger": "PERIODIC",
+        "state": {"life_cycle_state": "RUNNING", "state_message": ""},
+        "status": {"state": "RUNNING"},
+        "start_time": NOW_MS - rng.randint(1, 72) * HOUR_MS - rng.randint(0, HOUR_MS),
+        "setup_duration": 0,
+        "execution_duration": 0,
+        "cleanup_duration": 0,
+        "run_duration": 0,
+        "tasks": tasks,
+        "job_clusters": [{"job_cluster_key": f"job_cluster_{i}",
+                          "new_cluster": {"node_type_id": "m5d.large", "num_workers": 2,
+                                          "spark_version": "15.4.x-scala2.12"}} for i in range(3)],
+    }
+
+def make_runs(num_runs: int, tasks_per_run: int = 10, seed: int = 0, duplicate_names: bool = False) -> list[dict]:
+    """Return a list of synthetic expanded job runs. Optionally give every run the same run_name."""
+    rng = random.Random(seed)
+    return [make_run(1000000 + i, tasks_per_run, rng, run_name="same_name" if duplicate_names else None)
+            for i in range(num_runs)]
+
+def make_runs_list_page(num_runs: int = 25, tasks_per_run: int = 100, seed: int = 0,
+                        next_page_token: str | None = "CAEQ6N2k") -> dict:
+    """Return a single /jobs/runs/list response page (25 runs per page is the REST API maximum)."""
+    page = {"runs": make_runs(num_runs, tasks_per_run, seed), "has_more": next_page_token is not None}
+    if next_page_token is not None:
+        page["next_page_token"] = next_page_token
+    return page
+
+def simplify_run(run: dict, unspecified_str: str = "Unspecified") -> dict:
+    """Return a run in the shape produced by JobAlerter.get_job_runs(simplified_output=True)."""
+    simple = {k: run[k] for k in ["run_name", "creator_user_name", "run_page_url", "format", "run_type", "status",
+                                  "job_id", "run_id", "start_time", "setup_duration", "execution_duration",
+                                  "cleanup_duration", "run_duration"]}
+    simple["time_from_start"] = NOW_MS - run["start_time"]
+    simple["time_from_start_hours"] = simple["time_from_start"] / HOUR_MS
+    running = run["tasks"][len(run["tasks"]) // 2] if run.get("tasks") else None
+    if running:
+        simple.update({"cluster_id": running["cluster_instance"]["cluster_id"], "cluster_name": running["task_key"],
+                       "cluster_url": f"https://myenv.cloud.databricks.com/compute/clusters/"
+                                      f"{running['cluster_instance']['cluster_id']}",
+                       "cluster_cores": 4.0, "driver_node_type_id": "m5d.large", "node_type_id": "m5d.large",
+                       "num_workers": 2, "cluster_memory_mb": 16384})
+    else:
+        for field in ["cluster_id", "cluster_name", "cluster_url", "cluster_cores", "driver_node_type_id",
+                      "node_type_id", "num_workers", "cluster_memory_mb"]:
+            simple[field] = unspecified_str
+    simple["continuous"] = False
+    simple["job_tags"] = {"team": f"team_{run['job_id'] % 7}", "cost_center": str(run["job_id"] % 1000)}
+    return simple
+
+def make_simplified_runs(num_runs: int, seed: int = 0, duplicate_names: bool = False) -> list[dict]:
+    """Return a list of synthetic simplified job runs (as consumed by the Slackbot and duration helpers)."""
+    return [simplify_run(run) for run in make_runs(num_runs, tasks_per_run=1, seed=seed,
+                                                    duplicate_names=duplicate_names)]
@@ -0,0 +1,2 @@
+# Having a conftest.py at the repository root makes pytest add this directory to sys.path, so that modules
+# can import shared helpers as e.g. "from utils import json_codec" (as they do when run from the notebooks).
@@ -1,30 +1,32 @@
-import requests
 import base64
+from utils import json_codec
+from utils.http_transport import HttpTransport
 
 class SecretsHelper:
     """Class that implements various Databricks secrets-related functions. Mainly wraps the DB REST API."""
 
-    def __init__(self, workspace_url, token) -> None:
+    def __init__(self, workspace_url, token, transport: HttpTransport | None = None) -> None:
         self.__workspace_url = workspace_url
         self.__token = {"Authorization": "Bearer {0}".format(token)}
         self.__api_version = "2.0"
+        self.__transport = transport or HttpTransport() # HTTP layer, e.g. to record or replay traffic
 
     def get(self, endpoint: str, json_params: dict[str, str]={}) -> dict[str, str]:
         """Wrapper for DB REST API GET. URL should have no ending backslash (/)."""        
         if json_params:
-            raw_results = requests.get(
+            raw_results = self.__transport.get(
                 self.__workspace_url + "/api/" + self.__api_version + endpoint,
                 headers=self.__token,
                 params=json_params,
             )
         else:
-            raw_results = requests.get(
+            raw_results = self.__transport.get(
                 self.__workspace_url + "/api/" + self.__api_version + endpoint,
                 headers=self.__token
             )
         try:
-            results = raw_results.json() # Dict
-        except requests.exceptions.JSONDecodeError as jde:
+            results = json_codec.loads(raw_results.content) # Dict
+        except json_codec.JSONDecodeError as jde:
             print("SecretsHelper_REST: Failed to decode response JSON. Check for 204 error (No Response) "
                   "or invalid JSON in response.")
             return raw_results
@@ -37,7 +39,7 @@ class SecretsHelper:
             print("SecretsHelper_REST: Must have a payload in json_args param.")
             return {}
         
-        raw_results = requests.post(
+        raw_results = self.__transport.post(
             self.__workspace_url + "/api/" + self.__api_version + endpoint,
             headers=self.__token,
             json=json_params,
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from utils import json_codec
+from utils.rate_limiter import TokenBucket
+from utils.time_helpers import epoch_ms_now
+
+@dataclass(frozen=True)
+class RemediationPolicy:
+    """Cancel stuck job runs that have been running longer than a hard ceiling, optionally only for some jobs."""
+    name: str
+    min_hours: float                                               # Hard ceiling on the run duration
+    job_tags: dict[str, str] = field(default_factory=dict)         # Tags the job must have ("" matches any value)
+    workspace_urls: list[str] | None = None                        # Workspaces to apply to (None means all)
+
+    def matches(self, workspace_url: str, run: dict) -> bool:
+        if run.get("time_from_start_hours", 0.0) <= self.min_hours:
+            return False
+        if self.workspace_urls is not None and workspace_url not in self.workspace_urls:
+            return False
+        run_tags = run.get("job_tags")
+        run_tags = run_tags if isinstance(run_tags, dict) else {}
+        return all(key in run_tags and (value == "" or run_tags[key] == value) for key, value in self.job_tags.items())
+
+@dataclass
+class RemediationAction:
+    """A cancellation of a single job run, and its outcome."""
+    workspace_url: str
+    run_id: int
+    run_name: str
+    policy: str
+    time_from_start_hours: float
+    # planned, skipped, dry_run, already_cancelled, cancel_failed, cancel_requested, cancelled or timed_out
+    status: str = "planned"
+    error: str | None = None
+
+class Remediator:
+    """
+    Opt-in remediation stage: cancels stuck job runs matching a policy (via /jobs/runs/cancel) and polls them
+    until they have terminated, so that runs exceeding a hard ceiling do not need to be cancelled by hand.
+
+    Policies are evaluated in a single pass over the scan results (the first matching policy wins). Runs with the
+    skip tag are never cancelled, nor are runs whose job tags are unavailable (flagged by JobAlerter with
+    job_tags_unavailable, e.g. when the lookup failed or was refused by the request budget), as their job may have
+    opted out: they are planned as skipped. Cancellations and polls run concurrently on a bounded thread pool, with a
+    token bucket rate limit per workspace, so a large batch completes in seconds without exceeding the REST API's
+    rate limits. Every action is appended to an audit log (JSON lines) as soon as its status is set (cancellation
+    requested or failed, then cancelled or timed out), so the log is complete up to a crash. Only status changes
+    are appended: an action whose run has the same last audited status (e.g. the same dry run on every scan) is
+    not, so the log does not grow with repeated scans. Runs whose cancellation is already in the audit log are
+    not cancelled again, so repeated scans (or retries after a failure) are idempotent. Runs that timed out (still
+    running when polling stopped, or polls failed) are retried by the next run of the stage.
+    Dry runs (the default) only plan and audit the cancellations.
+    """
+    done_statuses = {"cancel_requested", "cancelled"} # Audited statuses that are not retried
+    terminal_states = {"TERMINATED", "SKIPPED", "INTERNAL_ERROR"}
+
+    def __init__(self, job_alerter, policies: list[RemediationPolicy], audit_log_path: str | None = None,
+                 dry_run: bool = True, max_workers: int = 8, requests_per_second: float = 20.0,
+                 poll_interval_s: float = 2.0, poll_timeout_s: float = 120.0, skip_tag: str = "no_auto_cancel",
+                 clock=time.monotonic, sleep=time.sleep) -> None:
+        """
+        Args:
+            job_alerter: JobAlerter instance used to cancel and poll job runs. Polls are counted by its request
+                         budget (if any) but not refused by it, as the scan may have spent the budget.
+            policies: Remediation policies, in order of precedence.
+            audit_log_path: Optional file path (e.g. on a Unity Catalog volume) of the append-only audit log.
+                            Also used to skip runs that were already cancelled by earlier runs of the stage.
+            dry_run: If True, only plan and audit cancellations, without calling the REST API.
+            max_workers: Maximum number of concurrent REST API calls (across workspaces).
+            requests_per_second: Rate limit of REST API calls per workspace. A value <= 0 disables it.
+            poll_interval_s: Time between polls of the runs that are still terminating.
+            poll_timeout_s: Maximum time to wait for cancelled runs to terminate. A value <= 0 disables polling.
+            skip_tag: Job tag that opts a job out of remediation.
+            clock, sleep: Time functions used for rate limiting and polling, e.g. to be replaced in tests.
+        """
+        if max_workers < 1:
+            raise ValueError("Remediator: max_workers must be >= 1.")
+        self.job_alerter = job_alerter
+        self.policies = list(policies)
+        self.audit_log_path = audit_log_path
+        self.dry_run = dry_run
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.poll_interval_s = poll_interval_s
+        self.poll_timeout_s = poll_timeout_s
+        self.skip_tag = skip_tag
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__rate_limiters = {}
+        self.__lock = threading.Lock()
+        self.__audit_lock = threading.Lock()
+        self.__audited = self.__load_audited() # (workspace URL, run ID) -> last audited status
+
+    def plan(self, job_runs_lists: dict[str, list[dict]]) -> list[RemediationAction]:
+        """Return the cancellations the policies call for, given scan results (as outputted by JobAlerter.get_job_runs())."""
+        actions = []
+        seen = set()
+        for workspace_url, job_runs_list in job_runs_lists.items():
+            for run in job_runs_list:
+                key = (workspace_url, str(run["run_id"]))
+                job_tags = run.get("job_tags")
+                if key in seen or (isinstance(job_tags, dict) and self.skip_tag in job_tags):
+                    continue
+                for policy in self.policies:
+                    if policy.matches(workspace_url, run):
+                        seen.add(key)
+                        action = RemediationAction(workspace_url, run["run_id"], run.get("run_name", ""),
+                                                   policy.name, run.get("time_from_start_hours", 0.0))
+                        if run.get("job_tags_unavailable") or not isinstance(job_tags, dict):
+                            action.status = "skipped" # Fail closed: the job may have the skip tag
+                            action.error = f"Job tags unavailable; cannot rule out the {self.skip_tag} tag."
+                        actions.append(action)
+                        break
+        return actions
+
+    def run(self, job_runs_lists: dict[str, list[dict]]) -> list[RemediationAction]:
+        """
+        Plan and (unless this is a dry run) carry out the cancellations for the given scan results, wait for
+        the cancelled runs to terminate, and audit every status change. Returns the actions with their outcome.
+        """
+        actions = self.plan(job_runs_lists)
+        pending = []
+        for action in actions:
+            if self.__audited.get((action.workspace_url, str(action.run_id))) in self.done_statuses:
+                action.status = "already_cancelled"
+            elif action.status == "skipped":
+                self.__audit(action)
+            elif self.dry_run:
+                action.status = "dry_run"
+                self.__audit(action)
+            else:
+                pending.append(action)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+                list(executor.map(self.__cancel, pending))
+                requested = [action for action in pending if action.status == "cancel_requested"]
+                if self.poll_timeout_s > 0:
+                    self.__wait_for_termination(requested, executor)
+                    for action in requested:
+                        self.__audit(action)
+        return actions
+
+    def __cancel(self, action: RemediationAction) -> None:
+        self.__rate_limiter(action.workspace_url).acquire()
+        try:
+            response = self.job_alerter.cancel_job_run(action.workspace_url, action.run_id)
+        except Exception as e:
+            action.status, action.error = "cancel_failed", repr(e)
+        else:
+            if response.get("http_status_code") == 200:
+                action.status = "cancel_requested"
+            else:
+                action.status = "cancel_failed"
+                action.error = response.get("message") or response.get("error_code") or str(response.get("http_status_code"))
+        self.__audit(action)
+
+    def __wait_for_termination(self, actions: list[RemediationAction], executor: ThreadPoolExecutor) -> None:
+        """Poll the given (cancel requested) runs in rounds until they have all terminated or the timeout expires."""
+        deadline = self.__clock() + self.poll_timeout_s
+        while actions:
+            terminated = list(executor.map(self.__is_terminated, actions))
+            for action, is_terminated in zip(actions, terminated):
+                if is_terminated:
+                    action.status = "cancelled"
+            actions = [action for action in actions if action.status != "cancelled"]
+            if not actions or self.__clock() + self.poll_interval_s > deadline:
+                break
+            self.__sleep(self.poll_interval_s)
+        for action in actions:
+            action.status = "timed_out"
+
+    def __is_terminated(self, action: RemediationAction) -> bool:
+        """Poll a run, recording why in its action's error if the poll failed (e.g. if it times out)."""
+        self.__rate_limiter(action.workspace_url).acquire()
+        try:
+            run = self.job_alerter.get_job_run(action.workspace_url, action.run_id, budgeted=False)
+        except Exception as e:
+            action.error = f"Poll failed: {e!r}"
+            return False
+        if run.get("http_status_code", 200) != 200:
+            action.error = f"Poll failed: {run.get('message') or run.get('error_code') or run.get('http_status_code')}"
+            return False
+        action.error = None
+        state = run.get("status", {}).get("state") or run.get("state", {}).get("life_cycle_state")
+        return state in self.terminal_states
+
+    def __rate_limiter(self, workspace_url: str) -> TokenBucket:
+        with self.__lock:
+            if workspace_url not in self.__rate_limiters:
+                self.__rate_limiters[workspace_url] = TokenBucket(self.requests_per_second, clock=self.__clock,
+                                                                    sleep=self.__sleep)
+            return self.__rate_limiters[workspace_url]
+
+    def __audit(self, action: RemediationAction) -> None:
+        """Append an action to the audit log, unless its run's last audited status is the same."""
+        key = (action.workspace_url, str(action.run_id))
+        with self.__audit_lock:
+            if self.__audited.get(key) == action.status:
+                return
+            self.__audited[key] = action.status
+            if not self.audit_log_path:
+                return
+            directory = os.path.dirname(self.audit_log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.audit_log_path, "ab") as f:
+                f.write(json_codec.dumps({"timestamp_ms": epoch_ms_now(), "dry_run": self.dry_run, **asdict(action)}) + b"\n")
+
+    def __load_audited(self) -> dict[tuple[str, str], str]:
+        """Load the last audited status of each run from the audit log. Unreadable lines are skipped."""
+        if not self.audit_log_path or not os.path.exists(self.audit_log_path):
+            return {}
+        audited = {}
+        with open(self.audit_log_path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json_codec.loads(line)
+                except json_codec.JSONDecodeError:
+                    print(f"Remediator [WARNING]: Skipping unreadable line in audit log {self.audit_log_path}.")
+                    continue
+                audited[(entry["workspace_url"], str(entry["run_id"]))] = entry["status"]
+        return audited
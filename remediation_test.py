@@ -0,0 +1,141 @@
+import threading
+import pytest
+from remediation import RemediationPolicy, Remediator
+from utils import json_codec
+
+class FakeJobAlerter:
+    def __init__(self, terminate_after_polls: int = 1, wait_for_in_flight: int = 0, fail_run_ids=(), on_poll=None,
+                 fail_polls: bool = False):
+        self.terminate_after_polls = terminate_after_polls
+        self.fail_polls = fail_polls
+        self.wait_for_in_flight = wait_for_in_flight # Cancels wait (up to a timeout) until this many are in flight
+        self.fail_run_ids = set(fail_run_ids)
+        self.on_poll = on_poll
+        self.cancelled = []
+        self.polls = {}
+        self.max_in_flight = 0
+        self.__in_flight = 0
+        self.__enough_in_flight = threading.Event()
+        self.lock = threading.Lock()
+
+    def cancel_job_run(self, workspace_url, run_id):
+        with self.lock:
+            self.__in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.__in_flight)
+            if self.__in_flight >= self.wait_for_in_flight:
+                self.__enough_in_flight.set()
+        if not self.__enough_in_flight.wait(timeout=1):
+            self.__enough_in_flight.set() # Not concurrent enough: let the remaining cancels through
+        with self.lock:
+            self.__in_flight -= 1
+        if run_id in self.fail_run_ids:
+            return {"error_code": "INVALID_STATE", "message": "Run is not active", "http_status_code": 400}
+        with self.lock:
+            self.cancelled.append((workspace_url, run_id))
+        return {"http_status_code": 200}
+
+    def get_job_run(self, workspace_url, run_id, budgeted=True):
+        assert not budgeted # Polls must not be refused by a budget spent by the scan
+        if self.on_poll is not None:
+            self.on_poll()
+        if self.fail_polls:
+            return {"error_code": "TEMPORARILY_UNAVAILABLE", "http_status_code": 503}
+        with self.lock:
+            self.polls[run_id] = self.polls.get(run_id, 0) + 1
+            state = "TERMINATED" if self.polls[run_id] >= self.terminate_after_polls else "TERMINATING"
+        return {"run_id": run_id, "status": {"state": state}, "http_status_code": 200}
+
+def read_audit_log(path):
+    with open(path, "rb") as f:
+        return [json_codec.loads(line) for line in f]
+
+def make_run(run_id, hours, job_tags=None):
+    return {"run_id": run_id, "run_name": f"run_{run_id}", "time_from_start_hours": hours, "job_tags": job_tags or {}}
+
+SCAN = {"https://a": [make_run(1, 30.0), make_run(2, 5.0), make_run(3, 30.0, {"no_auto_cancel": ""}),
+                      make_run(4, 13.0, {"team": "data"})],
+        "https://b": [make_run(5, 50.0)]}
+POLICIES = [RemediationPolicy("data_ceiling", 12.0, job_tags={"team": "data"}),
+            RemediationPolicy("global_ceiling", 24.0)]
+
+def test_plan_single_pass():
+    actions = Remediator(FakeJobAlerter(), POLICIES).plan(SCAN)
+    assert [(a.workspace_url, a.run_id, a.policy) for a in actions] \
+        == [("https://a", 1, "global_ceiling"), ("https://a", 4, "data_ceiling"), ("https://b", 5, "global_ceiling")]
+    only_b = RemediationPolicy("b_only", 1.0, workspace_urls=["https://b"])
+    assert [a.run_id for a in Remediator(FakeJobAlerter(), [only_b]).plan(SCAN)] == [5]
+
+def test_dry_run_does_not_cancel(tmp_path):
+    job_alerter = FakeJobAlerter()
+    actions = Remediator(job_alerter, POLICIES, audit_log_path=str(tmp_path / "audit.jsonl")).run(SCAN)
+    assert [a.status for a in actions] == ["dry_run"] * 3
+    assert job_alerter.cancelled == []
+    assert len((tmp_path / "audit.jsonl").read_text().splitlines()) == 3
+
+    # Repeated dry runs (e.g. on every scheduled scan) only audit status changes
+    Remediator(job_alerter, POLICIES, audit_log_path=str(tmp_path / "audit.jsonl")).run(SCAN)
+    assert len((tmp_path / "audit.jsonl").read_text().splitlines()) == 3
+
+def test_cancel_poll_and_idempotency(tmp_path):
+    audit_log_path = str(tmp_path / "audit.jsonl")
+    audited_at_poll = []
+    job_alerter = FakeJobAlerter(terminate_after_polls=2, fail_run_ids=[4],
+                                 on_poll=lambda: audited_at_poll.append(len(read_audit_log(audit_log_path))))
+    remediator = Remediator(job_alerter, POLICIES, audit_log_path=audit_log_path, dry_run=False, poll_interval_s=0.01)
+    actions = remediator.run(SCAN)
+    assert {a.run_id: a.status for a in actions} == {1: "cancelled", 4: "cancel_failed", 5: "cancelled"}
+    assert actions[1].error == "Run is not active"
+    assert sorted(job_alerter.cancelled) == [("https://a", 1), ("https://b", 5)]
+    assert audited_at_poll[0] == 3 # Cancellations are audited before polling, then their final status after it
+    assert [(entry["run_id"], entry["status"]) for entry in read_audit_log(audit_log_path)[3:]] \
+        == [(1, "cancelled"), (5, "cancelled")]
+
+    # Neither the same instance nor a new one (e.g. the next scheduled run) cancels the same runs again
+    for remediator in [remediator, Remediator(job_alerter, POLICIES, audit_log_path=audit_log_path, dry_run=False,
+                                              poll_interval_s=0.01)]:
+        actions = remediator.run(SCAN)
+        assert {a.run_id: a.status for a in actions} == {1: "already_cancelled", 4: "cancel_failed", 5: "already_cancelled"}
+    assert len(job_alerter.cancelled) == 2
+    assert len(read_audit_log(audit_log_path)) == 5
+
+def test_plan_skips_runs_with_unavailable_tags(tmp_path):
+    scan = {"https://a": [make_run(1, 30.0), {**make_run(2, 30.0), "job_tags_unavailable": True}]}
+    job_alerter = FakeJobAlerter()
+    actions = Remediator(job_alerter, POLICIES, audit_log_path=str(tmp_path / "audit.jsonl"), dry_run=False).run(scan)
+    assert [(a.run_id, a.status) for a in actions] == [(1, "cancelled"), (2, "skipped")]
+    assert "no_auto_cancel" in actions[1].error
+    assert job_alerter.cancelled == [("https://a", 1)]
+    assert [entry["status"] for entry in read_audit_log(str(tmp_path / "audit.jsonl")) if entry["run_id"] == 2] == ["skipped"]
+
+def test_poll_timeout(tmp_path):
+    audit_log_path = str(tmp_path / "audit.jsonl")
+    job_alerter = FakeJobAlerter(terminate_after_polls=1000)
+    actions = Remediator(job_alerter, POLICIES, audit_log_path=audit_log_path, dry_run=False, poll_interval_s=0.01,
+                         poll_timeout_s=0.05).run(SCAN)
+    assert {a.status for a in actions if a.run_id != 4} == {"timed_out"}
+
+    # Timed out runs are retried, and failed polls are recorded
+    job_alerter.fail_polls = True
+    actions = Remediator(job_alerter, POLICIES, audit_log_path=audit_log_path, dry_run=False, poll_interval_s=0.01,
+                         poll_timeout_s=0.05).run(SCAN)
+    assert len(job_alerter.cancelled) == 2 * len(actions)
+    assert {(a.status, a.error) for a in actions if a.run_id != 4} == {("timed_out", "Poll failed: TEMPORARILY_UNAVAILABLE")}
+
+def test_large_batch_is_concurrent_and_rate_limited():
+    scan = {"https://a": [make_run(i, 30.0) for i in range(100)]}
+    job_alerter = FakeJobAlerter(wait_for_in_flight=16)
+    actions = Remediator(job_alerter, POLICIES, dry_run=False, max_workers=16, requests_per_second=1000.0,
+                         poll_interval_s=0.01).run(scan)
+    assert all(action.status == "cancelled" for action in actions)
+    assert job_alerter.max_in_flight == 16
+
+    # A burst of 40 calls, then 20 more at 40 per second (with the clock stopped, each waits for those before it)
+    scan = {"https://a": [make_run(i, 30.0) for i in range(60)]}
+    waits = []
+    sleep_lock = threading.Lock()
+    def sleep(seconds):
+        with sleep_lock:
+            waits.append(seconds)
+    Remediator(FakeJobAlerter(), POLICIES, dry_run=False, requests_per_second=40.0, poll_timeout_s=0,
+               clock=lambda: 0.0, sleep=sleep).run(scan)
+    assert sorted(waits) == pytest.approx([i / 40.0 for i in range(1, 21)])
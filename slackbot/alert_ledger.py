@@ -0,0 +1,152 @@
+import os
+from dataclasses import dataclass, field
+from utils import json_codec
+from utils.parsing_helpers import content_hash
+from utils.time_helpers import epoch_ms_now, hours_to_ms
+
+@dataclass
+class AlertDiff:
+    """Result of diffing one workspace's scan against the alert ledger."""
+    new: list[dict] = field(default_factory=list)       # Stuck runs not seen in the previous scan
+    escalated: list[dict] = field(default_factory=list) # Runs that crossed into a higher severity tier
+    updated: list[dict] = field(default_factory=list)   # Runs whose alert content changed (e.g. new cluster)
+    resolved: list[dict] = field(default_factory=list)  # Ledger records of runs no longer stuck
+    ongoing: list[dict] = field(default_factory=list)   # Runs that are still stuck with nothing new to report
+    digest_due: bool = False                            # Whether a periodic digest of ongoing runs should be sent
+
+    def has_notifications(self) -> bool:
+        return bool(self.new or self.escalated or self.updated or self.resolved or (self.digest_due and self.ongoing))
+
+class AlertLedger:
+    """
+    Persisted record of which stuck job runs have already been alerted on, keyed by (workspace, run_id).
+
+    Each scan is diffed against the previous one so that only new, escalated, updated and resolved runs
+    are notified, plus a periodic compact digest of ongoing ones. The ledger is stored as a JSON file
+    (e.g. on DBFS or a Unity Catalog volume) so that it survives across scheduled runs.
+    """
+    version = 1
+
+    # Fields that define an alert's content (excluding durations, which change on every scan). Runs flagged with
+    # enrichment_failed by JobAlerter (e.g. job tags or cluster info refused by the request budget) have defaults
+    # for some of them, so their content is not compared: they keep the hash (and job tags) of their last record.
+    content_fields = ["run_name", "creator_user_name", "run_page_url", "cluster_id", "cluster_name",
+                      "node_type_id", "driver_node_type_id", "job_tags"]
+
+    def __init__(self, path: str, severity_tiers_hrs: list[float], digest_interval_hrs: float = 6.0) -> None:
+        """
+        Args:
+            path: File path to persist the ledger to. Loaded on instantiation if it exists.
+            severity_tiers_hrs: Run duration thresholds (hours) for each severity tier, e.g. [2, 4, 8, 24].
+                                A run in tier N has been running longer than severity_tiers_hrs[N - 1].
+            digest_interval_hrs: Minimum time between digests of ongoing stuck runs per workspace.
+                                 A value <= 0 disables digests.
+        """
+        if not severity_tiers_hrs:
+            raise ValueError("AlertLedger: At least one severity tier must be given.")
+        self.path = path
+        self.severity_tiers_hrs = sorted(severity_tiers_hrs)
+        self.digest_interval_hrs = digest_interval_hrs
+        self.__workspaces = self.__load()
+
+    def severity_tier(self, hours: float) -> int:
+        """Return the severity tier (0 = below all tiers) for a given run duration in hours."""
+        tier = 0
+        for tier_hrs in self.severity_tiers_hrs:
+            if hours >= tier_hrs:
+                tier += 1
+        return tier
+
+    def update(self, job_runs_lists: dict[str, list[dict]], now_ms: int | None = None,
+               incomplete_workspaces: set[str] | None = None) -> dict[str, AlertDiff]:
+        """
+        Diff the given scan results (in the format outputted by JobAlerter.get_job_runs()) against the ledger,
+        update the ledger in memory and return the per-workspace diffs. Call save() to persist the new state.
+        Workspaces not present in job_runs_lists are left untouched.
+
+        For workspaces in incomplete_workspaces (see JobAlerter.incomplete_workspaces), whose scan did not list all
+        job runs, runs missing from the scan are not resolved: their previous records are kept.
+        """
+        now_ms = epoch_ms_now() if now_ms is None else now_ms
+        diffs = {}
+        for workspace_url, job_runs_list in job_runs_lists.items():
+            state = self.__workspaces.setdefault(workspace_url, {"last_digest_ms": now_ms, "runs": {}})
+            previous = state["runs"]
+            current = {}
+            diff = AlertDiff()
+            for run in job_runs_list:
+                key = str(run["run_id"])
+                old = previous.get(key)
+                degraded = bool(run.get("enrichment_failed"))
+                record = {
+                    "run_id": run["run_id"],
+                    "run_name": run.get("run_name", ""),
+                    "run_page_url": run.get("run_page_url", ""),
+                    "creator_user_name": run.get("creator_user_name", ""), # Kept to route the resolved alert
+                    "job_tags": run.get("job_tags", {}),
+                    "time_from_start_hours": run.get("time_from_start_hours", 0.0),
+                    "tier": self.severity_tier(run.get("time_from_start_hours", 0.0)),
+                    "hash": None if degraded else content_hash(run, self.content_fields),
+                    "first_seen_ms": now_ms,
+                    "last_notified_ms": now_ms,
+                }
+                if old is not None and (degraded or old["hash"] is None):
+                    # Nothing to compare (a degraded first record has no hash either): the run is not reported as
+                    # updated, and a degraded run keeps its last known content
+                    if degraded:
+                        record["hash"], record["job_tags"] = old["hash"], old["job_tags"]
+                    old = dict(old, hash=record["hash"])
+                if old is None:
+                    diff.new.append(run)
+                elif record["tier"] > old["tier"]:
+                    record["first_seen_ms"] = old["first_seen_ms"]
+                    diff.escalated.append(run)
+                elif record["hash"] != old["hash"]:
+                    record["first_seen_ms"] = old["first_seen_ms"]
+                    record["tier"] = max(record["tier"], old["tier"])
+                    diff.updated.append(run)
+                else:
+                    record["first_seen_ms"] = old["first_seen_ms"]
+                    record["last_notified_ms"] = old["last_notified_ms"]
+                    record["tier"] = old["tier"] # Never de-escalate (e.g. on clock skew)
+                    diff.ongoing.append(run)
+                current[key] = record
+
+            if incomplete_workspaces and workspace_url in incomplete_workspaces:
+                current.update((key, old) for key, old in previous.items() if key not in current)
+            else:
+                diff.resolved = [old for key, old in previous.items() if key not in current]
+
+            if self.digest_interval_hrs > 0 and diff.ongoing \
+                    and now_ms - state["last_digest_ms"] >= hours_to_ms(self.digest_interval_hrs):
+                diff.digest_due = True
+                state["last_digest_ms"] = now_ms
+
+            state["runs"] = current
+            diffs[workspace_url] = diff
+        return diffs
+
+    def save(self) -> None:
+        """Atomically persist the ledger to its file path."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json_codec.dumps({"version": self.version, "workspaces": self.__workspaces}))
+        os.replace(tmp_path, self.path)
+
+    def __load(self) -> dict:
+        """Load ledger state from disk. A missing, corrupt or incompatible file starts an empty ledger."""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "rb") as f:
+                data = json_codec.loads(f.read())
+        except (OSError, json_codec.JSONDecodeError) as e:
+            print(f"AlertLedger [WARNING]: Failed to load ledger from {self.path} ({e!r}). Starting from empty.")
+            return {}
+        if data.get("version") != self.version:
+            print(f"AlertLedger [WARNING]: Ledger version mismatch in {self.path}. Starting from empty.")
+            return {}
+        return data["workspaces"]
@@ -0,0 +1,83 @@
+import pytest
+from alert_ledger import AlertLedger
+
+HOUR_MS = 3600000
+
+def make_run(run_id, hours, cluster_id="c1"):
+    return {"run_id": run_id, "run_name": f"run_{run_id}", "run_page_url": f"https://x/run/{run_id}",
+            "creator_user_name": "a@b.com", "cluster_id": cluster_id, "job_tags": {},
+            "time_from_start_hours": hours}
+
+def test_severity_tier(tmp_path):
+    ledger = AlertLedger(str(tmp_path / "ledger.json"), severity_tiers_hrs=[8, 2, 4])
+    assert ledger.severity_tier(1.0) == 0
+    assert ledger.severity_tier(2.0) == 1
+    assert ledger.severity_tier(5.0) == 2
+    assert ledger.severity_tier(100.0) == 3
+
+def test_new_ongoing_escalated_resolved(tmp_path):
+    path = str(tmp_path / "ledger.json")
+    ledger = AlertLedger(path, severity_tiers_hrs=[2, 4], digest_interval_hrs=0)
+    diff = ledger.update({"ws": [make_run(1, 2.5), make_run(2, 3.0)]}, now_ms=0)["ws"]
+    assert [r["run_id"] for r in diff.new] == [1, 2]
+    ledger.save()
+
+    # Reload from disk: nothing changed, so nothing to notify
+    ledger = AlertLedger(path, severity_tiers_hrs=[2, 4], digest_interval_hrs=0)
+    diff = ledger.update({"ws": [make_run(1, 2.6), make_run(2, 3.1)]}, now_ms=HOUR_MS)["ws"]
+    assert not diff.has_notifications()
+    assert len(diff.ongoing) == 2
+
+    diff = ledger.update({"ws": [make_run(1, 4.5), make_run(3, 2.0, cluster_id="c2")]}, now_ms=2 * HOUR_MS)["ws"]
+    assert [r["run_id"] for r in diff.escalated] == [1]
+    assert [r["run_id"] for r in diff.new] == [3]
+    assert [r["run_id"] for r in diff.resolved] == [2]
+
+    diff = ledger.update({"ws": [make_run(1, 4.6), make_run(3, 2.1, cluster_id="c3")]}, now_ms=3 * HOUR_MS)["ws"]
+    assert [r["run_id"] for r in diff.updated] == [3]
+    assert [r["run_id"] for r in diff.ongoing] == [1]
+
+def test_degraded_enrichment_is_not_an_update(tmp_path):
+    ledger = AlertLedger(str(tmp_path / "ledger.json"), severity_tiers_hrs=[2], digest_interval_hrs=0)
+    healthy = {**make_run(1, 3.0), "job_tags": {"team": "x"}}
+    degraded = {**make_run(1, 3.0, cluster_id="Unspecified"), "enrichment_failed": True}
+    ledger.update({"ws": [healthy]}, now_ms=0)
+
+    # A scan whose enrichment was skipped (e.g. by the request budget), then a healthy one, update nothing
+    for run in [degraded, healthy]:
+        diff = ledger.update({"ws": [run]}, now_ms=HOUR_MS)["ws"]
+        assert not diff.has_notifications() and len(diff.ongoing) == 1
+
+    # A run first seen degraded gets its content hash from the next healthy scan, without an update either
+    ledger.update({"ws": [healthy, {**degraded, "run_id": 2}]}, now_ms=2 * HOUR_MS)
+    diff = ledger.update({"ws": [healthy, {**healthy, "run_id": 2}]}, now_ms=3 * HOUR_MS)["ws"]
+    assert not diff.has_notifications()
+    diff = ledger.update({"ws": [healthy, {**healthy, "run_id": 2, "cluster_id": "c2"}]}, now_ms=4 * HOUR_MS)["ws"]
+    assert [r["run_id"] for r in diff.updated] == [2]
+
+def test_incomplete_scan_resolves_nothing(tmp_path):
+    ledger = AlertLedger(str(tmp_path / "ledger.json"), severity_tiers_hrs=[2], digest_interval_hrs=0)
+    ledger.update({"ws": [make_run(1, 3.0), make_run(2, 3.0)]}, now_ms=0)
+
+    # A failed listing returns no runs: they are not resolved, and stay in the ledger
+    diff = ledger.update({"ws": []}, now_ms=HOUR_MS, incomplete_workspaces={"ws"})["ws"]
+    assert not diff.has_notifications()
+    diff = ledger.update({"ws": [make_run(1, 5.0)]}, now_ms=2 * HOUR_MS, incomplete_workspaces={"ws"})["ws"]
+    assert [r["run_id"] for r in diff.ongoing] == [1] and not diff.resolved
+
+    # Once a scan is complete again, runs missing from it are resolved
+    diff = ledger.update({"ws": [make_run(1, 6.0)]}, now_ms=3 * HOUR_MS, incomplete_workspaces=set())["ws"]
+    assert [r["run_id"] for r in diff.resolved] == [2]
+
+def test_digest_interval(tmp_path):
+    ledger = AlertLedger(str(tmp_path / "ledger.json"), severity_tiers_hrs=[2], digest_interval_hrs=6)
+    ledger.update({"ws": [make_run(1, 3.0)]}, now_ms=0)
+    assert not ledger.update({"ws": [make_run(1, 5.0)]}, now_ms=5 * HOUR_MS)["ws"].digest_due
+    assert ledger.update({"ws": [make_run(1, 6.0)]}, now_ms=6 * HOUR_MS)["ws"].digest_due
+    assert not ledger.update({"ws": [make_run(1, 7.0)]}, now_ms=7 * HOUR_MS)["ws"].digest_due
+
+def test_corrupt_file_starts_empty(tmp_path):
+    path = tmp_path / "ledger.json"
+    path.write_text("{not json")
+    ledger = AlertLedger(str(path), severity_tiers_hrs=[2])
+    assert len(ledger.update({"ws": [make_run(1, 3.0)]})["ws"].new) == 1
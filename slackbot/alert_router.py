@@ -0,0 +1,101 @@
+import dataclasses
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class RoutingRule:
+    """Sends the stuck job runs matching a selector to a Slack webhook."""
+    kind: str    # "tag", "creator" or "workspace"
+    value: str   # Tag key or "key:value", creator_user_name, or workspace URL
+    webhook: str
+
+class AlertRouter:
+    """
+    Routes stuck job runs to Slack webhooks based on their job tags, creator or workspace, so that each team
+    only sees its own runs. A run matching several rules is sent to each of their webhooks (once per webhook).
+    Runs matching no rule go to the default webhook, if any.
+
+    Rules are indexed by kind and value once on instantiation, so routing a run takes one lookup per tag
+    (plus its creator and workspace) regardless of the number of rules. Create one router per scan.
+    """
+    kinds = ("tag", "creator", "workspace")
+    diff_fields = ("new", "escalated", "updated", "resolved", "ongoing") # Run lists of an AlertDiff
+
+    def __init__(self, rules: list[RoutingRule], default_webhook: str | None = None) -> None:
+        """
+        Args:
+            rules: Routing rules. A "tag" rule's value matches runs whose job has a tag with that key (any value),
+                   or, given as "key:value", that exact tag.
+            default_webhook: Optional webhook for runs that match no rule. Also receives the headers of
+                             workspaces without stuck job runs.
+        """
+        self.rules = list(rules)
+        self.default_webhook = default_webhook
+        self.__index = {kind: {} for kind in self.kinds} # Kind -> value -> webhooks, in rule order
+        for rule in self.rules:
+            if rule.kind not in self.kinds:
+                raise ValueError(f"AlertRouter: Unknown rule kind '{rule.kind}'. Expected one of {self.kinds}.")
+            webhooks = self.__index[rule.kind].setdefault(rule.value, [])
+            if rule.webhook not in webhooks:
+                webhooks.append(rule.webhook)
+
+    @property
+    def webhooks(self) -> list[str]:
+        """All destination webhooks, in rule order, followed by the default webhook."""
+        webhooks = list(dict.fromkeys(rule.webhook for rule in self.rules))
+        if self.default_webhook and self.default_webhook not in webhooks:
+            webhooks.append(self.default_webhook)
+        return webhooks
+
+    def destinations(self, workspace_url: str, run: dict) -> list[str]:
+        """Return the webhooks a job run from the given workspace should be sent to."""
+        webhooks = []
+        candidates = [self.__index["workspace"].get(workspace_url, ()),
+                      self.__index["creator"].get(run.get("creator_user_name"), ())]
+        job_tags = run.get("job_tags")
+        if isinstance(job_tags, dict) and self.__index["tag"]:
+            for key, value in job_tags.items():
+                candidates.append(self.__index["tag"].get(key, ()))
+                if value != "":
+                    candidates.append(self.__index["tag"].get(f"{key}:{value}", ()))
+        for candidate in candidates:
+            for webhook in candidate:
+                if webhook not in webhooks:
+                    webhooks.append(webhook)
+        if not webhooks and self.default_webhook:
+            webhooks.append(self.default_webhook)
+        return webhooks
+
+    def route(self, job_runs_lists: dict[str, list[dict]]) -> dict[str, dict[str, list[dict]]]:
+        """
+        Split scan results (in the format outputted by JobAlerter.get_job_runs()) by destination webhook,
+        keeping the run order. Webhooks without runs are left out, except for the default webhook, which
+        gets every workspace (so that workspaces without stuck job runs are still reported).
+        """
+        routed = {self.default_webhook: {url: [] for url in job_runs_lists}} if self.default_webhook else {}
+        for workspace_url, job_runs_list in job_runs_lists.items():
+            for run in job_runs_list:
+                for webhook in self.destinations(workspace_url, run):
+                    routed.setdefault(webhook, {}).setdefault(workspace_url, []).append(run)
+        return routed
+
+    def route_alert_diffs(self, alert_diffs: dict) -> dict[str, dict]:
+        """
+        Split alert ledger diffs (see AlertLedger.update()) by destination webhook, like route().
+        Resolved runs are routed by the creator and tags recorded in the ledger.
+        """
+        routed = {}
+        for workspace_url, diff in alert_diffs.items():
+            def empty_diff():
+                # Same digest state as the workspace's diff, with the runs to be filled in per webhook
+                return dataclasses.replace(diff, **{name: [] for name in self.diff_fields})
+
+            if self.default_webhook:
+                routed.setdefault(self.default_webhook, {})[workspace_url] = empty_diff()
+            for name in self.diff_fields:
+                for run in getattr(diff, name):
+                    for webhook in self.destinations(workspace_url, run):
+                        webhook_diffs = routed.setdefault(webhook, {})
+                        if workspace_url not in webhook_diffs:
+                            webhook_diffs[workspace_url] = empty_diff()
+                        getattr(webhook_diffs[workspace_url], name).append(run)
+        return routed
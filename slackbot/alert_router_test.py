@@ -0,0 +1,78 @@
+import threading
+import pytest
+from alert_ledger import AlertDiff
+from alert_router import AlertRouter, RoutingRule
+from slackbot import Slackbot
+
+def make_run(run_id, creator="someone@example.com", job_tags=None):
+    return {"run_id": run_id, "run_name": f"r{run_id}", "run_page_url": "u", "creator_user_name": creator,
+            "cluster_url": "Unspecified", "cluster_name": "Unspecified", "cluster_id": "Unspecified",
+            "driver_node_type_id": "Unspecified", "node_type_id": "Unspecified", "job_tags": job_tags or {},
+            "time_from_start_hours": 3.0}
+
+@pytest.fixture
+def router():
+    return AlertRouter([RoutingRule("tag", "team:data", "data"),
+                        RoutingRule("tag", "oncall", "oncall"),
+                        RoutingRule("creator", "alice@example.com", "alice"),
+                        RoutingRule("workspace", "https://b", "workspace_b")],
+                       default_webhook="default")
+
+def test_destinations(router):
+    assert router.destinations("https://a", make_run(1, job_tags={"team": "data"})) == ["data"]
+    assert router.destinations("https://a", make_run(1, job_tags={"team": "web"})) == ["default"]
+    assert router.destinations("https://a", make_run(1, job_tags={"oncall": ""})) == ["oncall"]
+    assert router.destinations("https://b", make_run(1, "alice@example.com", {"team": "data"})) \
+        == ["workspace_b", "alice", "data"]
+    assert AlertRouter([]).destinations("https://a", make_run(1)) == []
+    assert router.webhooks == ["data", "oncall", "alice", "workspace_b", "default"]
+    with pytest.raises(ValueError):
+        AlertRouter([RoutingRule("owner", "x", "y")])
+
+def test_route(router):
+    runs = [make_run(1, job_tags={"team": "data"}), make_run(2), make_run(3, "alice@example.com", {"team": "data"})]
+    routed = router.route({"https://a": runs, "https://c": []})
+    assert routed == {"default": {"https://a": [runs[1]], "https://c": []},
+                      "data": {"https://a": [runs[0], runs[2]]},
+                      "alice": {"https://a": [runs[2]]}}
+
+def test_route_alert_diffs(router):
+    new, resolved = make_run(1, job_tags={"team": "data"}), make_run(2, "alice@example.com")
+    routed = router.route_alert_diffs({"https://a": AlertDiff(new=[new], resolved=[resolved], digest_due=True)})
+    assert routed["data"]["https://a"] == AlertDiff(new=[new], digest_due=True)
+    assert routed["alice"]["https://a"] == AlertDiff(resolved=[resolved], digest_due=True)
+    assert not routed["default"]["https://a"].has_notifications()
+
+class ConcurrentTransport:
+    """Holds each post until num_destinations posts are in flight at once (or a timeout, if posts are sequential)."""
+    def __init__(self, num_destinations):
+        self.num_destinations = num_destinations
+        self.posts = []
+        self.max_in_flight = 0
+        self.__in_flight = 0
+        self.__all_in_flight = threading.Event()
+        self.lock = threading.Lock()
+
+    def post(self, url, headers=None, data=None, json=None):
+        with self.lock:
+            self.__in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.__in_flight)
+            if self.__in_flight >= self.num_destinations:
+                self.__all_in_flight.set()
+        self.__all_in_flight.wait(timeout=1)
+        with self.lock:
+            self.__in_flight -= 1
+            self.posts.append(url)
+        return 200
+
+def test_post_routed_payloads_in_parallel(router):
+    transport = ConcurrentTransport(3)
+    slackbot = Slackbot("default", transport=transport)
+    runs = [make_run(1, job_tags={"team": "data"}), make_run(2, "alice@example.com"), make_run(3)]
+    routed_payloads = {webhook: slackbot.construct_workspace_payloads(job_runs_lists, 2.0)
+                       for webhook, job_runs_lists in router.route({"https://a": runs}).items()}
+    responses = slackbot.post_routed_payloads(routed_payloads)
+    assert sorted(responses) == ["alice", "data", "default"]
+    assert all(len(responses[webhook]["https://a"]) == 2 for webhook in responses) # Header and run
+    assert sorted(transport.posts) == ["alice"] * 2 + ["data"] * 2 + ["default"] * 2
+    assert transport.max_in_flight == 3 # Destinations are posted to concurrently, each one's messages in order
@@ -1,9 +1,13 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from utils import json_codec
+from utils.block_renderer import SlackBlockRenderer
+from utils.http_transport import HttpTransport
 
 class Slackbot:
     """Class to send stuck job alert information via incoming webhook."""
 
-    def __init__(self, webhook: str, unspecified_str: str = "Unspecified"):
+    def __init__(self, webhook: str, unspecified_str: str = "Unspecified", transport: HttpTransport | None = None):
         """
         Initialize using a given Slack incoming webhook URL.
         Webhook format: https://hooks.slack.com/services/ABCDEFG/1234567/xyz123foobar
@@ -11,11 +15,15 @@ class Slackbot:
         Note that there is no authentication needed to post using this URL.
         Also, note that the webhook should not be passed or stored in plain text, but
         instead stored/retrieved using Databricks Secrets or similar.
+
+        An optional transport (see utils/http_transport.py) can be given, e.g. to record or replay posts.
         """
         self.webhook = webhook
         self.divider_block = {"type": "divider"}
         self.unspecified_str = unspecified_str # Used to parse certain fields for the job run info blocks
         self.max_blocks_per_payload = 50 # Slack's imposed limit
+        self.renderer = SlackBlockRenderer(unspecified_str) # Compiled block templates with a render cache
+        self.transport = transport or HttpTransport()
 
     @staticmethod
     def tags_to_text(tags_dict: dict) -> str:
@@ -40,160 +48,112 @@ class Slackbot:
         }
         return payload
 
-    def construct_workspace_payloads(self, job_runs_lists: dict[str, dict[str, str]], run_duration_threshold_hrs: float) -> dict[str, list[dict]]:
+    def construct_workspace_payloads(self, job_runs_lists: dict[str, dict[str, str]], run_duration_threshold_hrs: float,
+                                     total_counts: dict[str, int] | None = None) -> dict[str, list[dict]]:
         """
         Construct Slack message payloads per workspace containing info for given job runs.
         Given job_runs_lists is assumed to be in the format outputted by StuckJobAlerter.
+        If total_counts (number of stuck job runs per workspace, e.g. JobAlerter.qualifying_run_counts after a
+        top_k scan) is given, a note on the number of runs not shown is added where runs were left out.
         """
         workspace_payloads = {}
         for workspace_url in job_runs_lists:
-            workspace_header_blocks = self.__construct_header_blocks(workspace_url, run_duration_threshold_hrs)
+            workspace_header_blocks = self.renderer.render_header_blocks(workspace_url, run_duration_threshold_hrs)
 
             payload_list = [self.blocks_to_payload(workspace_header_blocks)] # Use list of payloads instead of one big one to avoid Slack's 50 block per payload limit
             for job_run_dict in job_runs_lists[workspace_url]:
-                basic_info_block = self.__construct_basic_info_block(job_run_dict)
-                cluster_info_block = self.__construct_cluster_info_block(job_run_dict)
-                tags_block = self.__construct_tags_block(job_run_dict)
-                duration_block = self.__construct_duration_block(job_run_dict)
-                
-                job_run_blocks = [basic_info_block, cluster_info_block, duration_block, tags_block, self.divider_block]
-                job_run_payload = self.blocks_to_payload(job_run_blocks)
-                if len(job_run_payload["blocks"]) > self.max_blocks_per_payload:
-                    print(f"Slackbot [WARNING]: Job run with ID: {job_run_dict['run_id']} exceeds Slack's 50 block per payload limit. "
-                           "Will likely fail to post corresponding Slack message.")
-
-                payload_list.append(job_run_payload)
+                payload_list.extend(self.__construct_job_run_payloads(job_run_dict))
+
+            num_shown = len(job_runs_lists[workspace_url])
+            num_total = (total_counts or {}).get(workspace_url, num_shown)
+            if num_total > num_shown:
+                lines = [f"Showing the {num_shown} longest running of {num_total} job runs. "
+                         f"{num_total - num_shown} shorter running job runs are not shown."]
+                payload_list.extend(self.__construct_compact_list_payloads("Not shown", lines))
+
+            workspace_payloads[workspace_url] = payload_list
+        return workspace_payloads
+
+    def construct_alert_payloads(self, alert_diffs: dict, run_duration_threshold_hrs: float) -> dict[str, list[dict]]:
+        """
+        Construct Slack message payloads per workspace from alert ledger diffs (see AlertLedger.update()).
+        Only new, escalated, updated and resolved runs are rendered in full/compact form, plus a compact digest
+        of ongoing runs when one is due. Workspaces with nothing to notify are omitted.
+        """
+        workspace_payloads = {}
+        for workspace_url, diff in alert_diffs.items():
+            if not diff.has_notifications():
+                continue
+
+            payload_list = [self.blocks_to_payload(self.renderer.render_header_blocks(workspace_url, run_duration_threshold_hrs))]
+            for label, job_runs_list in [("New stuck run", diff.new), ("Escalated", diff.escalated), ("Updated", diff.updated)]:
+                for job_run_dict in job_runs_list:
+                    payload_list.extend(self.__construct_job_run_payloads(job_run_dict, label=label))
+
+            if diff.resolved:
+                lines = [f"• <{r['run_page_url']}|{r['run_name']}> (last seen at {r['time_from_start_hours']:.2f} hours)"
+                         for r in diff.resolved]
+                payload_list.extend(self.__construct_compact_list_payloads(f"Resolved ({len(lines)})", lines))
+
+            if diff.digest_due and diff.ongoing:
+                lines = [f"• <{r['run_page_url']}|{r['run_name']}> ({r['time_from_start_hours']:.2f} hours)"
+                         for r in diff.ongoing]
+                payload_list.extend(self.__construct_compact_list_payloads(f"Still running ({len(lines)})", lines))
 
             workspace_payloads[workspace_url] = payload_list
         return workspace_payloads
     
-    def post_workspace_payloads(self, workspace_payloads: dict[str, list[dict]]) -> dict[str, list[requests.Response]]:
+    def post_workspace_payloads(self, workspace_payloads: dict[str, list[dict]],
+                                webhook: str | None = None) -> dict[str, list[requests.Response]]:
         """
-        Posts the given workspace payloads using the stored Slack webhook.
+        Posts the given workspace payloads using the given webhook (or the stored Slack webhook by default).
         Returns a dictionary of the corresponding responses from Slack.
         """
         workspace_responses = {}
         for workspace_url in workspace_payloads:
-            responses = self.post_payloads(workspace_payloads[workspace_url])
+            responses = self.post_payloads(workspace_payloads[workspace_url], webhook)
             workspace_responses[workspace_url] = responses
         return workspace_responses
-    
-    def post_payloads(self, payloads: list[dict]) -> list[requests.Response]:
+
+    def post_routed_payloads(self, routed_payloads: dict[str, dict[str, list[dict]]],
+                             max_workers: int = 8) -> dict[str, dict[str, list[requests.Response]]]:
+        """
+        Posts workspace payloads per destination webhook (e.g. constructed from AlertRouter.route() output).
+        Destinations are posted to concurrently, so the total time is bounded by the slowest destination,
+        while each destination's messages are still posted in order.
+        Returns a dictionary of the corresponding responses from Slack per webhook.
+        """
+        if len(routed_payloads) <= 1 or max_workers <= 1:
+            return {webhook: self.post_workspace_payloads(workspace_payloads, webhook)
+                    for webhook, workspace_payloads in routed_payloads.items()}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(routed_payloads))) as executor:
+            futures = {webhook: executor.submit(self.post_workspace_payloads, workspace_payloads, webhook)
+                       for webhook, workspace_payloads in routed_payloads.items()}
+            return {webhook: future.result() for webhook, future in futures.items()}
+
+    def post_payloads(self, payloads: list[dict], webhook: str | None = None) -> list[requests.Response]:
         """
-        Posts the given payload information using the stored Slack webhook.
+        Posts the given payload information using the given webhook (or the stored Slack webhook by default).
         Note that Slack has a limit of max 50 blocks for a single payload (i.e., Slackbot message).
         """
         responses = []
         for payload in payloads:
-            response = requests.post(self.webhook, json=payload)
+            response = self.transport.post(webhook or self.webhook, data=json_codec.dumps(payload),
+                                           headers={"Content-Type": "application/json"})
             responses.append(response)
         return responses
 
-    def __construct_header_blocks(self, workspace_name: str, run_duration_threshold_hrs: float) -> list[dict]:
-        """
-        Construct Slack message header block containing info about the workspace and run duration threshold.
-        """
-        header_blocks = [
-            {
-                "type": "header",
-                "text": {
-                    "type": "plain_text",
-                    "text": f"Job runs longer than {run_duration_threshold_hrs:0.2f} hours",
-                }
-            },
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": f"*Workspace:* {workspace_name}"
-                }
-            },
-            self.divider_block
-        ]
-        return header_blocks
-
-    def __construct_basic_info_block(self, job_run_dict: dict) -> dict:
-        """
-        Construct Slack message block containing basic info about the job run.
-        """
-        basic_info_block = \
-        {
-            "type": "section",
-            "fields": [
-                {
-                    "type": "mrkdwn",
-                    "text": f"*Run name:*\n<{job_run_dict['run_page_url']}|{job_run_dict['run_name']}>"
-                },
-                {
-                    "type": "mrkdwn",
-                    "text": f"*Created by:*\n{job_run_dict['creator_user_name']}"
-                }
-            ]
-        }
-        return basic_info_block
-    
-    def __construct_cluster_info_block(self, job_run_dict: dict) -> dict:
-        """
-        Construct Slack message block containing info about the cluster used for the job run.
-        """
-        cluster_name_text = f"<{job_run_dict['cluster_url']}|{job_run_dict['cluster_name']}>"
-        cluster_id_text = f"<{job_run_dict['cluster_url']}|{job_run_dict['cluster_id']}>"
-        if job_run_dict['cluster_url'] == self.unspecified_str:
-            cluster_name_text = f"{job_run_dict['cluster_name']}"
-            cluster_id_text = f"{job_run_dict['cluster_id']}"
-
-        cluster_info_text = f"*Cluster info:*\nID: {cluster_id_text}\nDriver: {job_run_dict['driver_node_type_id']}\nWorker: {job_run_dict['node_type_id']}"
-
-        if job_run_dict['cluster_name'] == self.unspecified_str:
-            cluster_name_text = "Serverless"
-            cluster_id_text = job_run_dict['cluster_id']
-            cluster_info_text = f"*Cluster info:*\nN/A"
-
-        cluster_info_block = \
-        {
-            "type": "section",
-            "fields": [
-                {
-                    "type": "mrkdwn",
-                    "text": f"*Cluster name:*\n{cluster_name_text}"
-                },
-                {
-                    "type": "mrkdwn",
-                    "text": cluster_info_text
-                }
-            ]
-        }
-        return cluster_info_block
-    
-    def __construct_tags_block(self, job_run_dict: dict) -> dict:
-        """
-        Construct Slack message block containing info about the job run tags.
-        """
-        tags_text = self.tags_to_text(job_run_dict['job_tags'])
-        tags_block = \
-        {
-            "type": "section",
-            "fields": [
-                {
-                    "type": "mrkdwn",
-                    "text": f"*Tags:*\n{tags_text}"
-                }
-            ]
-        }
-        return tags_block
+    def __construct_job_run_payloads(self, job_run_dict: dict, label: str | None = None) -> list[dict]:
+        """
+        Construct the Slack message payload(s) for a single job run, optionally prefixed with a short label block.
+        Usually a single payload; runs whose blocks exceed Slack's per-message limits are split across several.
+        """
+        return self.renderer.render_run_payloads(job_run_dict, label=label)
 
-    def __construct_duration_block(self, job_run_dict: dict) -> dict:
+    def __construct_compact_list_payloads(self, title: str, lines: list[str]) -> list[dict]:
         """
-        Construct Slack message block containing info about the duration of the job run.
+        Construct Slack message payloads for a compact, titled bullet list (e.g. resolved runs or a digest).
         """
-        duration_block = \
-        {
-            "type": "section",
-            "fields": [
-                {
-                    "type": "mrkdwn",
-                    "text": f"*Duration:*\n{job_run_dict['time_from_start_hours']:.2f} hours"
-                }
-            ]
-        }
-        return duration_block
+        blocks = self.renderer.render_list_blocks(title, lines)
+        blocks.append(self.divider_block)
+        return self.renderer.pack_payloads(blocks)
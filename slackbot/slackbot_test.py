@@ -9,4 +9,27 @@ def test_blocks_to_payload():
     assert (Slackbot.blocks_to_payload([]) == {"blocks": []})
     assert (Slackbot.blocks_to_payload([{"type": "section", "text": {"type": "mrkdwn", "text": "Hello world"}}])
             == {"blocks": [{"type": "section", "text": {"type": "mrkdwn", "text": "Hello world"}}]})
-    
\ No newline at end of file
+    
+def test_construct_alert_payloads():
+    from alert_ledger import AlertDiff
+    run = {"run_id": 1, "run_name": "r", "run_page_url": "u", "creator_user_name": "c", "cluster_url": "Unspecified",
+           "cluster_name": "Unspecified", "cluster_id": "Unspecified", "driver_node_type_id": "Unspecified",
+           "node_type_id": "Unspecified", "job_tags": {}, "time_from_start_hours": 3.0}
+    slackbot = Slackbot("https://hooks.slack.com/services/test")
+    payloads = slackbot.construct_alert_payloads({"quiet": AlertDiff(ongoing=[run]),
+                                                  "busy": AlertDiff(new=[run], resolved=[run])}, 2.0)
+    assert list(payloads) == ["busy"]
+    assert len(payloads["busy"]) == 3 # Header, new run, resolved list
+    assert payloads["busy"][1]["blocks"][0]["elements"][0]["text"] == "*New stuck run*"
+    assert payloads["busy"][2]["blocks"][0]["text"]["text"].startswith("*Resolved (1):*")
+
+def test_construct_workspace_payloads_total_counts():
+    run = {"run_id": 1, "run_name": "r", "run_page_url": "u", "creator_user_name": "c", "cluster_url": "Unspecified",
+           "cluster_name": "Unspecified", "cluster_id": "Unspecified", "driver_node_type_id": "Unspecified",
+           "node_type_id": "Unspecified", "job_tags": {}, "time_from_start_hours": 3.0}
+    slackbot = Slackbot("https://hooks.slack.com/services/test")
+    assert len(slackbot.construct_workspace_payloads({"ws": [run]}, 2.0)["ws"]) == 2
+    payloads = slackbot.construct_workspace_payloads({"ws": [run], "all": [run]}, 2.0, total_counts={"ws": 7, "all": 1})
+    assert len(payloads["all"]) == 2
+    assert len(payloads["ws"]) == 3
+    assert "6 shorter running job runs are not shown" in payloads["ws"][2]["blocks"][0]["text"]["text"]
@@ -1,5 +1,16 @@
+import heapq
 import logging
-import requests
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from utils import json_codec
+from utils.adaptive_concurrency import AdaptiveConcurrency
+from utils.cluster_activity import ClusterActivityProbe
+from utils.http_transport import HedgedTransport, HttpTransport
+from utils.job_run_table import JobRunTable
+from utils.metadata_cache import MetadataCache
+from utils.node_type_catalog import NodeTypeCatalog
+from utils.request_budget import RequestBudget
+from utils.scan_checkpoint import ScanCheckpoint
 from utils.parsing_helpers import *
 from utils.time_helpers import *
 
@@ -13,13 +24,50 @@ class JobAlerter:
 
     def __init__(self, logger: logging.Logger, tokens: list[str]=["ABCDEFG1234"],
                  workspace_urls: list[str]=["https://myenv.cloud.databricks.com"],
-                 streaming_tag: str="streaming") -> None:
+                 streaming_tag: str="streaming", max_enrichment_workers: int=8,
+                 transport: HttpTransport | None=None, node_type_catalog: NodeTypeCatalog | None=None,
+                 metadata_cache: MetadataCache | None=None,
+                 cluster_activity_probe: ClusterActivityProbe | None=None, list_windows: int=1,
+                 request_budget: RequestBudget | None=None,
+                 adaptive_concurrency: AdaptiveConcurrency | None=None,
+                 scan_checkpoint: ScanCheckpoint | None=None) -> None:
         """
         Args:
             tokens: List of tokens for each workspace URL.
             workspace_urls: List of workspace URLs.
             streaming_tag: Job tag used to identify streaming jobs. Burden is on job
                            creator to populate this tag correctly.
+            max_enrichment_workers: Maximum number of job runs per workspace to enrich (with cluster, streaming
+                                    and tags info) concurrently. A value of 1 enriches runs sequentially.
+            transport: HTTP layer to use for REST API calls, e.g. to record or replay traffic
+                       (see utils/http_transport.py). Defaults to plain Requests calls. Hedges sent by a
+                       HedgedTransport count against request_budget and adaptive_concurrency like other calls.
+            node_type_catalog: Optional cache of each workspace's node types (see utils/node_type_catalog.py).
+                               If given, get_node_types() is served from it, and job runs with cluster info are
+                               annotated with their cluster's size and estimated cost.
+            metadata_cache: Optional (persistent) cache of job settings and cluster specs (see utils/metadata_cache.py),
+                            used by get_job_tags(), job_is_continuous() and get_cluster_info(). The caller is
+                            responsible for saving it.
+            cluster_activity_probe: Optional probe of recent cluster events (see utils/cluster_activity.py). If given,
+                                    job runs with cluster info are annotated with whether their cluster is active,
+                                    idle or thrashing (or had no recent events), reading the events of each
+                                    distinct cluster once.
+            list_windows: Number of start time windows to list job runs in concurrently. Pages of a single listing
+                          must be fetched one after the other (each page token comes from the previous page), so with
+                          a value > 1 the start time range is split into disjoint windows that are paginated in
+                          parallel (see __iter_job_runs_pages_windowed()). A value of 1 lists job runs serially.
+            request_budget: Optional per-scan, per-workspace budget of REST API calls (see utils/request_budget.py).
+                            Calls are counted per endpoint. Calls beyond the budget are not sent: enrichment is
+                            skipped first (runs keep default values for the missing fields), and listing stops last.
+            adaptive_concurrency: Optional per-workspace AIMD concurrency limits (see utils/adaptive_concurrency.py).
+                                  If given, REST API calls to each workspace wait for a slot under its limit, which
+                                  grows while calls succeed with stable latency and backs off on throttling (HTTP
+                                  429/503) or latency spikes. Runs are then enriched with up to max_limit workers.
+            scan_checkpoint: Optional checkpoint of scan progress (see utils/scan_checkpoint.py). If given, scans
+                             commit each processed page of job runs with the next page token (with serial listing),
+                             and each scanned workspace (unless its listing was cut short, e.g. by the request
+                             budget), so that a scan that died is resumed where it stopped.
+                             The caller is responsible for calling its finish() once the results have been used.
         """
         self.__logger = logger
 
@@ -40,6 +88,19 @@ class JobAlerter:
             self.__tokens[workspace_urls[i]] = {"Authorization": "Bearer {0}".format(tokens[i])}
         self.__workspace_urls = workspace_urls
         self.__api_version = "2.2"
+        self.__transport = transport or HttpTransport()
+        if isinstance(self.__transport, HedgedTransport):
+            self.__transport.hedge_admission = self.__admit_hedge
+        self.node_type_catalog = node_type_catalog
+        self.metadata_cache = metadata_cache
+        self.cluster_activity_probe = cluster_activity_probe
+        self.list_windows = max(1, list_windows)
+        self.min_list_window_ms = 60000 # Windows are not split any further than this
+        self.list_window_lookback_hours = 24.0 # Range split into windows when there is no previous scan to go by
+        self.__list_window_cuts = {} # Workspace URL -> start time quantiles of the last windowed listing
+        self.request_budget = request_budget
+        self.adaptive_concurrency = adaptive_concurrency
+        self.scan_checkpoint = scan_checkpoint
 
         # Define what fields to keep for "simplified" outputs
         # Note: not all of these fields are set for each cluster.
@@ -55,7 +116,19 @@ class JobAlerter:
         self.__simple_streaming_fields = ["continuous", "job_tags"]
 
         self.streaming_tag = streaming_tag # Necessary and sufficient job tag to identify streaming jobs
+        self.max_enrichment_workers = max(1, max_enrichment_workers)
         self.unspecified_str = "Unspecified" # Used as a placeholder for unset fields
+        # Number of job runs matching the listing filters in the last scan of each workspace (before top_k selection)
+        self.qualifying_run_counts = {}
+        # Workspaces whose last scan did not list all matching job runs (failed listing, exhausted request budget,
+        # limit or top_k reached), so that a run missing from their results may still be running
+        self.incomplete_workspaces = set()
+        self.__interrupted_listings = set() # Workspaces whose listing was cut short (e.g. by the request budget)
+
+    @property
+    def workspace_urls(self) -> list[str]:
+        """The workspace URLs this instance was created with (in order)."""
+        return list(self.__workspace_urls)
 
     @staticmethod
     def construct_cluster_url(cluster_id: str, workspace_url: str) -> str:
@@ -67,9 +140,12 @@ class JobAlerter:
 
     def get_node_types(self) -> dict[str, dict[str, str]]:
         """Returns a dictionary of node types for the clusters in each workspace."""
+        if self.node_type_catalog is not None:
+            return dict((url, {"node_types": list(self.__get_node_type_index(url).values())})
+                        for url in self.__workspace_urls)
         return dict((url, self.__get(url, "/clusters/list-node-types")) for url in self.__workspace_urls)
 
-    def get_cluster_info(self, cluster_id: str, simplified: bool=True) -> dict[str, str]:
+    def get_cluster_info(self, cluster_id: str, simplified: bool=True, version: str | None=None) -> dict[str, str]:
         """
         Returns a dictionary of json objects for the cluster with the given cluster_id.
         Assumes that the cluster_id is present in one of the workspace URLs.
@@ -77,7 +153,15 @@ class JobAlerter:
         Args:
             cluster_id: The cluster ID to search for.
             simplified: If True, return a simplified version of the cluster info output.
+                        Simplified outputs are served from the metadata cache, if one is set.
+            version: Optional current version of the cluster (e.g. the Spark context ID from a task's
+                     cluster_instance), which invalidates cached info stored for another version.
         """
+        if simplified and self.metadata_cache is not None:
+            cached_info = self.metadata_cache.get("cluster", cluster_id, version=version)
+            if cached_info is not None:
+                return dict(cached_info)
+
         cluster_info = {}
         for url in self.__workspace_urls:
             cluster_info = self.__get(url, "/clusters/get", json_params={"cluster_id": cluster_id})
@@ -95,6 +179,8 @@ class JobAlerter:
                     for field in self.__simple_cluster_fields:
                         if field in cluster_info:
                             simplified_info[field] = cluster_info[field]
+                    if self.metadata_cache is not None:
+                        self.metadata_cache.put("cluster", cluster_id, simplified_info, version=version)
                     return simplified_info
                 return cluster_info
         self.__logger.info("JobAlerter: Cluster ID not found in any of the known workspaces.")
@@ -128,9 +214,15 @@ class JobAlerter:
                 cluster_lists[url] = cluster_list
         return cluster_lists
 
-    def get_job_tags(self, job_id: str) -> dict[str, str]:
-        """Return a dictionary of the tags associated with a job."""
-        for url in self.__workspace_urls:
+    def get_job_tags(self, job_id: str, workspace_url: str | None=None) -> dict[str, str]:
+        """
+        Return a dictionary of the tags associated with a job.
+        If workspace_url is given (e.g. the workspace being scanned), the job is only looked up there.
+        """
+        if self.metadata_cache is not None:
+            return self.__get_job_metadata(job_id, workspace_url).get("tags", {})
+
+        for url in self.__job_lookup_urls(workspace_url):
             job_info = self.__get(url, "/jobs/get", json_params={"job_id": job_id})
             if job_info:
                 if "http_status_code" in job_info and job_info["http_status_code"] != 200:
@@ -146,16 +238,19 @@ class JobAlerter:
         self.__logger.info("JobAlerter: Job ID not found in any of the known workspaces.")
         return {}
 
-    def get_job(self, job_id: str, simplified: bool=True) -> dict[str, str]:
+    def get_job(self, job_id: str, simplified: bool=True, workspace_url: str | None=None) -> dict[str, str]:
         """
         Returns a dictionary of json objects for the job with the given job_id.
 
         Args:
             job_id: The job ID to search for. Assumed to be within one of the known workspaces.
             simplified: If True, return a simplified version of the job info output.
+            workspace_url: If given, only look the job up in this workspace (e.g. the one being scanned), so
+                           that calls are counted against its request budget and a job with the same ID in
+                           another workspace is not returned instead. Else, the known workspaces are tried in turn.
         """
         job_info = {}
-        for url in self.__workspace_urls:
+        for url in self.__job_lookup_urls(workspace_url):
             job_info = self.__get(url, "/jobs/get", json_params={"job_id": job_id})
             if job_info:
                 if "http_status_code" in job_info and job_info["http_status_code"] != 200:
@@ -169,11 +264,20 @@ class JobAlerter:
         self.__logger.info("JobAlerter: Job ID not found in any of the known workspaces.")
         return {}
 
-    def job_is_continuous(self, job_id: str) -> bool:
+    def job_is_continuous(self, job_id: str, workspace_url: str | None=None) -> bool:
         """
         Returns True if the job is a continuous (i.e., streaming) job.
+        If workspace_url is given (e.g. the workspace being scanned), the job is only looked up there.
         """
-        job_info = self.get_job(job_id, simplified=False)
+        if self.metadata_cache is not None:
+            job_metadata = self.__get_job_metadata(job_id, workspace_url)
+            if "continuous" in job_metadata:
+                return job_metadata["continuous"]
+            self.__logger.warning("JobAlerter: Unable to fetch necessary data for job id provided "
+                                  "(no 'settings' field); cannot determine if job is continuous.")
+            return False
+
+        job_info = self.get_job(job_id, simplified=False, workspace_url=workspace_url)
         if "settings" not in job_info:
             self.__logger.warning("JobAlerter: Unable to fetch necessary data for job id provided "
                                   "(no 'settings' field); cannot determine if job is continuous.")
@@ -212,28 +316,73 @@ class JobAlerter:
         (e.g. it was obtained via get_job_runs()).
         """
         durations = {}
+        next_suffix_lengths = {} # Run name -> number of "_" to try next, so duplicate names are not re-probed from 0
         for run in job_runs_list:
             if "time_from_start_hours" in run:
-                run_name = run["run_name"]
+                base_run_name = run["run_name"]
+                suffix_length = next_suffix_lengths.get(base_run_name, 0)
+                run_name = base_run_name + "_" * suffix_length
                 while run_name in durations:
                     run_name += "_" # Prevent overwriting existing keys
+                    suffix_length += 1
+                next_suffix_lengths[base_run_name] = suffix_length + 1
                 durations[run_name] = run["time_from_start_hours"]
         return durations
 
     def get_job_run(self, workspace_url: str, run_id: int, include_history: bool=False,
-                    include_resolved_values: bool=False) -> dict[str, str]:
-        """Wrapper for DB REST API function to get a single job run."""
-        job_run = self.__get(workspace_url, "/jobs/runs/get",
-                           json_params={"run_id": run_id, "include_history": str(include_history).lower(),
-                                        "include_resolved_values": str(include_resolved_values).lower()})
+                    include_resolved_values: bool=False, page_token: str | None=None,
+                    budgeted: bool=True) -> dict[str, str]:
+        """
+        Wrapper for DB REST API function to get a single job run.
+        Runs with many tasks or job clusters are paginated: pass the returned next_page_token as page_token
+        to get the next page of the tasks and job_clusters arrays.
+        If budgeted is False, the call is counted but never refused by the request budget (e.g. to poll runs
+        being cancelled after a scan that spent the budget).
+        """
+        json_params = {"run_id": run_id, "include_history": str(include_history).lower(),
+                       "include_resolved_values": str(include_resolved_values).lower()}
+        if page_token:
+            json_params["page_token"] = page_token
+        job_run = self.__get(workspace_url, "/jobs/runs/get", json_params=json_params, budgeted=budgeted)
         return job_run
+
+    def cancel_job_run(self, workspace_url: str, run_id: int) -> dict[str, str]:
+        """
+        Wrapper for DB REST API function to cancel a job run (and all of its active tasks).
+        Cancellation is asynchronous: the run may still be terminating when this returns (see get_job_run()).
+        """
+        return self.__post(workspace_url, "/jobs/runs/cancel", json_params={"run_id": run_id})
+
+    def iter_job_run_pages(self, workspace_url: str, run: dict[str, str]):
+        """
+        Yield the (tasks, job_clusters) arrays of a job run page by page, starting with the ones already present
+        in the given run (e.g. from /jobs/runs/list with expand_tasks) and following page tokens through
+        get_job_run() while the run has more. Pages are only fetched as the caller iterates, so stopping early
+        saves the remaining calls. Page tokens are chained, so pages of a single run are fetched sequentially.
+        """
+        yield run.get("tasks", []), run.get("job_clusters", [])
+
+        page_token = run.get("next_page_token")
+        if page_token is None and run.get("has_more"):
+            # Listed runs only flag that there is more: get the first page's token (repeats the first page's arrays)
+            page = self.get_job_run(workspace_url, run["run_id"])
+            page_token = page.get("next_page_token")
+        while page_token:
+            page = self.get_job_run(workspace_url, run["run_id"], page_token=page_token)
+            if page.get("http_status_code", 200) != 200:
+                self.__logger.warning(f"JobAlerter: Failed to get next page of job run {run['run_id']} in {workspace_url}.")
+                return
+            yield page.get("tasks", []), page.get("job_clusters", [])
+            page_token = page.get("next_page_token")
     
     def get_job_runs(self, active_runs_only: bool=True, older_than_hours: float=0.0, limit: int=20,
                      simplified_output: bool=False, expand_tasks: bool=True, add_cluster_info: bool=True,
-                     include_streaming_jobs: bool=False) -> dict[str, dict[str, str]]:
+                     include_streaming_jobs: bool=False, task_durations: bool=False,
+                     task_older_than_hours: float=0.0, top_k: int=0, as_table: bool=False,
+                     lazy_enrichment: bool=False) -> dict[str, dict[str, str]] | JobRunTable:
         """
         Returns a dict of list of json objects (dictionaries) for current job runs in each workspace.
-        Optionally adds cluster and streaming info for the runs.
+        Optionally adds cluster, streaming and task duration info for the runs.
 
         Note: job run durations are calculated based on the time since the start_time field from the REST API.
         - This method was chosen to ensure a reliable run duration calculation for all job runs, as it was observed that
@@ -249,7 +398,30 @@ class JobAlerter:
             simplified_output: If True, return a simplified version of the job runs list. Else, return all fields for each run.
             expand_tasks: Whether to get cluster and task details.
             add_cluster_info: Whether to add cluster info to each job run.
-            include_streaming_jobs: Whether to include streaming jobs in in returned output.
+            include_streaming_jobs: Whether to include streaming jobs in in returned output. Runs whose job tags could
+                                    not be fetched are kept, flagged with job_tags_unavailable (and enrichment_failed,
+                                    which also flags runs whose cluster info could not be fetched).
+            task_durations: Whether to add per-task durations and the longest running task to each job run
+                            (see add_task_durations_to_run()). Uses the task data already returned by the
+                            listing, so no extra API calls are made.
+            task_older_than_hours: If > 0, also return job runs with a task that has been running for more than
+                                   this many hours, even if the run itself is younger than older_than_hours
+                                   (e.g. to catch one hanging task in a long pipeline). Implies task_durations.
+            top_k: If > 0, return only the top_k longest running job runs per workspace (longest first). They are
+                   selected with a bounded heap while paginating, and only they are enriched, so API calls and
+                   memory scale with top_k rather than with the number of job runs. Streaming jobs are excluded
+                   before selection (unless include_streaming_jobs). The number of job runs that matched the
+                   listing filters is kept in qualifying_run_counts.
+                   Workspaces whose job runs were not all returned (e.g. because of a failed listing, the limit or
+                   top_k) are kept in incomplete_workspaces.
+            as_table: If True, return the job runs as a JobRunTable (see utils/job_run_table.py), which supports
+                      lookups by run ID, grouping and sorting by duration. The dict of lists is then available via
+                      its job_runs_lists property.
+            lazy_enrichment: If True (and expand_tasks), list job runs without their tasks (a much smaller payload),
+                             drop streaming runs (unless include_streaming_jobs) based on their job's tags, and only
+                             then get the tasks and job clusters of the remaining runs through get_job_run(). Runs
+                             are only hydrated if the output needs their tasks (add_cluster_info or task_durations).
+                             Saves most of the listing traffic when most active runs are young or streaming.
         """
         if limit <= 0:
             print("JobAlerter: Warning: No limit provided for job runs to fetch. This may take awhile.")
@@ -257,53 +429,257 @@ class JobAlerter:
 
         job_runs_lists = {}
         for url in self.__workspace_urls:
-            job_runs_list = []
-            try:
-                job_runs_list = self.__get_job_runs_list(url, active_runs_only, expand_tasks, older_than_hours, limit)
-            except KeyError as ke:
-                self.__logger.error("JobAlerter: Failed to get job runs from " + url + ". " \
-                                    "Check if the user has permission to access the job runs.")
-                job_runs_lists[url] = []
-                continue
+            job_runs_lists[url] = self.get_workspace_job_runs(
+                url, active_runs_only=active_runs_only, older_than_hours=older_than_hours, limit=limit,
+                simplified_output=simplified_output, expand_tasks=expand_tasks, add_cluster_info=add_cluster_info,
+                include_streaming_jobs=include_streaming_jobs, task_durations=task_durations,
+                task_older_than_hours=task_older_than_hours, top_k=top_k, lazy_enrichment=lazy_enrichment)
+        if as_table:
+            return JobRunTable.from_job_runs_lists(job_runs_lists)
+        return job_runs_lists
 
-            # Optionally augment default job run info (e.g. with cluster/streaming info)
-            job_runs_list_no_streaming = []
-            for run in job_runs_list:
-                if add_cluster_info:
-                    self.__add_cluster_info_to_run(run)
+    def get_workspace_job_runs(self, workspace_url: str, active_runs_only: bool=True, older_than_hours: float=0.0,
+                               limit: int=20, simplified_output: bool=False, expand_tasks: bool=True,
+                               add_cluster_info: bool=True, include_streaming_jobs: bool=False,
+                               task_durations: bool=False, task_older_than_hours: float=0.0,
+                               top_k: int=0, lazy_enrichment: bool=False) -> list[dict[str, str]]:
+        """
+        Same as get_job_runs(), but for a single workspace (e.g. to process each workspace as soon as it is scanned).
+        Returns the list of json objects (dictionaries) for current job runs in the given workspace.
+        """
+        url = workspace_url
+        self.incomplete_workspaces.discard(url)
+        self.__interrupted_listings.discard(url)
+        if self.request_budget is not None:
+            self.request_budget.start_scan(url)
 
-                # Add formatted duration fields
-                run["time_from_start"] = ms_since(run["start_time"])
-                run["time_from_start_hours"] = ms_to_hours(run["time_from_start"])
+        # Resume from the checkpoint of an interrupted scan with the same arguments, if any
+        checkpoint = self.scan_checkpoint
+        checkpoint_state = None
+        if checkpoint is not None:
+            checkpoint.open({"active_runs_only": active_runs_only, "older_than_hours": older_than_hours, "limit": limit,
+                             "simplified_output": simplified_output, "expand_tasks": expand_tasks,
+                             "add_cluster_info": add_cluster_info, "include_streaming_jobs": include_streaming_jobs,
+                             "task_durations": task_durations, "task_older_than_hours": task_older_than_hours,
+                             "top_k": top_k, "lazy_enrichment": lazy_enrichment})
+            checkpoint_state = checkpoint.workspace(url)
+            if checkpoint_state is not None and "scanned" in checkpoint_state["stages"]:
+                self.qualifying_run_counts[url] = checkpoint_state["num_runs"]
+                if "incomplete" in checkpoint_state["stages"]:
+                    self.incomplete_workspaces.add(url)
+                return self.__refresh_resumed_runs(checkpoint_state["runs"], older_than_hours, task_older_than_hours,
+                                                   task_durations or task_older_than_hours > 0, simplified_output)
+        # Pages can only be checkpointed (and resumed) with serial listing, which has a single page token
+        checkpoint_pages = checkpoint is not None and self.list_windows == 1 and top_k <= 0
+
+        task_durations = task_durations or task_older_than_hours > 0
+        list_older_than_hours = older_than_hours
+        if task_older_than_hours > 0:
+            # A run is at least as old as its tasks, so list with the lower threshold and filter after enrichment.
+            list_older_than_hours = min(older_than_hours, task_older_than_hours) if older_than_hours > 0 else 0.0
+        # Simplified runs lose their tasks, so the checkpoint keeps the few task fields needed to refresh their task
+        # durations when resumed (run ID -> compact tasks, until committed)
+        checkpoint_tasks = {} if checkpoint is not None and simplified_output and task_durations else None
+
+        # With lazy enrichment, runs are listed without tasks and only the ones that pass the filters are hydrated
+        hydrate_runs = lazy_enrichment and expand_tasks and (add_cluster_info or task_durations)
+        list_expand_tasks = expand_tasks and not lazy_enrichment
+
+        # In top_k mode (and with lazy enrichment), streaming runs are excluded before they are enriched (and
+        # before they can take a place among the top_k runs). Their tags are looked up once per job and reused
+        # during enrichment.
+        job_metadata_by_id = {}
+        admit_run = None
+        if (top_k > 0 or lazy_enrichment) and not include_streaming_jobs:
+            def admit_run(run: dict[str, str]) -> bool:
+                if run["job_id"] not in job_metadata_by_id:
+                    try:
+                        job_metadata_by_id[run["job_id"]] = self.__get_job_metadata(run["job_id"], url)
+                    except Exception as e:
+                        self.__logger.error(f"JobAlerter: Failed to get tags of job {run['job_id']}: {e!r}")
+                        job_metadata_by_id[run["job_id"]] = {}
+                job_metadata = job_metadata_by_id[run["job_id"]]
+                # Runs of jobs whose tags are unavailable are admitted: they are looked up again during enrichment
+                return not job_metadata or self.streaming_tag not in job_metadata["tags"]
 
-                # Add streaming info
-                run["continuous"] = self.job_is_continuous(run["job_id"])
-                run["job_tags"] = self.get_job_tags(run["job_id"])
-                if self.streaming_tag not in run["job_tags"]:
-                    job_runs_list_no_streaming.append(run)
+        def map_runs(func, job_runs_list: list, executor: ThreadPoolExecutor | None) -> list:
+            if executor is not None and len(job_runs_list) > 1:
+                return list(executor.map(func, job_runs_list))
+            return [func(run) for run in job_runs_list]
 
+        def process_job_runs(job_runs_list: list[dict[str, str]], executor: ThreadPoolExecutor | None) -> list[dict[str, str]]:
+            if lazy_enrichment:
+                if admit_run is not None and top_k <= 0:
+                    # Look up the tags of each job once (concurrently), then drop streaming runs before hydration
+                    first_run_by_job_id = {run["job_id"]: run for run in job_runs_list if run["job_id"] not in job_metadata_by_id}
+                    map_runs(admit_run, list(first_run_by_job_id.values()), executor)
+                    job_runs_list = [run for run in job_runs_list if admit_run(run)]
+                if hydrate_runs:
+                    map_runs(lambda run: self.__hydrate_run(url, run), job_runs_list, executor)
+
+            # Optionally augment default job run info (e.g. with cluster/streaming info), keeping the original run order
+            map_runs(lambda run: self.__enrich_run(url, run, add_cluster_info, job_metadata_by_id), job_runs_list, executor)
+
+            # Runs whose job tags are unavailable cannot be told apart from streaming runs: they are kept, flagged
+            # with job_tags_unavailable (see __enrich_run()), rather than dropped, so that stuck runs still alert
             if not include_streaming_jobs:
-                job_runs_list = job_runs_list_no_streaming
+                job_runs_list = [run for run in job_runs_list if self.streaming_tag not in run["job_tags"]]
+
+            if task_durations:
+                for run in job_runs_list:
+                    self.add_task_durations_to_run(run)
+            job_runs_list = self.__filter_by_task_durations(job_runs_list, older_than_hours, task_older_than_hours)
 
             # Optionally simplify initial job run info
+            if checkpoint_tasks is not None:
+                for run in job_runs_list:
+                    checkpoint_tasks[run["run_id"]] = self.__compact_tasks(run)
             if simplified_output:
                 job_runs_list = self.__simplify_job_runs_list(job_runs_list)
 
-            job_runs_lists[url] = job_runs_list
-
             # Add blank fields for unset cluster info fields
             if add_cluster_info:
-                for run in job_runs_lists[url]:
+                for run in job_runs_list:
                     for cluster_field in self.__simple_cluster_fields:
                         if cluster_field not in run:
                             run[cluster_field] = self.unspecified_str
-        return job_runs_lists
+            return job_runs_list
+
+        def runs_to_checkpoint(job_runs_list: list[dict[str, str]]) -> list[dict[str, str]]:
+            if checkpoint_tasks is None:
+                return job_runs_list
+            return [{**run, "tasks": checkpoint_tasks.pop(run["run_id"], [])} for run in job_runs_list]
+
+        # Job runs are processed page by page as they are listed, so that (with simplified_output) only one page of
+        # expanded runs, which can hold hundreds of tasks each, is in memory at a time.
+        job_runs_list = []
+        num_runs = 0
+        max_workers = self.max_enrichment_workers
+        if self.adaptive_concurrency is not None:
+            max_workers = max(max_workers, self.adaptive_concurrency.max_limit) # Concurrency is capped by the limiter
+        executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        try:
+            if top_k > 0:
+                top_runs, num_runs = self.__get_job_runs_list(
+                    url, active_runs_only, list_expand_tasks, list_older_than_hours, limit, top_k, admit_run)
+                job_runs_list = process_job_runs(top_runs, executor)
+                if num_runs > len(top_runs):
+                    self.incomplete_workspaces.add(url)
+            else:
+                page_token = None
+                if checkpoint_pages and checkpoint_state is not None:
+                    job_runs_list = self.__refresh_resumed_runs(checkpoint_state["runs"], older_than_hours,
+                                                                task_older_than_hours, task_durations, simplified_output)
+                    num_runs, page_token = checkpoint_state["num_runs"], checkpoint_state["page_token"]
+                if page_token is not None or not checkpoint_pages or checkpoint_state is None:
+                    for page_runs, next_page_token in self.__iter_job_runs_pages(
+                            url, active_runs_only, list_expand_tasks, list_older_than_hours, limit,
+                            page_token=page_token, num_runs=num_runs):
+                        num_runs += len(page_runs)
+                        page_runs = process_job_runs(page_runs, executor)
+                        job_runs_list.extend(page_runs)
+                        if checkpoint_pages:
+                            checkpoint.commit_page(url, runs_to_checkpoint(page_runs), num_runs, next_page_token)
+        except KeyError as ke:
+            self.__logger.error("JobAlerter: Failed to get job runs from " + url + ". " \
+                                "Check if the user has permission to access the job runs.")
+            self.incomplete_workspaces.add(url)
+            return []
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.qualifying_run_counts[url] = num_runs
+        # A listing cut short is not marked as scanned, so that a resumed scan lists the rest of the workspace
+        if checkpoint is not None and url not in self.__interrupted_listings:
+            if url in self.incomplete_workspaces: # E.g. limited, which holds for the resumed scan too
+                checkpoint.commit_stage(url, "incomplete")
+            checkpoint.commit_stage(url, "scanned", runs=[] if checkpoint_pages else runs_to_checkpoint(job_runs_list),
+                                    num_runs=num_runs)
+        return job_runs_list
+
+    @staticmethod
+    def add_task_durations_to_run(run: dict[str, str]) -> None:
+        """
+        Augment a given (expanded) job run in place with task-level duration info, in a single pass over its tasks:
+        - task_durations_hours: duration of each task by task key. Running tasks are measured up to now, finished
+          tasks from start to end. Tasks that have not started are omitted.
+        - longest_running_task_key / longest_running_task_hours: the currently running task that started first
+          (None / 0.0 if no task is running).
+        - running_task_count: the number of currently running tasks.
+        Only the tasks already present on the run are used (no API calls are made).
+        """
+        task_durations_hours = {}
+        longest_key = None
+        longest_ms = 0
+        running_count = 0
+        for task in run.get("tasks", []):
+            start_time = task.get("start_time", 0)
+            if not start_time:
+                continue
+            if task.get("status", {}).get("state") == "RUNNING":
+                duration_ms = ms_since(start_time)
+                running_count += 1
+                if longest_key is None or duration_ms > longest_ms:
+                    longest_key, longest_ms = task["task_key"], duration_ms
+            elif task.get("end_time"):
+                duration_ms = task["end_time"] - start_time
+            else:
+                duration_ms = task.get("setup_duration", 0) + task.get("execution_duration", 0) \
+                              + task.get("cleanup_duration", 0)
+            task_durations_hours[task["task_key"]] = ms_to_hours(duration_ms)
+
+        run["task_durations_hours"] = task_durations_hours
+        run["longest_running_task_key"] = longest_key
+        run["longest_running_task_hours"] = ms_to_hours(longest_ms)
+        run["running_task_count"] = running_count
 
     def __get_job_runs_list(self, workspace_url: str, active_runs_only: bool=True, expand_tasks: bool=True,
-                            older_than_hours: float=0.0, limit: int=20) -> list[dict[str, str]]:
+                            older_than_hours: float=0.0, limit: int=20, top_k: int=0,
+                            admit_run=None) -> tuple[list[dict[str, str]], int]:
         """
         Helper (e.g. for get_job_runs()) to paginate and return a list of json objects (dictionaries)
-        for all job runs in given workspace across multiple pages.
+        for all job runs in given workspace across multiple pages, along with the number of job runs that
+        matched the filters. See __iter_job_runs_pages() for the filters.
+
+        Args:
+            workspace_url: The workspace URL to get job runs from.
+            active_runs_only: If True, return only active job runs.
+            expand_tasks: Whether to get cluster and task details.
+            older_than_hours: If > 0, return only job runs that started more than this many hours ago.
+            limit: Maximum number of job runs to return. A value <=0 means no limit.
+            top_k: If > 0, return only the top_k longest running of the (up to limit) matching job runs, longest first.
+                   Only a bounded heap of top_k runs is kept in memory while paginating.
+            admit_run: Optional predicate that runs must satisfy to be among the top_k runs. Only called for runs
+                       that would currently rank among them.
+        """
+        job_runs_list = []
+        top_runs = [] # Min-heap of (-start_time, -index, run): the youngest of the top_k oldest runs is at the root
+        num_runs = 0
+        for page_runs, _ in self.__iter_job_runs_pages(workspace_url, active_runs_only, expand_tasks, older_than_hours, limit):
+            if top_k > 0:
+                for i, run in enumerate(page_runs, start=num_runs):
+                    entry = (-run["start_time"], -i, run)
+                    if len(top_runs) < top_k or entry[:2] > top_runs[0][:2]:
+                        if admit_run is None or admit_run(run):
+                            if len(top_runs) < top_k:
+                                heapq.heappush(top_runs, entry)
+                            else:
+                                heapq.heapreplace(top_runs, entry)
+            else:
+                job_runs_list.extend(page_runs)
+            num_runs += len(page_runs)
+
+        if top_k > 0:
+            job_runs_list = [run for _, _, run in sorted(top_runs, key=lambda entry: entry[:2], reverse=True)]
+        return job_runs_list, num_runs
+
+    def __iter_job_runs_pages(self, workspace_url: str, active_runs_only: bool=True, expand_tasks: bool=True,
+                              older_than_hours: float=0.0, limit: int=20, page_token: str | None=None,
+                              num_runs: int=0):
+        """
+        Helper to paginate through the job runs in given workspace, yielding the list of json objects (dictionaries)
+        for the job runs of each page that match the filters, along with the page token to continue listing from
+        (None once there are no more pages). Pages are only fetched as the caller iterates.
 
         Args:
             workspace_url: The workspace URL to get job runs from.
@@ -311,17 +687,33 @@ class JobAlerter:
             expand_tasks: Whether to get cluster and task details.
             older_than_hours: If > 0, return only job runs that started more than this many hours ago.
             limit: Maximum number of job runs to return. A value <=0 means no limit.
+            page_token: Optional page token to resume listing from (e.g. from a checkpoint). Not supported with
+                        windowed listing, which yields None page tokens.
+            num_runs: Number of job runs already listed before page_token (counted towards the limit).
         """
+        if self.list_windows > 1:
+            yield from self.__iter_job_runs_pages_windowed(workspace_url, active_runs_only, expand_tasks,
+                                                           older_than_hours, limit)
+            return
+
         REST_internal_limit = 25 # Internal limit for the jobs/runs/list call
         json_params = {"active_only": str(active_runs_only).lower(),
                        "limit": REST_internal_limit, "expand_tasks": str(expand_tasks).lower()}
 
+        if page_token:
+            json_params["page_token"] = page_token
+
         # Pagination loop to ensure all job runs are read
-        job_runs_list = []
         get_more_jobs = True
         while get_more_jobs:
             # Get info for all current job runs
             job_runs = self.__get(workspace_url, "/jobs/runs/list", json_params=json_params)
+            if self.__is_over_budget(job_runs):
+                self.__logger.warning(f"JobAlerter: Request budget exhausted in {workspace_url}. "
+                                      f"Stopped listing job runs after {num_runs} compliant job runs.")
+                self.incomplete_workspaces.add(workspace_url)
+                self.__interrupted_listings.add(workspace_url)
+                return
             job_runs_meta = {}
             meta_fields = ["http_status_code", "next_page_token", "prev_page_token"]
             for meta_field in meta_fields:
@@ -332,84 +724,321 @@ class JobAlerter:
             if get_more_jobs:
                 json_params["page_token"] = job_runs_meta["next_page_token"]
 
-            # Filter job runs based on status, if specified.
-            if active_runs_only:
-                job_runs["runs"] = list(filter(lambda x: x["status"]["state"] == "RUNNING", job_runs["runs"]))
+            job_runs["runs"] = self.__filter_job_runs(job_runs["runs"], active_runs_only, older_than_hours)
 
-            # Filter job runs based on current run duration, if specified.
-            if older_than_hours > 0:
-                job_runs["runs"] = list(filter(
-                    lambda x: ms_since(x["start_time"]) > hours_to_ms(older_than_hours),
-                    job_runs["runs"]
-                ))
-
-            if limit > 0 and len(job_runs_list) + len(job_runs["runs"]) > limit:
-                job_runs_list.extend(job_runs["runs"][:limit - len(job_runs_list)])
+            if limit > 0 and num_runs + len(job_runs["runs"]) > limit:
+                job_runs["runs"] = job_runs["runs"][:limit - num_runs]
                 get_more_jobs = False
-            else:
-                job_runs_list.extend(job_runs["runs"])
-            if len(job_runs_list) > 0:
-                self.__logger.info(f"JobAlerter: Found {len(job_runs_list)} compliant job runs so far.")
-        return job_runs_list
+                self.incomplete_workspaces.add(workspace_url)
+            num_runs += len(job_runs["runs"])
+            if num_runs > 0:
+                self.__logger.info(f"JobAlerter: Found {num_runs} compliant job runs so far.")
+            yield job_runs["runs"], json_params["page_token"] if get_more_jobs else None
+
+    def __iter_job_runs_pages_windowed(self, workspace_url: str, active_runs_only: bool=True, expand_tasks: bool=True,
+                                       older_than_hours: float=0.0, limit: int=20):
+        """
+        Same as __iter_job_runs_pages(), but paginates list_windows disjoint start time windows (start_time_from and
+        start_time_to) concurrently, yielding each page as soon as it arrives. Runs are deduplicated by run_id, as
+        adjacent windows share their boundary. With a limit, which runs make the limit depends on the page order.
+
+        Windows are sized adaptively: the initial windows hold equal numbers of runs in the previous listing of the
+        workspace (equal time spans within list_window_lookback_hours on the first listing, plus one window for all
+        older runs). The REST API lists runs by descending start time, so when a window has more pages and a worker
+        is idle, the rest of the window (up to the oldest start time seen so far) is split in two instead of
+        following its page token. Busy windows thus spread over all workers instead of paginating serially.
+        """
+        REST_internal_limit = 25 # Internal limit for the jobs/runs/list call
+        base_params = {"active_only": str(active_runs_only).lower(),
+                       "limit": REST_internal_limit, "expand_tasks": str(expand_tasks).lower()}
+        # Runs younger than older_than_hours are filtered by the REST API instead of being listed
+        start_time_to = epoch_ms_now() - hours_to_ms(older_than_hours) if older_than_hours > 0 else epoch_ms_now()
+        cuts = [cut for cut in self.__list_window_cuts.get(workspace_url, []) if cut < start_time_to]
+        if not cuts:
+            lookback_from = start_time_to - hours_to_ms(self.list_window_lookback_hours)
+            step = (start_time_to - lookback_from) // (self.list_windows - 1)
+            cuts = [lookback_from + i * step for i in range(self.list_windows - 1)]
+        bounds = [0] + cuts + [start_time_to]
+
+        def fetch_page(window: tuple[int, int], page_token: str | None) -> tuple[tuple[int, int], dict]:
+            json_params = {**base_params, "start_time_from": window[0], "start_time_to": window[1]}
+            if page_token:
+                json_params["page_token"] = page_token
+            return window, self.__get(workspace_url, "/jobs/runs/list", json_params=json_params)
+
+        executor = ThreadPoolExecutor(max_workers=self.list_windows)
+        try:
+            pending = {executor.submit(fetch_page, (bounds[i], bounds[i + 1]), None) for i in range(len(bounds) - 1)}
+            seen_run_ids = set()
+            start_times = []
+            num_runs = 0
+            limit_reached = False
+            while pending and not limit_reached:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    (window_from, window_to), job_runs = future.result()
+                    if self.__is_over_budget(job_runs):
+                        self.__logger.warning(f"JobAlerter: Request budget exhausted in {workspace_url}. "
+                                              f"Stopped listing job runs started in [{window_from}, {window_to}].")
+                        self.incomplete_workspaces.add(workspace_url)
+                        self.__interrupted_listings.add(workspace_url)
+                        continue
+                    if "runs" not in job_runs and job_runs.get("http_status_code") != 200:
+                        raise KeyError("runs") # Same as a failed serial listing (e.g. missing permissions)
+                    runs = job_runs.get("runs", [])
+
+                    if "next_page_token" in job_runs:
+                        oldest_listed = min((run["start_time"] for run in runs), default=window_to)
+                        if len(pending) < self.list_windows and oldest_listed - window_from > self.min_list_window_ms:
+                            middle = (window_from + oldest_listed) // 2
+                            pending.add(executor.submit(fetch_page, (window_from, middle), None))
+                            pending.add(executor.submit(fetch_page, (middle, oldest_listed), None))
+                        else:
+                            pending.add(executor.submit(fetch_page, (window_from, window_to), job_runs["next_page_token"]))
 
-    def __add_cluster_info_to_run(self, run: dict[str, str]) -> None:
-        """Helper to augment a given job run (in place) with cluster info."""
+                    runs = [run for run in self.__filter_job_runs(runs, active_runs_only, older_than_hours)
+                            if run["run_id"] not in seen_run_ids]
+                    seen_run_ids.update(run["run_id"] for run in runs)
+                    start_times.extend(run["start_time"] for run in runs)
+                    if limit > 0 and num_runs + len(runs) >= limit:
+                        if num_runs + len(runs) > limit or pending or len(done) > 1:
+                            self.incomplete_workspaces.add(workspace_url) # Other runs may be left unlisted
+                        runs = runs[:limit - num_runs]
+                        limit_reached = True
+                    num_runs += len(runs)
+                    if num_runs > 0:
+                        self.__logger.info(f"JobAlerter: Found {num_runs} compliant job runs so far.")
+                    yield runs, None
+                    if limit_reached:
+                        break
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+        # Size the next listing's windows to hold equal numbers of runs
+        start_times.sort()
+        self.__list_window_cuts[workspace_url] = sorted({start_times[len(start_times) * i // self.list_windows]
+                                                         for i in range(1, self.list_windows)}) if start_times else []
+
+    @staticmethod
+    def __filter_by_task_durations(job_runs_list: list[dict[str, str]], older_than_hours: float,
+                                   task_older_than_hours: float) -> list[dict[str, str]]:
+        """
+        Helper to keep the job runs older than older_than_hours or with a task running for more than
+        task_older_than_hours, if the latter is lower (runs are then listed with the lower threshold).
+        """
+        if task_older_than_hours <= 0 or not task_older_than_hours < older_than_hours:
+            return job_runs_list
+        return [run for run in job_runs_list
+                if run["time_from_start_hours"] > older_than_hours
+                or run["longest_running_task_hours"] > task_older_than_hours]
+
+    @staticmethod
+    def __compact_tasks(run: dict[str, str]) -> list[dict]:
+        """Helper to return the tasks of a job run with only the fields used by add_task_durations_to_run()."""
+        compact_tasks = []
+        for task in run.get("tasks", []):
+            if not task.get("start_time"):
+                continue
+            compact_task = {key: task[key] for key in ["task_key", "start_time", "end_time", "setup_duration",
+                                                       "execution_duration", "cleanup_duration"] if key in task}
+            compact_task["status"] = {"state": task.get("status", {}).get("state")}
+            compact_tasks.append(compact_task)
+        return compact_tasks
+
+    def __refresh_resumed_runs(self, job_runs_list: list[dict[str, str]], older_than_hours: float,
+                               task_older_than_hours: float, task_durations: bool,
+                               simplified_output: bool) -> list[dict[str, str]]:
+        """
+        Helper to update job runs restored from a checkpoint (in place) to the current time: their durations, task
+        durations and estimated cost so far. The task threshold is then applied again, as when they were scanned.
+        """
+        for run in job_runs_list:
+            if "start_time" in run and "time_from_start" in run:
+                run["time_from_start"] = ms_since(run["start_time"])
+                run["time_from_start_hours"] = ms_to_hours(run["time_from_start"])
+            if task_durations and "tasks" in run:
+                self.add_task_durations_to_run(run)
+                if simplified_output:
+                    del run["tasks"] # Compact tasks stored by the checkpoint only
+            if "estimated_cost_per_hour" in run and "time_from_start_hours" in run:
+                run["estimated_cost_so_far"] = round(run["estimated_cost_per_hour"] * run["time_from_start_hours"], 2)
+        return self.__filter_by_task_durations(job_runs_list, older_than_hours, task_older_than_hours)
+
+    def __hydrate_run(self, workspace_url: str, run: dict[str, str]) -> None:
+        """
+        Helper to add the tasks and job clusters of a job run listed without them (in place), via get_job_run().
+        Only the fields needed for enrichment are kept. Failures are logged, leaving the run without tasks.
+        """
+        try:
+            job_run = self.get_job_run(workspace_url, run["run_id"])
+        except Exception as e:
+            self.__logger.error(f"JobAlerter: Failed to get job run {run['run_id']} in {workspace_url}: {e!r}")
+            return
+        if job_run.get("http_status_code", 200) != 200:
+            self.__logger.warning(f"JobAlerter: Failed to get job run {run['run_id']} in {workspace_url}.")
+            return
+        for field in ["tasks", "job_clusters", "next_page_token"]:
+            if field in job_run:
+                run[field] = job_run[field]
+
+    def __enrich_run(self, workspace_url: str, run: dict[str, str], add_cluster_info: bool,
+                     job_metadata_by_id: dict | None=None) -> None:
+        """
+        Helper to augment a given job run (in place) with duration, streaming and (optionally) cluster info.
+        Failures are isolated to the run: they are logged, and the run keeps default values for the missing fields.
+        Runs whose enrichment failed or was skipped (e.g. by the request budget) are flagged with enrichment_failed,
+        and with job_tags_unavailable if their job's tags (and continuous flag) could not be fetched, so that they
+        are not mistaken for runs of untagged, non-streaming jobs.
+        Job metadata found in job_metadata_by_id (by job ID) is used instead of being looked up again.
+        """
+        # Add formatted duration fields
+        run["time_from_start"] = ms_since(run["start_time"])
+        run["time_from_start_hours"] = ms_to_hours(run["time_from_start"])
+        run["continuous"] = False
+        run["job_tags"] = {}
+
+        if add_cluster_info:
+            try:
+                self.__add_cluster_info_to_run(workspace_url, run)
+                if self.node_type_catalog is not None:
+                    self.node_type_catalog.annotate_run(run, self.__get_node_type_index(workspace_url))
+                if self.cluster_activity_probe is not None and run.get("cluster_id", "Unavailable") != "Unavailable":
+                    run.update(self.cluster_activity_probe.activity(
+                        workspace_url, run["cluster_id"], lambda request: self.__post(workspace_url, "/clusters/events", json_params=request)))
+            except Exception as e:
+                self.__logger.error(f"JobAlerter: Failed to add cluster info to job run {run.get('run_id')} in {workspace_url}: {e!r}")
+                run["enrichment_failed"] = True
+
+        # Add streaming info (also if the cluster info failed, as streaming runs are filtered out based on it)
+        job_metadata = job_metadata_by_id.get(run["job_id"]) if job_metadata_by_id else None
+        if not job_metadata:
+            try:
+                job_metadata = self.__get_job_metadata(run["job_id"], workspace_url)
+            except Exception as e:
+                self.__logger.error(f"JobAlerter: Failed to get job {run['job_id']} of job run {run.get('run_id')} in {workspace_url}: {e!r}")
+        if job_metadata:
+            run["continuous"] = job_metadata["continuous"]
+            run["job_tags"] = job_metadata["tags"]
+        else:
+            run["job_tags_unavailable"] = True
+            run["enrichment_failed"] = True
+
+    @staticmethod
+    def __filter_job_runs(job_runs: list[dict[str, str]], active_runs_only: bool=True,
+                          older_than_hours: float=0.0) -> list[dict[str, str]]:
+        """Helper to filter a page of job runs based on status and current run duration, if specified."""
+        if active_runs_only:
+            job_runs = [run for run in job_runs if run["status"]["state"] == "RUNNING"]
+
+        if older_than_hours > 0:
+            # Equivalent to ms_since(start_time) > hours_to_ms(older_than_hours), with the clock read once per page
+            start_time_cutoff = epoch_ms_now() - hours_to_ms(older_than_hours)
+            job_runs = [run for run in job_runs if run["start_time"] < start_time_cutoff]
+        return job_runs
+
+    def __add_cluster_info_to_run(self, workspace_url: str, run: dict[str, str]) -> None:
+        """
+        Helper to augment a given job run (in place) with cluster info.
+        Follows task/job cluster pagination of large runs, stopping at the first running task with a cluster.
+        """
 
         # Find the cluster info for the first currently running task
         if "tasks" in run:
             found_active_cluster = False
             job_cluster_key = None
-            for task in run["tasks"]:
-                if "job_cluster_key" in task:
-                    job_cluster_key = task["job_cluster_key"]
-                
-                if task["status"]["state"] == "RUNNING":
-                    running_task_name = task["task_key"]
-                    self.__logger.debug("JobAlerter: Running task: " + running_task_name)
-                    if "cluster_instance" in task:
-                        cluster_id = task["cluster_instance"]["cluster_id"]
-                        cluster_info = self.get_cluster_info(cluster_id, simplified=True)
-                        run.update(cluster_info)
-                        found_active_cluster = True
-                        break
+            job_clusters = []
+            for tasks, page_job_clusters in self.iter_job_run_pages(workspace_url, run):
+                job_clusters.extend(page_job_clusters)
+                for task in tasks:
+                    if "job_cluster_key" in task:
+                        job_cluster_key = task["job_cluster_key"]
+
+                    if task["status"]["state"] == "RUNNING":
+                        running_task_name = task["task_key"]
+                        self.__logger.debug("JobAlerter: Running task: " + running_task_name)
+                        if "cluster_instance" in task:
+                            cluster_id = task["cluster_instance"]["cluster_id"]
+                            cluster_info = self.get_cluster_info(
+                                cluster_id, simplified=True, version=task["cluster_instance"].get("spark_context_id"))
+                            if not cluster_info: # Failed, or refused by the request budget
+                                run["enrichment_failed"] = True
+                            run.update(cluster_info)
+                            found_active_cluster = True
+                            break
+                if found_active_cluster:
+                    break
 
             if not found_active_cluster and job_cluster_key:
                 # Run is likely queued or some similar reason, so no active cluster info is available.
                 # Fallback: get cluster info for inactive/unstarted job cluster if it's set.
-                if "job_clusters" in run:
-                    for job_cluster in run["job_clusters"]:
-                        if job_cluster["job_cluster_key"] == job_cluster_key \
-                                and "new_cluster" in job_cluster \
-                                and "node_type_id" in job_cluster["new_cluster"]:
-                            cluster_info = {
-                                "cluster_id": "Unavailable",
-                                "cluster_name": job_cluster_key,
-                                "node_type_id": job_cluster["new_cluster"]["node_type_id"],
-                                "driver_node_type_id": job_cluster["new_cluster"]["node_type_id"]
-                            }
-                            run.update(cluster_info)
+                for job_cluster in job_clusters:
+                    if job_cluster["job_cluster_key"] == job_cluster_key \
+                            and "new_cluster" in job_cluster \
+                            and "node_type_id" in job_cluster["new_cluster"]:
+                        cluster_info = {
+                            "cluster_id": "Unavailable",
+                            "cluster_name": job_cluster_key,
+                            "node_type_id": job_cluster["new_cluster"]["node_type_id"],
+                            "driver_node_type_id": job_cluster["new_cluster"]["node_type_id"]
+                        }
+                        run.update(cluster_info)
+
+    def __get_job_metadata(self, job_id: str, workspace_url: str | None=None) -> dict:
+        """
+        Helper to get the tags and continuous flag of a job from the metadata cache (if any), fetching the job (once
+        for both) if they are not cached. Returns an empty dictionary if the job or its settings could not be
+        fetched (e.g. the call failed or was refused by the request budget), as opposed to a job without tags.
+        Jobs looked up in a given workspace are cached per workspace, as job IDs are only unique within one.
+        """
+        cache_key = job_id if workspace_url is None else f"{workspace_url}#{job_id}"
+        job_metadata = self.metadata_cache.get("job", cache_key) if self.metadata_cache is not None else None
+        if job_metadata is None:
+            job_info = self.get_job(job_id, simplified=False, workspace_url=workspace_url)
+            if "settings" not in job_info:
+                return {}
+            job_metadata = {"tags": job_info["settings"].get("tags", {}),
+                            "continuous": "continuous" in job_info["settings"]}
+            if self.metadata_cache is not None:
+                self.metadata_cache.put("job", cache_key, job_metadata)
+        return job_metadata
 
-    def __get(self, url: str, endpoint: str, json_params: dict[str, str]={}) -> dict[str, str]:
-        """Wrapper for DB REST API GET, with optional result printing. URL should have no ending backslash (/)."""
+    def __job_lookup_urls(self, workspace_url: str | None) -> list[str]:
+        """Helper to get the workspaces to look a job up in: the given one (if any), else all known workspaces."""
+        return self.__workspace_urls if workspace_url is None else [workspace_url]
+
+    def __get_node_type_index(self, workspace_url: str) -> dict[str, dict]:
+        """Helper to get a workspace's node types by node_type_id from the catalog (listing them only if needed)."""
+        return self.node_type_catalog.node_types(workspace_url, lambda: self.__get(workspace_url, "/clusters/list-node-types"))
+
+    def __get(self, url: str, endpoint: str, json_params: dict[str, str]={}, budgeted: bool=True) -> dict[str, str]:
+        """
+        Wrapper for DB REST API GET, with optional result printing. URL should have no ending backslash (/).
+        Calls that are not budgeted are only counted by the request budget.
+        """
         if url not in self.__tokens:
             self.__logger.warning(f"JobAlerter: No token provided for workspace: {url}. Ensure this workspace URL "
                                    "is passed during instantiation.")
             return {}
+        if self.request_budget is not None:
+            if not budgeted:
+                self.request_budget.count(url, endpoint)
+            elif not self.request_budget.try_acquire(url, endpoint):
+                return self.__over_budget_response(endpoint)
         
         if json_params:
-            raw_results = requests.get(
+            raw_results = self.__send(url, lambda: self.__transport.get(
                 url + "/api/" + self.__api_version + endpoint,
                 headers=self.__tokens[url],
                 params=json_params,
-            )
+            ))
         else:
-            raw_results = requests.get(
+            raw_results = self.__send(url, lambda: self.__transport.get(
                 url + "/api/" + self.__api_version + endpoint,
                 headers=self.__tokens[url]
-            )
+            ))
         try:
-            results = raw_results.json() # Dict
-        except requests.exceptions.JSONDecodeError as jde:
+            results = json_codec.loads(raw_results.content) # Dict
+        except json_codec.JSONDecodeError as jde:
             self.__logger.warning("JobAlerter: Failed to decode response JSON. Check for 204 error (No Response) "
                                   "or invalid JSON in response.")
             return raw_results
@@ -425,13 +1054,19 @@ class JobAlerter:
             self.__logger.warning(f"JobAlerter: No token provided for workspace: {url}. Ensure this workspace URL "
                                    "is passed during instantiation.")
             return {}
+        if self.request_budget is not None and not self.request_budget.try_acquire(url, endpoint):
+            return self.__over_budget_response(endpoint)
         
-        raw_results = requests.post(
+        raw_results = self.__send(url, lambda: self.__transport.post(
             url + "/api/" + self.__api_version + endpoint,
             headers=self.__tokens[url],
             json=json_params,
-        )
-        results = raw_results.json()
+        ))
+        try:
+            results = json_codec.loads(raw_results.content) if raw_results.content else {}
+        except json_codec.JSONDecodeError as jde:
+            self.__logger.warning("JobAlerter: Failed to decode response JSON of POST " + endpoint + ".")
+            results = {}
 
         if results:
             results["http_status_code"] = raw_results.status_code
@@ -440,6 +1075,60 @@ class JobAlerter:
             # If results are empty, simply return status code.
             return {"http_status_code": raw_results.status_code}
 
+    def __send(self, url: str, request):
+        """Helper to make a REST API call (given as a function), within the workspace's adaptive concurrency limit."""
+        if self.adaptive_concurrency is None:
+            return request()
+        limiter = self.adaptive_concurrency.limiter(url)
+        ticket = limiter.acquire()
+        start = time.perf_counter()
+        throttled = True # Failed calls (e.g. timeouts) count as throttled
+        try:
+            raw_results = request()
+            throttled = raw_results.status_code in self.adaptive_concurrency.throttled_status_codes
+            return raw_results
+        finally:
+            limiter.release(ticket, time.perf_counter() - start, throttled=throttled)
+
+    def __admit_hedge(self, request_url: str):
+        """
+        Helper (see HedgedTransport.hedge_admission) to admit a hedge of a REST API call only if the workspace's
+        request budget and concurrency limit have room for another call, without waiting. Returns None if the
+        hedge is refused, else the function to call once it completes (releasing its concurrency slot).
+        """
+        url, _, endpoint = request_url.partition("/api/" + self.__api_version)
+        limiter = ticket = None
+        if self.adaptive_concurrency is not None:
+            limiter = self.adaptive_concurrency.limiter(url)
+            ticket = limiter.try_acquire()
+            if ticket is None:
+                return None
+        if self.request_budget is not None and not self.request_budget.try_acquire(url, endpoint):
+            if limiter is not None:
+                limiter.cancel(ticket)
+            return None
+
+        def finish(response, elapsed_s: float | None) -> None:
+            if limiter is None:
+                return
+            if elapsed_s is None: # Not sent
+                limiter.cancel(ticket)
+            else:
+                throttled = response is None or response.status_code in self.adaptive_concurrency.throttled_status_codes
+                limiter.release(ticket, elapsed_s, throttled=throttled)
+        return finish
+
+    @staticmethod
+    def __over_budget_response(endpoint: str) -> dict[str, str]:
+        """Helper to build the (error) response of a call that was not sent, as it is beyond the request budget."""
+        return {"error_code": RequestBudget.exhausted_error_code, "http_status_code": 429,
+                "message": f"Request budget exhausted; {endpoint} was not called."}
+
+    @staticmethod
+    def __is_over_budget(results: dict[str, str]) -> bool:
+        """Helper to check whether a response is that of a call that was not sent due to the request budget."""
+        return isinstance(results, dict) and results.get("error_code") == RequestBudget.exhausted_error_code
+
     def __check_workspace_urls(self, workspace_urls: list[str]) -> None:
         """Check whether a given list of workspace URLs are valid. If not, raise an appropriate exception."""
         workspace_urls_curated = self.__curate_workspace_urls(workspace_urls)
@@ -462,7 +1151,11 @@ class JobAlerter:
         """Return a simplified version of a given list (of dict) of job runs."""
         simple_fields = ["run_name", "creator_user_name", "run_page_url", "format", "run_type", "status", "job_id", "run_id",
                          "start_time", "setup_duration", "execution_duration", "cleanup_duration", "run_duration"]
-        custom_simple_fields = ["time_from_start", "time_from_start_hours"] # Fields not from REST API
+        custom_simple_fields = ["time_from_start", "time_from_start_hours", # Fields not from REST API
+                                "task_durations_hours", "longest_running_task_key", "longest_running_task_hours",
+                                "running_task_count", "node_cores", "node_memory_mb", "estimated_cost_per_hour",
+                                "estimated_cost_so_far", "cluster_activity", "cluster_resize_count",
+                                "cluster_last_event_hours", "enrichment_failed", "job_tags_unavailable"]
         simple_fields.extend(custom_simple_fields)
         simple_fields.extend(self.__simple_cluster_fields)
         simple_fields.extend(self.__simple_streaming_fields)
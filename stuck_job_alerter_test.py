@@ -0,0 +1,596 @@
+import logging
+import threading
+import time
+import pytest
+import requests
+from stuck_job_alerter import JobAlerter
+from utils import json_codec
+from utils.http_transport import HttpTransport
+from utils.time_helpers import epoch_ms_now
+
+WORKSPACE = "https://myenv.cloud.databricks.com"
+HOUR_MS = 3600000
+
+class FakeResponse:
+    def __init__(self, body: dict, status_code: int = 200):
+        self.content = json_codec.dumps(body)
+        self.status_code = status_code
+
+class FakeDatabricks(HttpTransport):
+    """Minimal in-memory stand-in for the Databricks REST API endpoints used by JobAlerter."""
+
+    def __init__(self, runs: list[dict], jobs: dict[int, dict], clusters: dict[str, dict] | None = None,
+                 delay_s: float = 0.0, page_size: int = 25, run_pages: dict[int, list[dict]] | None = None,
+                 node_types: list[dict] | None = None, cluster_events: dict[str, list[dict]] | None = None,
+                 capacity: int = 0):
+        self.runs = runs
+        self.run_pages = run_pages or {} # run_id -> /jobs/runs/get pages (tasks and job_clusters arrays)
+        self.jobs = jobs
+        self.clusters = clusters or {}
+        self.node_types = node_types or []
+        self.cluster_events = cluster_events or {} # Cluster ID -> events, most recent first
+        self.delay_s = delay_s
+        self.page_size = page_size
+        self.capacity = capacity # If > 0, GETs beyond this many in flight are throttled (HTTP 429)
+        self.throttled = 0
+        self.calls = []
+        self.bytes_sent = 0
+        self.max_in_flight = 0
+        self.__in_flight = 0
+        self.__lock = threading.Lock()
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        endpoint = url.split("/api/2.2", 1)[1]
+        params = params or {}
+        with self.__lock:
+            self.calls.append((endpoint, dict(params)))
+            self.__in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.__in_flight)
+            throttled = 0 < self.capacity < self.__in_flight
+            self.throttled += throttled
+        try:
+            time.sleep(self.delay_s)
+            response = FakeResponse({"error_code": "REQUEST_LIMIT_EXCEEDED"}, 429) if throttled else self.handle(endpoint, params)
+            with self.__lock:
+                self.bytes_sent += len(response.content)
+            return response
+        finally:
+            with self.__lock:
+                self.__in_flight -= 1
+
+    def post(self, url, headers=None, data=None, json=None, **kwargs):
+        endpoint = url.split("/api/2.2", 1)[1]
+        with self.__lock:
+            self.calls.append((endpoint, dict(json or {})))
+        if endpoint == "/jobs/runs/cancel":
+            run = next((run for run in self.runs if run["run_id"] == json["run_id"]), None)
+            if run is None:
+                return FakeResponse({"error_code": "RESOURCE_DOES_NOT_EXIST"}, 400)
+            run["status"] = {"state": "TERMINATED"}
+            return FakeResponse({})
+        if endpoint == "/clusters/events":
+            if json["cluster_id"] not in self.cluster_events:
+                return FakeResponse({"error_code": "INVALID_PARAMETER_VALUE"}, 400)
+            start = int(json.get("page_token", 0))
+            body = {"events": self.cluster_events[json["cluster_id"]][start:start + json["limit"]]}
+            if start + json["limit"] < len(self.cluster_events[json["cluster_id"]]):
+                body["next_page_token"] = str(start + json["limit"])
+            return FakeResponse(body)
+        return FakeResponse({"error_code": "ENDPOINT_NOT_FOUND"}, 404)
+
+    def handle(self, endpoint: str, params: dict) -> FakeResponse:
+        if endpoint == "/jobs/runs/list":
+            runs = self.runs
+            if "start_time_from" in params:
+                # Like the REST API, list runs by descending start time (other tests rely on the given order)
+                runs = sorted((run for run in runs if params["start_time_from"] <= run["start_time"] <= params["start_time_to"]),
+                              key=lambda run: run["start_time"], reverse=True)
+            if params.get("expand_tasks") == "false":
+                runs = [{key: value for key, value in run.items() if key not in ("tasks", "job_clusters")} for run in runs]
+            start = int(params.get("page_token", 0))
+            body = {"runs": runs[start:start + self.page_size]} if runs else {}
+            if start + self.page_size < len(runs):
+                body["next_page_token"] = str(start + self.page_size)
+            return FakeResponse(body)
+        if endpoint == "/jobs/runs/get":
+            if int(params["run_id"]) not in self.run_pages:
+                run = next((run for run in self.runs if run["run_id"] == int(params["run_id"])), None)
+                return FakeResponse(run) if run is not None else FakeResponse({"error_code": "RESOURCE_DOES_NOT_EXIST"}, 400)
+            pages = self.run_pages[int(params["run_id"])]
+            index = int(params.get("page_token", 0))
+            body = dict(pages[index])
+            if index + 1 < len(pages):
+                body["next_page_token"] = str(index + 1)
+            return FakeResponse(body)
+        if endpoint == "/jobs/get":
+            job = self.jobs.get(int(params["job_id"]))
+            if job is None:
+                return FakeResponse({"error_code": "RESOURCE_DOES_NOT_EXIST"}, 400)
+            if job == "raise":
+                raise requests.exceptions.ConnectionError("connection reset")
+            return FakeResponse(job)
+        if endpoint == "/clusters/get":
+            cluster = self.clusters.get(params["cluster_id"])
+            if cluster is None:
+                return FakeResponse({"error_code": "INVALID_PARAMETER_VALUE"}, 400)
+            return FakeResponse(cluster)
+        if endpoint == "/clusters/list-node-types":
+            return FakeResponse({"node_types": self.node_types})
+        return FakeResponse({"error_code": "ENDPOINT_NOT_FOUND"}, 404)
+
+    def count(self, endpoint: str) -> int:
+        return sum(1 for called_endpoint, _ in self.calls if called_endpoint == endpoint)
+
+def make_run(run_id: int, job_id: int, hours: float, state: str = "RUNNING", cluster_id: str | None = None) -> dict:
+    run = {"run_id": run_id, "job_id": job_id, "run_name": f"run_{run_id}", "creator_user_name": "a@b.com",
+           "run_page_url": f"{WORKSPACE}/#job/{job_id}/run/{run_id}", "status": {"state": state},
+           "start_time": epoch_ms_now() - int(hours * HOUR_MS)}
+    if cluster_id:
+        run["tasks"] = [{"task_key": "t0", "status": {"state": "RUNNING"}, "cluster_instance": {"cluster_id": cluster_id}}]
+    return run
+
+def make_job(job_id: int, tags: dict | None = None, continuous: bool = False) -> dict:
+    settings = {"name": f"job_{job_id}", "tags": tags or {}}
+    if continuous:
+        settings["continuous"] = {"pause_status": "UNPAUSED"}
+    return {"job_id": job_id, "settings": settings}
+
+def make_alerter(fake: FakeDatabricks, **kwargs) -> JobAlerter:
+    return JobAlerter(logging.getLogger(__name__), ["token"], [WORKSPACE], transport=fake, **kwargs)
+
+def test_get_job_runs_filters_and_simplifies():
+    fake = FakeDatabricks(
+        runs=[make_run(1, 10, 5.0, cluster_id="c1"), make_run(2, 20, 1.0), make_run(3, 30, 6.0),
+              make_run(4, 10, 7.0, state="QUEUED")],
+        jobs={10: make_job(10, {"team": "x"}), 20: make_job(20), 30: make_job(30, {"streaming": ""}, continuous=True)},
+        clusters={"c1": {"cluster_id": "c1", "cluster_name": "cluster one", "num_workers": 2, "spark_version": "x"}})
+    job_runs_lists = make_alerter(fake).get_job_runs(older_than_hours=2.0, limit=100, simplified_output=True)
+
+    runs = job_runs_lists[WORKSPACE]
+    assert [run["run_id"] for run in runs] == [1]
+    assert runs[0]["job_tags"] == {"team": "x"}
+    assert runs[0]["cluster_name"] == "cluster one"
+    assert runs[0]["cluster_url"] == WORKSPACE + "/compute/clusters/c1"
+    assert runs[0]["node_type_id"] == "Unspecified"
+    assert "spark_version" not in runs[0]
+    assert abs(runs[0]["time_from_start_hours"] - 5.0) < 0.01
+
+    table = make_alerter(fake).get_job_runs(older_than_hours=2.0, limit=100, simplified_output=True, as_table=True)
+    assert [run["run_id"] for run in table.job_runs_lists[WORKSPACE]] == [1]
+    assert table.get_run(1)["cluster_name"] == "cluster one"
+
+def test_parallel_enrichment_keeps_order_and_isolates_failures():
+    runs = [make_run(i, i, 3.0 + i) for i in range(12)]
+    jobs = {i: make_job(i, {"index": str(i)}) for i in range(12)}
+    jobs[5] = "raise"
+    fake = FakeDatabricks(runs=runs, jobs=jobs, delay_s=0.01)
+
+    job_runs = make_alerter(fake, max_enrichment_workers=4).get_job_runs(limit=100, add_cluster_info=False)[WORKSPACE]
+    assert [run["run_id"] for run in job_runs] == list(range(12))
+    assert job_runs[5]["job_tags"] == {} and job_runs[5]["job_tags_unavailable"] and job_runs[5]["enrichment_failed"]
+    assert job_runs[6]["job_tags"] == {"index": "6"} and "enrichment_failed" not in job_runs[6]
+    assert 1 < fake.max_in_flight <= 4
+
+def test_record_and_replay_scan(tmp_path):
+    from utils.http_transport import RecordingTransport, ReplayTransport
+    fake = FakeDatabricks(runs=[make_run(i, i, 3.0, cluster_id="c1") for i in range(30)],
+                          jobs={i: make_job(i, {"index": str(i)}) for i in range(30)},
+                          clusters={"c1": {"cluster_id": "c1", "cluster_name": "cluster one"}})
+    recorder = RecordingTransport(str(tmp_path / "scan.jsonl.gz"), inner=fake)
+    recorded = make_alerter(recorder).get_job_runs(limit=100, simplified_output=True)
+    recorder.save()
+
+    replayed = make_alerter(ReplayTransport(str(tmp_path / "scan.jsonl.gz"))).get_job_runs(limit=100, simplified_output=True)
+    strip = lambda runs: [{k: v for k, v in run.items() if not k.startswith("time_from_start")} for run in runs]
+    assert strip(replayed[WORKSPACE]) == strip(recorded[WORKSPACE])
+
+def test_cluster_info_follows_task_pages():
+    def task(i, state, cluster_id=None):
+        task = {"task_key": f"t{i}", "status": {"state": state}, "job_cluster_key": f"jc{i % 2}"}
+        if cluster_id:
+            task["cluster_instance"] = {"cluster_id": cluster_id}
+        return task
+
+    pages = [{"tasks": [task(i, "TERMINATED") for i in range(100)]},
+             {"tasks": [task(i, "TERMINATED") for i in range(100, 200)]},
+             {"tasks": [task(200, "RUNNING", "c1")] + [task(i, "BLOCKED") for i in range(201, 300)]},
+             {"tasks": [task(300, "BLOCKED")]}]
+    queued_pages = [{"tasks": [task(0, "TERMINATED")]}, {"tasks": [task(1, "BLOCKED")],
+                    "job_clusters": [{"job_cluster_key": "jc1", "new_cluster": {"node_type_id": "m5d.large"}}]}]
+    running = make_run(1, 10, 5.0)
+    running.update(tasks=pages[0]["tasks"], has_more=True)
+    queued = make_run(2, 10, 5.0)
+    queued.update(tasks=queued_pages[0]["tasks"], has_more=True)
+    fake = FakeDatabricks(runs=[running, queued], jobs={10: make_job(10)}, run_pages={1: pages, 2: queued_pages},
+                          clusters={"c1": {"cluster_id": "c1", "cluster_name": "cluster one"}})
+
+    job_runs = make_alerter(fake).get_job_runs(limit=100)[WORKSPACE]
+    assert job_runs[0]["cluster_name"] == "cluster one"
+    assert job_runs[1]["cluster_name"] == "jc1"
+    assert job_runs[1]["node_type_id"] == "m5d.large"
+    page_tokens = [params.get("page_token") for endpoint, params in fake.calls
+                   if endpoint == "/jobs/runs/get" and params["run_id"] == 1]
+    assert page_tokens == [None, "1", "2"] # Stops before the last page
+
+def test_task_durations_and_task_threshold():
+    def task(key, state, hours_ago, end_hours_ago=None):
+        task = {"task_key": key, "status": {"state": state}, "start_time": epoch_ms_now() - int(hours_ago * HOUR_MS)}
+        if end_hours_ago is not None:
+            task["end_time"] = epoch_ms_now() - int(end_hours_ago * HOUR_MS)
+        return task
+
+    hanging = make_run(1, 10, 3.0)
+    hanging["tasks"] = [task("a", "TERMINATED", 3.0, 2.5), task("b", "RUNNING", 2.5), task("c", "RUNNING", 0.5),
+                        {"task_key": "d", "status": {"state": "BLOCKED"}}]
+    healthy = make_run(2, 10, 3.0)
+    healthy["tasks"] = [task("a", "RUNNING", 0.2)]
+    old = make_run(3, 10, 7.0)
+    fake = FakeDatabricks(runs=[hanging, healthy, old], jobs={10: make_job(10)})
+
+    job_runs = make_alerter(fake).get_job_runs(older_than_hours=6.0, task_older_than_hours=2.0, limit=100,
+                                               add_cluster_info=False, simplified_output=True)[WORKSPACE]
+    assert [run["run_id"] for run in job_runs] == [1, 3]
+    assert job_runs[0]["longest_running_task_key"] == "b"
+    assert abs(job_runs[0]["longest_running_task_hours"] - 2.5) < 0.01
+    assert job_runs[0]["running_task_count"] == 2
+    assert sorted(job_runs[0]["task_durations_hours"]) == ["a", "b", "c"]
+    assert abs(job_runs[0]["task_durations_hours"]["a"] - 0.5) < 0.01
+    assert job_runs[1]["longest_running_task_key"] is None
+    assert fake.count("/jobs/runs/get") == 0
+
+def test_parse_job_run_durations_duplicate_names():
+    runs = [{"run_name": name, "time_from_start_hours": float(i)} for i, name in enumerate(["a", "a_", "a", "a", "b"])]
+    runs.append({"run_name": "c"}) # No duration
+    assert make_alerter(FakeDatabricks([], {})).parse_job_run_durations(runs) \
+        == {"a": 0.0, "a_": 1.0, "a__": 2.0, "a___": 3.0, "b": 4.0}
+
+def test_node_type_catalog_annotates_cost(tmp_path):
+    from utils.node_type_catalog import NodeTypeCatalog
+    fake = FakeDatabricks(
+        runs=[make_run(i, 10, 4.0, cluster_id="c1") for i in range(5)], jobs={10: make_job(10)},
+        clusters={"c1": {"cluster_id": "c1", "node_type_id": "m5d.large", "driver_node_type_id": "m5d.large",
+                         "num_workers": 1, "cluster_cores": 4.0}},
+        node_types=[{"node_type_id": "m5d.large", "num_cores": 2.0, "memory_mb": 8192}])
+    catalog = NodeTypeCatalog(str(tmp_path / "node_types.json"), cost_per_core_hour=0.25)
+    job_alerter = make_alerter(fake, node_type_catalog=catalog)
+
+    job_runs = job_alerter.get_job_runs(limit=100, simplified_output=True)[WORKSPACE]
+    assert [run["estimated_cost_per_hour"] for run in job_runs] == [1.0] * 5
+    assert abs(job_runs[0]["estimated_cost_so_far"] - 4.0) < 0.01
+    assert job_runs[0]["node_memory_mb"] == 8192
+    assert job_alerter.get_node_types()[WORKSPACE]["node_types"][0]["node_type_id"] == "m5d.large"
+    assert fake.count("/clusters/list-node-types") == 1
+
+def test_cluster_activity_probe_once_per_cluster():
+    from utils.cluster_activity import ClusterActivityProbe
+    now_ms = epoch_ms_now()
+    fake = FakeDatabricks(
+        runs=[make_run(i, 10, 4.0, cluster_id=f"c{i % 2}") for i in range(6)]
+             + [make_run(6, 10, 4.0, cluster_id="gone"), make_run(7, 10, 4.0, cluster_id="quiet")],
+        jobs={10: make_job(10)},
+        clusters={cluster_id: {"cluster_id": cluster_id} for cluster_id in ["c0", "c1", "gone", "quiet"]},
+        cluster_events={"c0": [{"timestamp": now_ms - 60000, "type": "UPSIZE_COMPLETED"}] * 3,
+                        "c1": [{"timestamp": now_ms - 7200000, "type": "DRIVER_NOT_RESPONDING"}], "quiet": []})
+    job_alerter = make_alerter(fake, cluster_activity_probe=ClusterActivityProbe(window_hours=4.0, page_size=2))
+
+    job_runs = job_alerter.get_job_runs(limit=100, simplified_output=True)[WORKSPACE]
+    assert [run["cluster_activity"] for run in job_runs] == ["active", "idle"] * 3 + ["unknown", "no_recent_events"]
+    assert job_runs[1]["cluster_last_event_hours"] == 2.0
+    assert fake.count("/clusters/events") == 2 + 1 + 1 + 1 # Two pages for c0, one for c1, "gone" (failed) and "quiet"
+    events_request = next(params for endpoint, params in fake.calls if endpoint == "/clusters/events")
+    assert now_ms - 4 * HOUR_MS - 1000 <= events_request["start_time"] <= now_ms - 4 * HOUR_MS + 1000
+
+def test_windowed_listing_is_parallel_and_complete():
+    import random
+    rng = random.Random(0)
+    # Mostly recent runs, plus a few very old ones (older than the initial windows' lookback)
+    runs = [make_run(i, 10, rng.uniform(2.0, 6.0) if i % 50 else rng.uniform(100.0, 500.0)) for i in range(500)]
+    runs.append(dict(runs[0], run_id=10000, start_time=runs[1]["start_time"])) # Same start time as another run
+    fake = FakeDatabricks(runs=runs, jobs={10: make_job(10)})
+    serial = make_alerter(fake).get_job_runs(older_than_hours=3.0, limit=0, add_cluster_info=False)[WORKSPACE]
+    job_alerter = make_alerter(fake, list_windows=8)
+    windowed = job_alerter.get_job_runs(older_than_hours=3.0, limit=0, add_cluster_info=False)[WORKSPACE]
+    assert sorted(run["run_id"] for run in windowed) == sorted(run["run_id"] for run in serial)
+    assert len(windowed) == len({run["run_id"] for run in windowed})
+    list_params = [params for endpoint, params in fake.calls if endpoint == "/jobs/runs/list" and "start_time_to" in params]
+    assert list_params and all(params["start_time_to"] <= epoch_ms_now() - 3 * HOUR_MS for params in list_params)
+
+    # The windows are listed concurrently (a single run is enriched, so the requests in flight are listings)
+    fake.delay_s = 0.01
+    scan_kwargs = {"older_than_hours": 3.0, "limit": 0, "add_cluster_info": False, "include_streaming_jobs": True, "top_k": 1}
+    fake.max_in_flight = 0
+    serial_oldest = make_alerter(fake).get_job_runs(**scan_kwargs)[WORKSPACE]
+    assert fake.max_in_flight == 1
+    windowed_oldest = job_alerter.get_job_runs(**scan_kwargs)[WORKSPACE]
+    assert windowed_oldest[0]["run_id"] == serial_oldest[0]["run_id"]
+    assert fake.max_in_flight > 1
+
+    # Later listings start from windows holding equal numbers of runs in the previous listing
+    fake.delay_s = 0.0
+    assert len(job_alerter.get_job_runs(older_than_hours=3.0, limit=0, add_cluster_info=False)[WORKSPACE]) == len(serial)
+    assert job_alerter.incomplete_workspaces == set()
+    assert len(job_alerter.get_job_runs(older_than_hours=3.0, limit=30, add_cluster_info=False)[WORKSPACE]) == 30
+    assert job_alerter.incomplete_workspaces == {WORKSPACE}
+
+def test_lazy_enrichment_hydrates_survivors_only():
+    # 10 old runs (2 of them streaming) among 90 young ones, with 50 tasks each
+    runs = [make_run(i, i % 10, 5.0 if i < 10 else 0.5, cluster_id=f"c{i % 3}") for i in range(100)]
+    for run in runs:
+        run["tasks"] = [{"task_key": f"t{j}", "status": {"state": "TERMINATED"}, "description": "x" * 200}
+                        for j in range(49)] + run["tasks"]
+    jobs = {i: make_job(i, {"streaming": ""} if i < 2 else {}) for i in range(10)}
+    clusters = {f"c{i}": {"cluster_id": f"c{i}", "cluster_name": f"cluster {i}"} for i in range(3)}
+    scan_kwargs = {"older_than_hours": 2.0, "limit": 0, "simplified_output": True, "task_durations": True}
+
+    eager_fake = FakeDatabricks(runs=runs, jobs=jobs, clusters=clusters)
+    eager = make_alerter(eager_fake).get_job_runs(**scan_kwargs)[WORKSPACE]
+    lazy_fake = FakeDatabricks(runs=runs, jobs=jobs, clusters=clusters)
+    lazy = make_alerter(lazy_fake).get_job_runs(lazy_enrichment=True, **scan_kwargs)[WORKSPACE]
+
+    strip = lambda run: {key: value for key, value in run.items() if not key.startswith(("time_from_start", "longest_running_task_hours", "task_durations"))}
+    assert [strip(run) for run in lazy] == [strip(run) for run in eager]
+    assert [run["run_id"] for run in lazy] == [2, 3, 4, 5, 6, 7, 8, 9]
+    assert lazy_fake.count("/jobs/runs/get") == 8 # Only the old, non-streaming runs are hydrated
+    assert lazy_fake.bytes_sent < eager_fake.bytes_sent / 5
+    assert lazy_fake.count("/jobs/get") <= eager_fake.count("/jobs/get")
+
+    # Nothing to hydrate if the output does not need tasks
+    lazy_fake.calls.clear()
+    make_alerter(lazy_fake).get_job_runs(older_than_hours=2.0, limit=0, add_cluster_info=False, lazy_enrichment=True)
+    assert lazy_fake.count("/jobs/runs/get") == 0
+
+    # With top_k, only the selected runs are hydrated
+    lazy_fake.calls.clear()
+    top = make_alerter(lazy_fake).get_job_runs(top_k=3, lazy_enrichment=True, **scan_kwargs)[WORKSPACE]
+    assert [run["cluster_name"] for run in top] == [strip(run)["cluster_name"] for run in eager[:3]]
+    assert lazy_fake.count("/jobs/runs/get") == 3
+
+def test_request_budget_skips_enrichment_before_listing():
+    from utils.request_budget import RequestBudget
+    runs = [make_run(i, i % 30, 5.0, cluster_id=f"c{i}") for i in range(60)]
+    fake = FakeDatabricks(runs=runs, jobs={i: make_job(i) for i in range(30)},
+                          clusters={f"c{i}": {"cluster_id": f"c{i}", "cluster_name": f"cluster {i}"} for i in range(60)})
+    job_alerter = make_alerter(fake, request_budget=RequestBudget(20))
+
+    job_runs = job_alerter.get_job_runs(limit=0, simplified_output=True)[WORKSPACE]
+    assert len(job_runs) == 60 # All 3 pages are listed, even though enrichment ran out of budget
+    assert job_alerter.incomplete_workspaces == set()
+    assert any(run["cluster_name"] == "Unspecified" for run in job_runs)
+    assert all(run.get("enrichment_failed") for run in job_runs if run["cluster_name"] == "Unspecified")
+    report = job_alerter.request_budget.report()[WORKSPACE]
+    assert len(fake.calls) == report["consumed"] <= 20
+    assert report["consumed_by_endpoint"]["/jobs/runs/list"] == 3
+    assert report["degraded"][:1] == ["cluster_info"] and "listing" not in report["degraded"]
+
+    # Each scan gets a new budget; listing stops once it is spent
+    fake.calls.clear()
+    job_alerter.request_budget = RequestBudget(2)
+    assert len(job_alerter.get_job_runs(limit=0, add_cluster_info=False, include_streaming_jobs=True)[WORKSPACE]) == 50
+    assert job_alerter.request_budget.report()[WORKSPACE]["degraded"] == ["job_tags", "listing"]
+    assert job_alerter.incomplete_workspaces == {WORKSPACE} # Runs missing from the scan may still be running
+
+def test_request_budget_looks_jobs_up_in_scanned_workspace_only():
+    from utils.request_budget import RequestBudget
+    other = "https://other.example.com"
+    fake = FakeDatabricks(runs=[make_run(1, 99, 5.0)], jobs={}) # Job 99 is not found
+    job_alerter = JobAlerter(logging.getLogger(__name__), ["token", "token"], [WORKSPACE, other], transport=fake,
+                             request_budget=RequestBudget(0))
+    assert len(job_alerter.get_workspace_job_runs(WORKSPACE, add_cluster_info=False)) == 1
+    assert other not in job_alerter.request_budget.report() # Not charged for the scan of another workspace
+    assert job_alerter.get_job_tags(99) == {} and other in job_alerter.request_budget.report()
+
+def test_hedges_count_against_budget_and_concurrency():
+    from utils.adaptive_concurrency import AdaptiveConcurrency
+    from utils.http_transport import HedgedTransport
+    from utils.request_budget import RequestBudget
+    transport = HedgedTransport(FakeDatabricks(runs=[], jobs={}))
+    job_alerter = JobAlerter(logging.getLogger(__name__), ["token"], [WORKSPACE], transport=transport,
+                             request_budget=RequestBudget(2),
+                             adaptive_concurrency=AdaptiveConcurrency(initial_limit=1, max_limit=1))
+    limiter = job_alerter.adaptive_concurrency.limiter(WORKSPACE)
+    url = f"{WORKSPACE}/api/2.2/jobs/runs/list"
+
+    finish = transport.hedge_admission(url)
+    assert finish is not None and limiter.in_flight == 1
+    assert transport.hedge_admission(url) is None # No room under the concurrency limit
+    finish(FakeResponse({}), 0.01)
+    assert limiter.in_flight == 0
+
+    transport.hedge_admission(url)(None, None) # Admitted, but not sent
+    assert limiter.in_flight == 0
+    assert transport.hedge_admission(url) is None # No room in the request budget
+    assert job_alerter.request_budget.report()[WORKSPACE]["consumed_by_endpoint"] == {"/jobs/runs/list": 2}
+    transport.close()
+
+def test_adaptive_concurrency_backs_off_on_throttling():
+    from utils.adaptive_concurrency import AdaptiveConcurrency
+    runs = [make_run(i, i, 5.0, cluster_id=f"c{i}") for i in range(200)]
+    jobs = {i: make_job(i) for i in range(200)}
+    clusters = {f"c{i}": {"cluster_id": f"c{i}", "cluster_name": f"cluster {i}"} for i in range(200)}
+
+    # A busy workspace throttles calls beyond 4 in flight: the limit backs off and stays around the capacity
+    busy = FakeDatabricks(runs=runs, jobs=jobs, clusters=clusters, delay_s=0.002, capacity=4)
+    concurrency = AdaptiveConcurrency(initial_limit=16, max_limit=32)
+    make_alerter(busy, adaptive_concurrency=concurrency).get_job_runs(limit=0)
+    metrics = concurrency.metrics()[WORKSPACE]
+    assert busy.throttled > 0
+    assert 1 <= metrics["decreases"] <= busy.throttled # At most one backoff per throttled call
+    assert metrics["limit"] <= 8 and metrics["in_flight"] == 0
+
+    # An idle workspace lets the limit grow beyond the fixed number of enrichment workers (latency spikes are
+    # ignored, so that a slow machine does not back off)
+    idle = FakeDatabricks(runs=runs, jobs=jobs, clusters=clusters, delay_s=0.002)
+    concurrency = AdaptiveConcurrency(initial_limit=4, max_limit=32, latency_spike_ratio=float("inf"))
+    make_alerter(idle, adaptive_concurrency=concurrency, max_enrichment_workers=4).get_job_runs(limit=0)
+    assert concurrency.metrics()[WORKSPACE]["limit"] > 8 and idle.max_in_flight > 4
+
+def test_scan_checkpoint_resumes_interrupted_scan(tmp_path):
+    from utils.scan_checkpoint import ScanCheckpoint
+
+    class CrashingDatabricks(FakeDatabricks):
+        def handle(self, endpoint, params):
+            if endpoint == "/jobs/runs/list" and params.get("page_token") == "75":
+                raise RuntimeError("task timed out")
+            return super().handle(endpoint, params)
+
+    runs = [make_run(i, i % 5, 5.0, cluster_id="c1") for i in range(100)] # 4 pages
+    jobs = {i: make_job(i, {"team": str(i)}) for i in range(5)}
+    clusters = {"c1": {"cluster_id": "c1", "cluster_name": "cluster one"}}
+    scan_kwargs = {"older_than_hours": 2.0, "limit": 0, "simplified_output": True}
+    expected = make_alerter(FakeDatabricks(runs, jobs, clusters)).get_job_runs(**scan_kwargs)[WORKSPACE]
+
+    path = str(tmp_path / "checkpoint.jsonl")
+    with pytest.raises(RuntimeError):
+        make_alerter(CrashingDatabricks(runs, jobs, clusters), scan_checkpoint=ScanCheckpoint(path)).get_job_runs(**scan_kwargs)
+
+    fake = FakeDatabricks(runs, jobs, clusters)
+    job_alerter = make_alerter(fake, scan_checkpoint=ScanCheckpoint(path))
+    resumed = job_alerter.get_job_runs(**scan_kwargs)[WORKSPACE]
+    strip = lambda run: {key: value for key, value in run.items() if not key.startswith("time_from_start")}
+    assert [strip(run) for run in resumed] == [strip(run) for run in expected]
+    assert [params.get("page_token") for endpoint, params in fake.calls if endpoint == "/jobs/runs/list"] == ["75"]
+    assert job_alerter.qualifying_run_counts[WORKSPACE] == 100
+
+    # Once scanned, the workspace is served from the checkpoint until it is finished
+    fake.calls.clear()
+    assert len(job_alerter.get_job_runs(**scan_kwargs)[WORKSPACE]) == 100 and fake.calls == []
+    job_alerter.scan_checkpoint.finish()
+    assert len(job_alerter.get_job_runs(**scan_kwargs)[WORKSPACE]) == 100 and fake.count("/jobs/runs/list") == 4
+
+def test_scan_checkpoint_resumes_listing_cut_short(tmp_path):
+    from utils.request_budget import RequestBudget
+    from utils.scan_checkpoint import ScanCheckpoint
+    fake = FakeDatabricks(runs=[make_run(i, 1, 5.0) for i in range(100)], jobs={1: make_job(1)}) # 4 pages
+    checkpoint = ScanCheckpoint(str(tmp_path / "checkpoint.jsonl"))
+    job_alerter = make_alerter(fake, request_budget=RequestBudget(2), scan_checkpoint=checkpoint)
+    scan_kwargs = {"limit": 0, "add_cluster_info": False, "include_streaming_jobs": True}
+
+    # Listing stops once the budget is spent: the workspace is incomplete, and not marked as scanned
+    assert len(job_alerter.get_job_runs(**scan_kwargs)[WORKSPACE]) == 50
+    assert job_alerter.incomplete_workspaces == {WORKSPACE}
+    assert "scanned" not in checkpoint.workspace(WORKSPACE)["stages"]
+
+    # The next scan (e.g. a retry with a new budget) lists the rest
+    fake.calls.clear()
+    job_alerter.request_budget = None
+    assert len(job_alerter.get_job_runs(**scan_kwargs)[WORKSPACE]) == 100
+    assert [params.get("page_token") for endpoint, params in fake.calls if endpoint == "/jobs/runs/list"] == ["50", "75"]
+    assert job_alerter.incomplete_workspaces == set() and "scanned" in checkpoint.workspace(WORKSPACE)["stages"]
+
+    # A limited listing is complete as far as the checkpoint goes, and stays incomplete when served from it
+    checkpoint.finish()
+    scan_kwargs["limit"] = 30
+    assert len(job_alerter.get_job_runs(**scan_kwargs)[WORKSPACE]) == 30
+    assert checkpoint.workspace(WORKSPACE)["stages"] == {"scanned", "incomplete"}
+    job_alerter.incomplete_workspaces.clear()
+    assert len(job_alerter.get_job_runs(**scan_kwargs)[WORKSPACE]) == 30
+    assert job_alerter.incomplete_workspaces == {WORKSPACE}
+
+def test_scan_checkpoint_refreshes_derived_fields_of_resumed_runs(tmp_path, monkeypatch):
+    import stuck_job_alerter
+    from utils.node_type_catalog import NodeTypeCatalog
+    from utils.scan_checkpoint import ScanCheckpoint
+    run = make_run(1, 10, 4.0, cluster_id="c1")
+    run["tasks"] = [{**run["tasks"][0], "start_time": epoch_ms_now() - 3 * HOUR_MS},
+                    {"task_key": "t1", "status": {"state": "TERMINATED"}, "start_time": epoch_ms_now() - 4 * HOUR_MS,
+                     "end_time": epoch_ms_now() - 3 * HOUR_MS}]
+    fake = FakeDatabricks(
+        runs=[run], jobs={10: make_job(10)},
+        clusters={"c1": {"cluster_id": "c1", "node_type_id": "m5d.large", "driver_node_type_id": "m5d.large",
+                         "num_workers": 1}},
+        node_types=[{"node_type_id": "m5d.large", "num_cores": 2.0, "memory_mb": 8192}])
+    catalog = NodeTypeCatalog(str(tmp_path / "node_types.json"), cost_per_core_hour=0.25)
+    job_alerter = make_alerter(fake, node_type_catalog=catalog,
+                               scan_checkpoint=ScanCheckpoint(str(tmp_path / "checkpoint.jsonl")))
+    scan_kwargs = {"older_than_hours": 6.0, "task_older_than_hours": 2.0, "limit": 0, "simplified_output": True}
+    scanned = job_alerter.get_job_runs(**scan_kwargs)[WORKSPACE]
+    assert abs(scanned[0]["estimated_cost_so_far"] - 4.0) < 0.01
+
+    # An hour later, the runs served from the checkpoint have their durations and cost refreshed, but no tasks
+    ms_since = stuck_job_alerter.ms_since
+    monkeypatch.setattr(stuck_job_alerter, "ms_since", lambda start_time: ms_since(start_time) + HOUR_MS)
+    fake.calls.clear()
+    resumed = job_alerter.get_job_runs(**scan_kwargs)[WORKSPACE]
+    assert fake.calls == []
+    assert abs(resumed[0]["time_from_start_hours"] - 5.0) < 0.01
+    assert abs(resumed[0]["estimated_cost_so_far"] - 5.0) < 0.01
+    assert resumed[0]["longest_running_task_key"] == "t0"
+    assert abs(resumed[0]["longest_running_task_hours"] - 4.0) < 0.01
+    assert abs(resumed[0]["task_durations_hours"]["t0"] - 4.0) < 0.01
+    assert abs(resumed[0]["task_durations_hours"]["t1"] - 1.0) < 0.01 # Finished tasks keep their duration
+    assert sorted(resumed[0]) == sorted(scanned[0])
+
+def test_top_k_selection_bounds_enrichment():
+    import random
+    hours = list(range(1, 201))
+    random.Random(0).shuffle(hours)
+    runs = [make_run(i, i, hours[i]) for i in range(200)]
+    jobs = {i: make_job(i) for i in range(200)}
+    oldest = max(range(200), key=lambda i: hours[i])
+    jobs[oldest] = make_job(oldest, {"streaming": ""})
+    fake = FakeDatabricks(runs=runs, jobs=jobs)
+    job_alerter = make_alerter(fake)
+
+    job_runs = job_alerter.get_job_runs(older_than_hours=10.5, limit=0, top_k=5, add_cluster_info=False)[WORKSPACE]
+    assert [round(run["time_from_start_hours"]) for run in job_runs] == [199, 198, 197, 196, 195]
+    assert job_alerter.qualifying_run_counts[WORKSPACE] == 190
+    assert fake.count("/jobs/get") < 60 # Tag lookups for heap candidates only, plus the top 5 runs' enrichment
+
+    job_runs = job_alerter.get_job_runs(older_than_hours=10.5, limit=0, include_streaming_jobs=True, top_k=2,
+                                        add_cluster_info=False)[WORKSPACE]
+    assert [run["run_id"] for run in job_runs] == [oldest, hours.index(199)]
+
+def test_metadata_cache_warm_start(tmp_path):
+    from utils.metadata_cache import MetadataCache
+    def make_fake(spark_context_id):
+        runs = [make_run(i, i % 3, 3.0, cluster_id="c1") for i in range(6)]
+        for run in runs:
+            run["tasks"][0]["cluster_instance"]["spark_context_id"] = spark_context_id
+        return FakeDatabricks(runs=runs, jobs={i: make_job(i, {"index": str(i)}) for i in range(3)},
+                              clusters={"c1": {"cluster_id": "c1", "cluster_name": "cluster one"}})
+    path = str(tmp_path / "metadata.json")
+
+    cold = make_fake("ctx1")
+    cold_runs = make_alerter(cold, metadata_cache=MetadataCache(path), max_enrichment_workers=1).get_job_runs(limit=100)
+    assert cold.count("/jobs/get") == 3 # Once per job, for both tags and the continuous flag
+    assert cold.count("/clusters/get") == 1
+
+    cache = MetadataCache(path) # Not saved yet: a new process starts cold
+    assert cache.get("job", 0) is None
+    make_alerter(make_fake("ctx1"), metadata_cache=cache).get_job_runs(limit=100)
+    cache.save()
+
+    warm = make_fake("ctx1")
+    warm_runs = make_alerter(warm, metadata_cache=MetadataCache(path)).get_job_runs(limit=100)
+    assert warm.count("/jobs/get") == 0 and warm.count("/clusters/get") == 0
+    strip = lambda runs: [{k: v for k, v in run.items() if not k.startswith(("time_from_start", "start_time"))}
+                          for run in runs]
+    assert strip(warm_runs[WORKSPACE]) == strip(cold_runs[WORKSPACE])
+
+    restarted = make_fake("ctx2") # Cluster restarted: cached cluster info is stale
+    make_alerter(restarted, metadata_cache=MetadataCache(path), max_enrichment_workers=1).get_job_runs(limit=100)
+    assert restarted.count("/jobs/get") == 0 and restarted.count("/clusters/get") == 1
+
+def test_cancel_job_run():
+    fake = FakeDatabricks(runs=[make_run(1, 10, 30.0)], jobs={})
+    job_alerter = make_alerter(fake)
+    assert job_alerter.cancel_job_run(WORKSPACE, 1) == {"http_status_code": 200}
+    assert job_alerter.cancel_job_run(WORKSPACE, 2)["error_code"] == "RESOURCE_DOES_NOT_EXIST"
+    assert fake.calls == [("/jobs/runs/cancel", {"run_id": 1}), ("/jobs/runs/cancel", {"run_id": 2})]
+
+def test_remediation_skips_runs_without_tags_and_polls_outside_budget():
+    from remediation import RemediationPolicy, Remediator
+    from utils.request_budget import RequestBudget
+    fake = FakeDatabricks(runs=[make_run(1, 10, 30.0), make_run(2, 20, 30.0)],
+                          jobs={10: make_job(10), 20: make_job(20, {"no_auto_cancel": ""})})
+    # Listing and the first job's tags spend the budget: the second job's tags and all run details are refused
+    job_alerter = make_alerter(fake, request_budget=RequestBudget(3), max_enrichment_workers=1)
+    job_runs_lists = job_alerter.get_job_runs(limit=0, add_cluster_info=False)
+    assert job_runs_lists[WORKSPACE][1]["job_tags_unavailable"]
+
+    remediator = Remediator(job_alerter, [RemediationPolicy("ceiling", 24.0)], dry_run=False, poll_interval_s=0.01)
+    actions = remediator.run(job_runs_lists)
+    assert {action.run_id: action.status for action in actions} == {1: "cancelled", 2: "skipped"}
+    assert fake.calls[-2:] == [("/jobs/runs/cancel", {"run_id": 1}), ("/jobs/runs/get", {"run_id": 1, "include_history": "false", "include_resolved_values": "false"})]
+    report = job_alerter.request_budget.report()[WORKSPACE]
+    assert report["consumed_by_endpoint"]["/jobs/runs/get"] == 1 and "/jobs/runs/get" not in report["refused_by_endpoint"]
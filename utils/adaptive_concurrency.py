@@ -0,0 +1,121 @@
+import threading
+
+class AdaptiveLimiter:
+    """
+    Thread-safe concurrency limit with AIMD (additive increase, multiplicative decrease) control, like TCP
+    congestion control: callers block in acquire() while `limit` calls are in flight. The limit grows by about
+    one per round of `limit` successful calls while their latency is stable, and is multiplied by backoff_ratio
+    when a call is throttled (e.g. HTTP 429/503) or its latency spikes above latency_spike_ratio times the
+    smoothed latency. Calls that started before a decrease cannot trigger another one, so a burst of throttled
+    in-flight calls only backs off once.
+    """
+
+    def __init__(self, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 64, backoff_ratio: float = 0.5,
+                 latency_spike_ratio: float = 3.0, smoothing: float = 0.1, min_latency_samples: int = 10) -> None:
+        """
+        Args:
+            initial_limit: Concurrency limit to start with.
+            min_limit, max_limit: Bounds of the concurrency limit.
+            backoff_ratio: Factor the limit is multiplied by when a call is throttled or its latency spikes.
+            latency_spike_ratio: Latency, relative to the smoothed latency of successful calls, above which a call
+                                 counts as a latency spike.
+            smoothing: Weight of each new latency in the smoothed latency (exponential moving average).
+            min_latency_samples: Number of successful calls before latency spikes are detected.
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("AdaptiveLimiter: Expected 1 <= min_limit <= initial_limit <= max_limit.")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_spike_ratio = latency_spike_ratio
+        self.smoothing = smoothing
+        self.min_latency_samples = min_latency_samples
+        self.increases = 0 # Number of times the (integer) limit grew
+        self.decreases = 0 # Number of times the limit was backed off
+        self.__condition = threading.Condition()
+        self.__limit = float(initial_limit)
+        self.__in_flight = 0
+        self.__started = 0           # Number of calls started (also the ticket of the last call)
+        self.__backoff_ticket = 0    # Value of __started at the last decrease
+        self.__latency_s = None      # Smoothed latency of successful calls
+        self.__latency_samples = 0
+
+    @property
+    def limit(self) -> int:
+        """The current concurrency limit."""
+        return int(self.__limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self.__in_flight
+
+    def acquire(self) -> int:
+        """Wait until a call may start, and return its ticket (to be passed to release())."""
+        with self.__condition:
+            while self.__in_flight >= int(self.__limit):
+                self.__condition.wait()
+            self.__in_flight += 1
+            self.__started += 1
+            return self.__started
+
+    def try_acquire(self) -> int | None:
+        """Same as acquire(), but return None instead of waiting if the limit is reached (e.g. for optional calls)."""
+        with self.__condition:
+            if self.__in_flight >= int(self.__limit):
+                return None
+            self.__in_flight += 1
+            self.__started += 1
+            return self.__started
+
+    def cancel(self, ticket: int) -> None:
+        """Give back the slot of a call started with acquire() that was not made, without adjusting the limit."""
+        with self.__condition:
+            self.__in_flight -= 1
+            self.__condition.notify_all()
+
+    def release(self, ticket: int, latency_s: float, throttled: bool = False) -> None:
+        """Report the outcome of a call started with acquire(), adjusting the limit."""
+        with self.__condition:
+            self.__in_flight -= 1
+            spiked = self.__latency_s is not None and self.__latency_samples >= self.min_latency_samples \
+                and latency_s > self.latency_spike_ratio * self.__latency_s
+            if throttled or spiked:
+                if ticket > self.__backoff_ticket:
+                    self.__limit = max(float(self.min_limit), self.__limit * self.backoff_ratio)
+                    self.__backoff_ticket = self.__started
+                    self.decreases += 1
+            else:
+                previous_limit = int(self.__limit)
+                self.__limit = min(float(self.max_limit), self.__limit + 1.0 / self.__limit)
+                self.increases += int(self.__limit) > previous_limit
+                self.__latency_s = latency_s if self.__latency_s is None \
+                    else (1 - self.smoothing) * self.__latency_s + self.smoothing * latency_s
+                self.__latency_samples += 1
+            self.__condition.notify_all()
+
+class AdaptiveConcurrency:
+    """
+    Per-workspace AdaptiveLimiter registry, so that each workspace finds the concurrency it tolerates: idle
+    workspaces get more parallel calls, and busy ones back off on throttling (HTTP 429/503) without manual tuning.
+    Limiters are created on first use, with the arguments given here (see AdaptiveLimiter).
+    """
+    throttled_status_codes = {429, 503}
+
+    def __init__(self, **limiter_kwargs) -> None:
+        self.limiter_kwargs = limiter_kwargs
+        self.max_limit = AdaptiveLimiter(**limiter_kwargs).max_limit # Also checks the arguments
+        self.__lock = threading.Lock()
+        self.__limiters = {} # Workspace URL -> AdaptiveLimiter
+
+    def limiter(self, workspace_url: str) -> AdaptiveLimiter:
+        with self.__lock:
+            if workspace_url not in self.__limiters:
+                self.__limiters[workspace_url] = AdaptiveLimiter(**self.limiter_kwargs)
+            return self.__limiters[workspace_url]
+
+    def metrics(self) -> dict[str, dict[str, int]]:
+        """Return the current concurrency limit of each workspace, with its calls in flight and limit changes."""
+        with self.__lock:
+            return dict((url, {"limit": limiter.limit, "in_flight": limiter.in_flight,
+                               "increases": limiter.increases, "decreases": limiter.decreases})
+                        for url, limiter in self.__limiters.items())
@@ -0,0 +1,71 @@
+import threading
+import time
+import pytest
+from adaptive_concurrency import AdaptiveConcurrency, AdaptiveLimiter
+
+def test_limit_grows_additively_up_to_max():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=4)
+    for _ in range(3):
+        limiter.release(limiter.acquire(), 0.01)
+    assert limiter.limit == 3 # 2 -> 2.5 -> 2.9 -> 3.24
+    for _ in range(100):
+        limiter.release(limiter.acquire(), 0.01)
+    assert limiter.limit == 4 and limiter.increases == 2
+
+def test_limit_backs_off_once_per_burst_of_throttled_calls():
+    limiter = AdaptiveLimiter(initial_limit=16, min_limit=2)
+    tickets = [limiter.acquire() for _ in range(8)]
+    for ticket in tickets:
+        limiter.release(ticket, 0.01, throttled=True)
+    assert limiter.limit == 8 and limiter.decreases == 1 # Calls started before the backoff do not back off again
+    for _ in range(3):
+        limiter.release(limiter.acquire(), 0.01, throttled=True)
+    assert limiter.limit == 2 and limiter.decreases == 4 # Down to min_limit
+
+def test_limit_backs_off_on_latency_spike():
+    limiter = AdaptiveLimiter(initial_limit=8, min_latency_samples=10)
+    for _ in range(10):
+        limiter.release(limiter.acquire(), 0.01)
+    limit = limiter.limit
+    limiter.release(limiter.acquire(), 0.02) # Within latency_spike_ratio
+    assert limiter.limit == limit
+    limiter.release(limiter.acquire(), 0.1)
+    assert limiter.limit == limit // 2
+
+def test_acquire_blocks_at_limit():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+    in_flight, max_in_flight = [0], [0]
+    lock = threading.Lock()
+
+    def call():
+        ticket = limiter.acquire()
+        with lock:
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        limiter.release(ticket, 0.01)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max_in_flight[0] == 2 and limiter.in_flight == 0
+
+def test_try_acquire_does_not_wait():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+    ticket = limiter.acquire()
+    assert limiter.try_acquire() is None
+    limiter.cancel(ticket)
+    assert limiter.in_flight == 0 and limiter.limit == 1 and limiter.increases == 0
+    assert limiter.try_acquire() is not None and limiter.in_flight == 1
+
+def test_adaptive_concurrency_is_per_workspace():
+    concurrency = AdaptiveConcurrency(initial_limit=4)
+    concurrency.limiter("https://a").release(concurrency.limiter("https://a").acquire(), 0.01, throttled=True)
+    assert concurrency.metrics() == {"https://a": {"limit": 2, "in_flight": 0, "increases": 0, "decreases": 1}}
+    assert concurrency.limiter("https://b").limit == 4
+    with pytest.raises(ValueError):
+        AdaptiveConcurrency(initial_limit=4, max_limit=2)
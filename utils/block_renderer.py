@@ -0,0 +1,292 @@
+from collections import OrderedDict
+from utils import json_codec
+from utils.parsing_helpers import content_hash
+
+# Slack Block Kit limits (see https://api.slack.com/reference/block-kit/blocks)
+HEADER_TEXT_MAX_CHARS = 150
+SECTION_TEXT_MAX_CHARS = 3000
+FIELD_TEXT_MAX_CHARS = 2000
+MAX_FIELDS_PER_SECTION = 10
+MAX_BLOCKS_PER_PAYLOAD = 50
+MAX_PAYLOAD_BYTES = 40000 # Conservative per-message budget for the serialized payload
+TRUNCATION_SUFFIX = "…"
+
+# Empty {"blocks":[]} payload size in bytes, used for exact payload byte accounting
+_EMPTY_PAYLOAD_BYTES = len(json_codec.dumps({"blocks": []}))
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Deterministically truncate text to at most max_chars characters, marking truncation with a suffix."""
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - len(TRUNCATION_SUFFIX)] + TRUNCATION_SUFFIX
+
+def group_lines(lines: list[str], max_chars: int) -> list[list[str]]:
+    """
+    Deterministically group lines into as few groups as possible such that each group, joined by newlines,
+    is at most max_chars characters long. Lines are kept in order and never split; lines that are too long
+    on their own are truncated.
+    """
+    groups = []
+    current = []
+    current_len = 0
+    for line in lines:
+        line = truncate_text(line, max_chars)
+        added_len = len(line) + (1 if current else 0)
+        if current and current_len + added_len > max_chars:
+            groups.append(current)
+            current, current_len = [], 0
+            added_len = len(line)
+        current.append(line)
+        current_len += added_len
+    if current:
+        groups.append(current)
+    return groups
+
+def split_lines(lines: list[str], max_chars: int) -> list[str]:
+    """Same as group_lines(), but returns each group joined by newlines."""
+    return ["\n".join(group) for group in group_lines(lines, max_chars)]
+
+def compile_template(template, text_max_chars: int = SECTION_TEXT_MAX_CHARS):
+    """
+    Compile a Slack block template (nested dicts/lists, where strings may contain str.format() placeholders)
+    into a function that renders it from a dict of values. The template is walked once, into a tree of
+    closures (one per node), so rendering only formats the placeholders and builds new dicts and lists.
+    Rendered "text" values are truncated to Slack's limit for their position.
+    """
+    return _compile_node(template, text_max_chars)
+
+def _compile_node(template, text_max_chars: int, key: str | None = None):
+    """Return the function rendering the given template node from a dict of values."""
+    if isinstance(template, dict):
+        renderers = [(k, _compile_node(value, FIELD_TEXT_MAX_CHARS if k == "fields" else text_max_chars, key=k))
+                     for k, value in template.items()]
+        return lambda values: {k: render(values) for k, render in renderers}
+    if isinstance(template, list):
+        renderers = [_compile_node(value, text_max_chars) for value in template]
+        return lambda values: [render(values) for render in renderers]
+    if isinstance(template, str) and "{" in template:
+        format_map = template.format_map
+        if key == "text":
+            return lambda values: truncate_text(format_map(values), text_max_chars)
+        return format_map
+    if isinstance(template, str) and key == "text":
+        template = truncate_text(template, text_max_chars)
+    return lambda values: template # Constant (strings, numbers and booleans are immutable)
+
+class SlackBlockRenderer:
+    """
+    Renders job run info into Slack blocks using templates compiled once at instantiation, with a cache of
+    rendered blocks keyed by the content hash of the displayed fields. All rendered text is kept within
+    Slack's per-field character limits, and payloads are packed within the per-message block and byte limits.
+
+    Returned block lists and payloads are new objects, but the block dicts of a run are shared with the cache:
+    they are read-only (add, remove or replace blocks in the returned lists instead of mutating them).
+    """
+
+    # Run fields that affect the rendered blocks (duration is rounded to the displayed precision before hashing)
+    render_fields = ["run_id", "run_name", "run_page_url", "creator_user_name", "cluster_url", "cluster_name",
+                     "cluster_id", "driver_node_type_id", "node_type_id", "job_tags", "job_tags_unavailable",
+                     "longest_running_task_key", "cluster_activity", "cluster_resize_count", "cluster_last_event_hours"]
+
+    def __init__(self, unspecified_str: str = "Unspecified", cache_size: int = 100000,
+                 max_tag_blocks: int = MAX_FIELDS_PER_SECTION, max_payload_bytes: int = MAX_PAYLOAD_BYTES) -> None:
+        """
+        Args:
+            unspecified_str: Placeholder used by JobAlerter for unset cluster fields.
+            cache_size: Maximum number of rendered runs to cache (least recently used are evicted first).
+            max_tag_blocks: Maximum number of blocks used for a single run's tags before the rest are elided.
+            max_payload_bytes: Maximum serialized size of a single payload.
+        """
+        self.unspecified_str = unspecified_str
+        self.cache_size = cache_size
+        self.max_tag_blocks = max_tag_blocks
+        self.max_payload_bytes = max_payload_bytes
+        self.__cache = OrderedDict()
+
+        self.__render_header = compile_template(
+            {"type": "header", "text": {"type": "plain_text", "text": "Job runs longer than {threshold_hrs:0.2f} hours"}},
+            HEADER_TEXT_MAX_CHARS)
+        self.__render_workspace = compile_template([
+            {"type": "section", "text": {"type": "mrkdwn", "text": "*Workspace:* {workspace_name}"}},
+            {"type": "divider"},
+        ])
+        run_info_template = [
+            {"type": "section", "fields": [
+                {"type": "mrkdwn", "text": "*Run name:*\n<{run_page_url}|{run_name}>"},
+                {"type": "mrkdwn", "text": "*Created by:*\n{creator_user_name}"}]},
+            {"type": "section", "fields": [
+                {"type": "mrkdwn", "text": "*Cluster name:*\n{cluster_name_text}"},
+                {"type": "mrkdwn", "text": "{cluster_info_text}"}]},
+        ]
+        self.__render_run = compile_template(run_info_template + [
+            {"type": "section", "fields": [
+                {"type": "mrkdwn", "text": "*Duration:*\n{duration_hours:.2f} hours"}]},
+        ])
+        # Variant for runs with task-level duration info (see JobAlerter.add_task_durations_to_run())
+        self.__render_run_with_task = compile_template(run_info_template + [
+            {"type": "section", "fields": [
+                {"type": "mrkdwn", "text": "*Duration:*\n{duration_hours:.2f} hours"},
+                {"type": "mrkdwn", "text": "*Longest running task:*\n{longest_running_task_key} "
+                                           "({longest_running_task_hours:.2f} hours)"}]},
+        ])
+        self.__render_tags = compile_template(
+            {"type": "section", "fields": [{"type": "mrkdwn", "text": "{tags_text}"}]})
+        self.__render_label = compile_template(
+            {"type": "context", "elements": [{"type": "mrkdwn", "text": "*{label}*"}]})
+        self.__render_list = compile_template({"type": "section", "text": {"type": "mrkdwn", "text": "{text}"}})
+
+    def render_header_blocks(self, workspace_name: str, run_duration_threshold_hrs: float) -> list[dict]:
+        """Render the per-workspace message header blocks."""
+        values = {"threshold_hrs": run_duration_threshold_hrs, "workspace_name": workspace_name}
+        return [self.__render_header(values)] + self.__render_workspace(values)
+
+    def render_run_blocks(self, job_run_dict: dict, label: str | None = None) -> list[dict]:
+        """
+        Render the blocks for a single job run (basic, cluster, duration and tag info, then a divider),
+        optionally prefixed by a label block.
+        """
+        blocks, _ = self.__render_run_cached(job_run_dict)
+        if label is not None:
+            return [self.__render_label({"label": label})] + blocks
+        return list(blocks) # Copy, so that the cached list cannot be changed through the returned one
+
+    def render_run_payloads(self, job_run_dict: dict, label: str | None = None) -> list[dict]:
+        """
+        Render a single job run into payload(s). This is usually a single payload; runs whose blocks exceed
+        Slack's per-message limits are split deterministically across several. Uses the cached blocks size.
+        """
+        blocks, blocks_bytes = self.__render_run_cached(job_run_dict)
+        if label is not None:
+            label_block = self.__render_label({"label": label})
+            blocks = [label_block] + blocks
+            blocks_bytes += len(json_codec.dumps(label_block)) + 1
+        if len(blocks) <= MAX_BLOCKS_PER_PAYLOAD and _EMPTY_PAYLOAD_BYTES - 2 + blocks_bytes <= self.max_payload_bytes:
+            return [{"blocks": list(blocks)}] # Common case: everything fits in a single payload
+        return self.pack_payloads(blocks)
+
+    def render_list_blocks(self, title: str, lines: list[str]) -> list[dict]:
+        """Render a titled bullet list as section blocks, split on line boundaries to fit Slack's text limit."""
+        lines = [f"*{title}:*"] + lines
+        return [self.__render_list({"text": chunk}) for chunk in split_lines(lines, SECTION_TEXT_MAX_CHARS)]
+
+    def pack_payloads(self, blocks: list[dict], block_sizes: list[int] | None = None) -> list[dict]:
+        """
+        Deterministically pack blocks, in order, into as few payloads as possible such that each payload has
+        at most 50 blocks and serializes to at most max_payload_bytes bytes.
+
+        Args:
+            blocks: Blocks to pack.
+            block_sizes: Optional precomputed serialized size (in bytes) of each block.
+        """
+        if block_sizes is None:
+            block_sizes = [len(json_codec.dumps(block)) for block in blocks]
+        payloads = []
+        current = []
+        current_bytes = _EMPTY_PAYLOAD_BYTES
+        for block, block_bytes in zip(blocks, block_sizes):
+            added_bytes = block_bytes + (1 if current else 0) # Comma separator
+            if current and (len(current) >= MAX_BLOCKS_PER_PAYLOAD or current_bytes + added_bytes > self.max_payload_bytes):
+                payloads.append({"blocks": current})
+                current, current_bytes = [], _EMPTY_PAYLOAD_BYTES
+                added_bytes = block_bytes
+            if _EMPTY_PAYLOAD_BYTES + block_bytes > self.max_payload_bytes:
+                print(f"SlackBlockRenderer [WARNING]: Single block of {block_bytes} bytes exceeds the "
+                      f"{self.max_payload_bytes} byte payload budget. Will likely fail to post.")
+            current.append(block)
+            current_bytes += added_bytes
+        if current:
+            payloads.append({"blocks": current})
+        return payloads
+
+    @staticmethod
+    def payload_bytes(payload: dict) -> int:
+        """Return the exact serialized size of a payload in bytes."""
+        return len(json_codec.dumps(payload))
+
+    def cache_info(self) -> dict[str, int]:
+        return {"size": len(self.__cache), "max_size": self.cache_size}
+
+    def __render_run_cached(self, job_run_dict: dict) -> tuple[list[dict], int]:
+        """
+        Return the rendered blocks for a job run and the serialized size of the blocks list in bytes,
+        from the cache if possible.
+        """
+        values = {field: job_run_dict[field] for field in self.render_fields if field in job_run_dict}
+        values["duration_hours"] = round(job_run_dict["time_from_start_hours"], 2)
+        if values.get("longest_running_task_key"):
+            values["longest_running_task_hours"] = round(job_run_dict["longest_running_task_hours"], 2)
+        key = content_hash(values)
+
+        cached = self.__cache.get(key)
+        if cached is None:
+            blocks = self.__render_run_uncached(values)
+            cached = (blocks, len(json_codec.dumps(blocks)))
+            self.__cache[key] = cached
+            if len(self.__cache) > self.cache_size:
+                self.__cache.popitem(last=False)
+        else:
+            self.__cache.move_to_end(key)
+        return cached
+
+    def __render_run_uncached(self, values: dict) -> list[dict]:
+        """Compute the derived display values for a run and render its blocks."""
+        cluster_url = values.get("cluster_url", self.unspecified_str)
+        cluster_name = values.get("cluster_name", self.unspecified_str)
+        cluster_id = values.get("cluster_id", self.unspecified_str)
+        if cluster_name == self.unspecified_str:
+            cluster_name_text = "Serverless"
+            cluster_info_text = "*Cluster info:*\nN/A"
+        else:
+            if cluster_url == self.unspecified_str:
+                cluster_name_text = f"{cluster_name}"
+                cluster_id_text = f"{cluster_id}"
+            else:
+                cluster_name_text = f"<{cluster_url}|{cluster_name}>"
+                cluster_id_text = f"<{cluster_url}|{cluster_id}>"
+            cluster_info_text = (f"*Cluster info:*\nID: {cluster_id_text}\n"
+                                 f"Driver: {values.get('driver_node_type_id')}\nWorker: {values.get('node_type_id')}")
+            if values.get("cluster_activity"):
+                cluster_info_text += f"\nActivity: {self.__activity_text(values)}"
+
+        render_run = self.__render_run_with_task if values.get("longest_running_task_key") else self.__render_run
+        blocks = render_run({**values, "cluster_name_text": cluster_name_text, "cluster_info_text": cluster_info_text})
+        if values.get("job_tags_unavailable"):
+            # The job may be a streaming job that would not have been alerted on (see JobAlerter.__enrich_run())
+            blocks.append(self.__render_tags({"tags_text": "*Tags:*\nUnavailable (streaming status unverified)"}))
+        else:
+            blocks.extend(self.__render_tag_blocks(values.get("job_tags", {})))
+        blocks.append({"type": "divider"})
+        return blocks
+
+    @staticmethod
+    def __activity_text(values: dict) -> str:
+        """Describe a run's cluster activity (see utils/cluster_activity.py)."""
+        activity = values["cluster_activity"]
+        if activity == "thrashing":
+            return f"thrashing ({values.get('cluster_resize_count')} resizes)"
+        if activity == "idle":
+            return f"idle (driver unhealthy, last event {values['cluster_last_event_hours']:.2f} hours ago)"
+        return activity.replace("_", " ") # E.g. "no recent events"
+
+    def __render_tag_blocks(self, tags_dict: dict) -> list[dict]:
+        """Render tags into one or more blocks, splitting on tag boundaries when over Slack's field limit."""
+        if not tags_dict:
+            return [self.__render_tags({"tags_text": "*Tags:*\nNone"})]
+
+        lines = ["*Tags:*"] + [f"• *{key}*" if value == "" else f"• *{key}:* {value}" for key, value in tags_dict.items()]
+        if sum(len(line) + 1 for line in lines) - 1 <= FIELD_TEXT_MAX_CHARS:
+            return [self.__render_tags({"tags_text": "\n".join(lines)})] # Common case: all tags fit in one block
+        groups = group_lines(lines, FIELD_TEXT_MAX_CHARS)
+        if len(groups) > self.max_tag_blocks:
+            # Keep the first max_tag_blocks blocks, replacing trailing tags with a note on how many were elided
+            groups = groups[:self.max_tag_blocks]
+            shown_tags = sum(len(group) for group in groups) - 1 # Minus the "*Tags:*" title line
+            last_group = groups[-1]
+            while True:
+                note = f"_…and {len(tags_dict) - shown_tags} more tags_"
+                if len(last_group) <= 1 or len("\n".join(last_group + [note])) <= FIELD_TEXT_MAX_CHARS:
+                    break
+                last_group.pop()
+                shown_tags -= 1
+            last_group.append(note)
+        return [self.__render_tags({"tags_text": "\n".join(group)}) for group in groups]
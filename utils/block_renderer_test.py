@@ -0,0 +1,91 @@
+import pytest
+from block_renderer import *
+
+def make_run(run_id=1, tags=None):
+    return {"run_id": run_id, "run_name": "r", "run_page_url": "u", "creator_user_name": "c",
+            "cluster_url": "Unspecified", "cluster_name": "Unspecified", "cluster_id": "Unspecified",
+            "driver_node_type_id": "Unspecified", "node_type_id": "Unspecified",
+            "job_tags": tags if tags is not None else {}, "time_from_start_hours": 3.0}
+
+def test_truncate_text():
+    assert truncate_text("abc", 3) == "abc"
+    assert truncate_text("abcd", 3) == "ab…"
+
+def test_split_lines():
+    assert split_lines(["aa", "bb", "cc"], 5) == ["aa\nbb", "cc"]
+    assert split_lines(["aaaaaaa"], 5) == ["aaaa…"]
+    assert split_lines([], 5) == []
+
+def test_compile_template():
+    render = compile_template({"type": "section", "fields": [{"type": "mrkdwn", "text": "{x}"}],
+                               "text": {"type": "mrkdwn", "text": "{x}!"}})
+    rendered = render({"x": "a" * 5000})
+    assert len(rendered["fields"][0]["text"]) == FIELD_TEXT_MAX_CHARS
+    assert len(rendered["text"]["text"]) == SECTION_TEXT_MAX_CHARS
+    assert render({"x": "b"}) == {"type": "section", "fields": [{"type": "mrkdwn", "text": "b"}],
+                                  "text": {"type": "mrkdwn", "text": "b!"}}
+    assert render({"x": "b"})["fields"] is not render({"x": "b"})["fields"] # Each rendering builds new objects
+
+def test_render_run_blocks_cached():
+    renderer = SlackBlockRenderer()
+    blocks = renderer.render_run_blocks(make_run())
+    assert renderer.render_run_blocks(make_run()) == blocks
+    assert renderer.cache_info()["size"] == 1
+    assert renderer.render_run_blocks(make_run(), label="New")[1:] == blocks
+    blocks.append({"type": "divider"}) # Returned lists are copies, so the cache is not changed
+    assert renderer.render_run_blocks(make_run()) == blocks[:-1]
+    renderer.render_run_payloads(make_run())[0]["blocks"].clear()
+    assert renderer.render_run_blocks(make_run()) == blocks[:-1]
+
+def test_many_tags_split_within_limits():
+    renderer = SlackBlockRenderer(max_tag_blocks=3)
+    tags = {f"tag_{i}": "v" * 100 for i in range(200)}
+    blocks = renderer.render_run_blocks(make_run(tags=tags))
+    tag_blocks = blocks[3:-1]
+    assert len(tag_blocks) == 3
+    for block in tag_blocks:
+        assert len(block["fields"][0]["text"]) <= FIELD_TEXT_MAX_CHARS
+    assert "more tags_" in tag_blocks[-1]["fields"][0]["text"]
+
+def test_pack_payloads():
+    renderer = SlackBlockRenderer(max_payload_bytes=200)
+    blocks = [{"type": "section", "text": {"type": "mrkdwn", "text": "x" * 50}} for _ in range(10)]
+    payloads = renderer.pack_payloads(blocks)
+    assert sum(len(p["blocks"]) for p in payloads) == 10
+    for payload in payloads:
+        assert SlackBlockRenderer.payload_bytes(payload) <= 200
+    assert len(SlackBlockRenderer().pack_payloads([{"type": "divider"}] * 120)) == 3
+
+def test_render_run_payloads_split():
+    renderer = SlackBlockRenderer(max_payload_bytes=3000)
+    run = make_run(tags={f"tag_{i}": "v" * 100 for i in range(30)})
+    payloads = renderer.render_run_payloads(run, label="New")
+    assert len(payloads) > 1
+    assert [b for p in payloads for b in p["blocks"]] == renderer.render_run_blocks(run, label="New")
+    for payload in payloads:
+        assert SlackBlockRenderer.payload_bytes(payload) <= 3000
+    assert len(SlackBlockRenderer().render_run_payloads(run)) == 1
+
+def test_longest_running_task_field():
+    run = make_run()
+    assert len(SlackBlockRenderer().render_run_blocks(run)[2]["fields"]) == 1
+    run.update(longest_running_task_key="ingest", longest_running_task_hours=2.5)
+    fields = SlackBlockRenderer().render_run_blocks(run)[2]["fields"]
+    assert fields[1]["text"] == "*Longest running task:*\ningest (2.50 hours)"
+
+def test_render_cluster_activity():
+    renderer = SlackBlockRenderer()
+    run = {**make_run(), "cluster_name": "c", "cluster_activity": "idle", "cluster_resize_count": 0,
+           "cluster_last_event_hours": 2.5}
+    assert renderer.render_run_blocks(run)[1]["fields"][1]["text"].endswith("\nActivity: idle (driver unhealthy, last event 2.50 hours ago)")
+    run = {**run, "cluster_activity": "thrashing", "cluster_resize_count": 9}
+    assert renderer.render_run_blocks(run)[1]["fields"][1]["text"].endswith("\nActivity: thrashing (9 resizes)")
+    run = {**run, "cluster_activity": "no_recent_events", "cluster_last_event_hours": None}
+    assert renderer.render_run_blocks(run)[1]["fields"][1]["text"].endswith("\nActivity: no recent events")
+    assert "Activity" not in renderer.render_run_blocks({**make_run(), "cluster_name": "c"})[1]["fields"][1]["text"]
+
+def test_render_unavailable_tags_as_unverified():
+    renderer = SlackBlockRenderer()
+    blocks = renderer.render_run_blocks({**make_run(), "job_tags_unavailable": True})
+    assert blocks[-2]["fields"][0]["text"] == "*Tags:*\nUnavailable (streaming status unverified)"
+    assert renderer.render_run_blocks(make_run())[-2]["fields"][0]["text"] == "*Tags:*\nNone"
@@ -0,0 +1,102 @@
+import threading
+from utils.time_helpers import epoch_ms_now, hours_to_ms, ms_to_hours
+
+class ClusterActivityProbe:
+    """
+    Classifies the recent activity of the cluster a job run is running on from its /clusters/events, to tell
+    runs that are stuck on an idle or hung cluster apart from runs that are long but busy:
+    - "thrashing": the cluster resized at least thrash_min_resizes times within the window (autoscaling churn).
+    - "idle": the driver was last reported unhealthy (e.g. not responding) within the window.
+    - "active": otherwise, if there were activity events (e.g. autoscaling, disk expansion or healthy driver reports).
+    - "no_recent_events": there were no events at all within the window. A long-running cluster that works steadily
+      may emit none, so this is not taken as a sign of idleness.
+    - "unknown": there were only other events (e.g. edits), or the events could not be fetched.
+
+    Events are fetched (page by page, bounded to the window and to max_pages) at most once per cluster and cached
+    by workspace and cluster ID, so runs sharing a cluster cost a single events call. Create one probe per scan
+    (or call clear() in between).
+    """
+    # Event types that indicate the cluster is doing work
+    activity_event_types = {"RESIZING", "UPSIZE_COMPLETED", "AUTOSCALING_STATS_REPORT", "EXPANDED_DISK",
+                            "DRIVER_HEALTHY", "INIT_SCRIPTS_FINISHED", "RUNNING"}
+    resize_event_types = {"RESIZING", "UPSIZE_COMPLETED", "NODES_LOST"}
+    unhealthy_event_types = {"DRIVER_NOT_RESPONDING", "DRIVER_UNAVAILABLE", "METASTORE_DOWN", "DBFS_DOWN"}
+    health_event_types = unhealthy_event_types | {"DRIVER_HEALTHY"}
+
+    def __init__(self, window_hours: float = 1.0, thrash_min_resizes: int = 6, page_size: int = 50,
+                 max_pages: int = 5) -> None:
+        """
+        Args:
+            window_hours: How far back to read each cluster's events.
+            thrash_min_resizes: Minimum number of resize events within the window to classify a cluster as thrashing.
+            page_size: Number of events to request per page.
+            max_pages: Maximum number of pages of events to read per cluster (most recent first).
+        """
+        self.window_hours = window_hours
+        self.thrash_min_resizes = thrash_min_resizes
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.__lock = threading.Lock()
+        self.__cluster_locks = {} # (workspace URL, cluster ID) -> lock, so that concurrent runs share one fetch
+        self.__activities = {}    # (workspace URL, cluster ID) -> activity fields
+
+    def activity(self, workspace_url: str, cluster_id: str, fetch, now_ms: int | None = None) -> dict:
+        """
+        Return the activity fields of a cluster (cluster_activity, cluster_resize_count, cluster_last_event_hours),
+        calling fetch(request) (which must return the /clusters/events response for the given request body)
+        only if the cluster's activity is not cached yet.
+        """
+        key = (workspace_url, cluster_id)
+        with self.__lock:
+            cluster_lock = self.__cluster_locks.setdefault(key, threading.Lock())
+        with cluster_lock:
+            if key not in self.__activities:
+                now_ms = epoch_ms_now() if now_ms is None else now_ms
+                events = self.__fetch_events(cluster_id, fetch, now_ms)
+                self.__activities[key] = self.classify(events, now_ms)
+            return dict(self.__activities[key])
+
+    def classify(self, events: list[dict] | None, now_ms: int) -> dict:
+        """Classify a cluster's events within the window (None if they could not be fetched)."""
+        if events is None:
+            return {"cluster_activity": "unknown", "cluster_resize_count": None, "cluster_last_event_hours": None}
+
+        events = sorted(events, key=lambda event: event.get("timestamp", 0), reverse=True)
+        resize_count = sum(1 for event in events if event.get("type") in self.resize_event_types)
+        last_health = next((event["type"] for event in events if event.get("type") in self.health_event_types), None)
+        if resize_count >= self.thrash_min_resizes:
+            activity = "thrashing"
+        elif last_health in self.unhealthy_event_types:
+            activity = "idle"
+        elif any(event.get("type") in self.activity_event_types for event in events):
+            activity = "active"
+        elif not events:
+            activity = "no_recent_events"
+        else:
+            activity = "unknown"
+        last_event_hours = round(ms_to_hours(now_ms - events[0]["timestamp"]), 2) if events else None
+        return {"cluster_activity": activity, "cluster_resize_count": resize_count,
+                "cluster_last_event_hours": last_event_hours}
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__cluster_locks.clear()
+            self.__activities.clear()
+
+    def __fetch_events(self, cluster_id: str, fetch, now_ms: int) -> list[dict] | None:
+        """Read the cluster's events within the window, most recent first. Returns None if the first page failed."""
+        request = {"cluster_id": cluster_id, "start_time": now_ms - hours_to_ms(self.window_hours),
+                   "end_time": now_ms, "order": "DESC", "limit": self.page_size}
+        events = []
+        for page in range(self.max_pages):
+            response = fetch(request)
+            if not isinstance(response, dict) or response.get("http_status_code", 200) != 200:
+                return None if page == 0 else events
+            events.extend(response.get("events", []))
+            if response.get("next_page"):
+                request = response["next_page"] # The request body for the next page
+            elif response.get("next_page_token"):
+                request = {**request, "page_token": response["next_page_token"]}
+            else:
+                break
+        return events
@@ -0,0 +1,63 @@
+import threading
+import time
+import pytest
+from cluster_activity import ClusterActivityProbe
+
+NOW_MS = 1760000000000
+MINUTE_MS = 60000
+
+def event(minutes_ago, event_type):
+    return {"cluster_id": "c1", "timestamp": NOW_MS - minutes_ago * MINUTE_MS, "type": event_type}
+
+def test_classify():
+    probe = ClusterActivityProbe(thrash_min_resizes=3)
+    assert probe.classify(None, NOW_MS)["cluster_activity"] == "unknown"
+    # No events is not a sign of idleness (a steadily working cluster may emit none)
+    assert probe.classify([], NOW_MS) \
+        == {"cluster_activity": "no_recent_events", "cluster_resize_count": 0, "cluster_last_event_hours": None}
+    assert probe.classify([event(30, "AUTOSCALING_STATS_REPORT")], NOW_MS)["cluster_activity"] == "active"
+    assert probe.classify([event(30, "EDITED")], NOW_MS)["cluster_activity"] == "unknown"
+    # The most recent health report wins, regardless of the order of the events
+    assert probe.classify([event(30, "DRIVER_HEALTHY"), event(10, "DRIVER_NOT_RESPONDING")], NOW_MS)["cluster_activity"] == "idle"
+    assert probe.classify([event(10, "DRIVER_HEALTHY"), event(30, "DRIVER_NOT_RESPONDING")], NOW_MS)["cluster_activity"] == "active"
+    thrashing = probe.classify([event(i, "RESIZING") for i in range(3)] + [event(90, "EDITED")], NOW_MS)
+    assert thrashing == {"cluster_activity": "thrashing", "cluster_resize_count": 3, "cluster_last_event_hours": 0.0}
+
+def test_activity_paginates_and_caches():
+    probe = ClusterActivityProbe(window_hours=2.0, page_size=2, max_pages=2)
+    requests = []
+
+    def fetch(request):
+        requests.append(request)
+        page = int(request.get("page_token", 0))
+        return {"events": [event(page * 2 + 1, "NODES_LOST"), event(page * 2 + 2, "NODES_LOST")],
+                "next_page_token": str(page + 1), "http_status_code": 200}
+
+    activity = probe.activity("https://a", "c1", fetch, now_ms=NOW_MS)
+    assert activity["cluster_resize_count"] == 4 # Stopped after max_pages
+    assert requests[0] == {"cluster_id": "c1", "start_time": NOW_MS - 2 * 3600000, "end_time": NOW_MS,
+                           "order": "DESC", "limit": 2}
+    assert probe.activity("https://a", "c1", fetch) == activity
+    assert len(requests) == 2
+    probe.activity("https://b", "c1", fetch, now_ms=NOW_MS) # Cluster IDs are only unique within a workspace
+    assert len(requests) == 4
+    probe.clear()
+    probe.activity("https://a", "c1", fetch, now_ms=NOW_MS)
+    assert len(requests) == 6
+
+def test_activity_fetches_once_under_concurrency():
+    probe = ClusterActivityProbe()
+    calls = []
+
+    def fetch(request):
+        calls.append(request)
+        time.sleep(0.05)
+        return {"events": [event(1, "DRIVER_HEALTHY")]}
+
+    threads = [threading.Thread(target=probe.activity, args=("https://a", "c1", fetch, NOW_MS)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert probe.activity("https://a", "c1", fetch)["cluster_activity"] == "active"
@@ -0,0 +1,347 @@
+import base64
+import gzip
+import re
+import threading
+import time
+import requests
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+from utils import json_codec
+
+class HttpTransport:
+    """
+    HTTP layer shared by JobAlerter, SecretsHelper and Slackbot. The default implementation simply wraps the
+    Requests library; subclasses can record or replay traffic (see RecordingTransport and ReplayTransport).
+    Responses only need to provide status_code and content (raw bytes).
+    """
+
+    def get(self, url: str, headers: dict | None = None, params: dict | None = None):
+        return requests.get(url, headers=headers, params=params)
+
+    def post(self, url: str, headers: dict | None = None, data: bytes | None = None, json: dict | None = None):
+        return requests.post(url, headers=headers, data=data, json=json)
+
+class CassetteMissError(LookupError):
+    """Raised by ReplayTransport when a request has no recorded response."""
+
+class ReplayResponse:
+    """Response served from a cassette, exposing the subset of requests.Response used in this repository."""
+
+    def __init__(self, status_code: int, content: bytes) -> None:
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json_codec.loads(self.content)
+
+    def __repr__(self) -> str:
+        return f"<ReplayResponse [{self.status_code}]>"
+
+# Slack incoming webhook URLs embed their secret in the path
+_SLACK_WEBHOOK_PATTERN = re.compile(r"(https://hooks\.slack\.com/services/)[^?#]+")
+# Response fields that may contain credentials
+_SENSITIVE_RESPONSE_FIELDS = {"token_value", "access_token", "refresh_token", "client_secret"}
+
+def redact_url(url: str) -> str:
+    """Return the URL with embedded secrets (e.g. in Slack webhook URLs) replaced by a placeholder."""
+    return _SLACK_WEBHOOK_PATTERN.sub(r"\1REDACTED", url)
+
+def redact_content(url: str, content: bytes) -> bytes:
+    """Return a response body with credentials (secret values, tokens) replaced by placeholders."""
+    is_secret_value = "/secrets/get" in url
+    if not is_secret_value and not any(field.encode("utf-8") in content for field in _SENSITIVE_RESPONSE_FIELDS):
+        return content
+    try:
+        body = json_codec.loads(content)
+    except json_codec.JSONDecodeError:
+        return content
+    if not isinstance(body, dict):
+        return content
+    if is_secret_value and "value" in body:
+        body["value"] = base64.b64encode(b"REDACTED").decode("ascii")
+    for field in _SENSITIVE_RESPONSE_FIELDS & body.keys():
+        body[field] = "REDACTED"
+    return json_codec.dumps(body)
+
+def request_key(method: str, url: str, params: dict | None) -> str:
+    """Return the key used to match a request against recorded responses (credentials are never part of it)."""
+    params_str = "&".join(f"{k}={params[k]}" for k in sorted(params)) if params else ""
+    return f"{method} {redact_url(url)}?{params_str}"
+
+class RecordingTransport(HttpTransport):
+    """
+    Transport that performs real requests and records the responses, which are written to a gzip-compressed
+    cassette file by save(). Authorization headers are never recorded, and secrets in URLs and response bodies
+    are redacted. Request bodies (e.g. Slack payloads) are not recorded.
+    """
+
+    def __init__(self, path: str, inner: HttpTransport | None = None) -> None:
+        """
+        Args:
+            path: Cassette file path to write to (conventionally ending in .jsonl.gz).
+            inner: Transport used to perform the actual requests.
+        """
+        self.path = path
+        self.inner = inner or HttpTransport()
+        self.__entries = []
+        self.__lock = threading.Lock()
+
+    def get(self, url: str, headers: dict | None = None, params: dict | None = None):
+        start = time.perf_counter()
+        response = self.inner.get(url, headers=headers, params=params)
+        self.__record("GET", url, params, response, time.perf_counter() - start)
+        return response
+
+    def post(self, url: str, headers: dict | None = None, data: bytes | None = None, json: dict | None = None):
+        start = time.perf_counter()
+        response = self.inner.post(url, headers=headers, data=data, json=json)
+        self.__record("POST", url, None, response, time.perf_counter() - start)
+        return response
+
+    def save(self) -> int:
+        """Write all recorded responses to the cassette file and return the number of entries written."""
+        with self.__lock:
+            entries = list(self.__entries)
+        with gzip.open(self.path, "wb") as f:
+            f.write(json_codec.dumps({"version": 1}) + b"\n")
+            for entry in entries:
+                f.write(json_codec.dumps(entry) + b"\n")
+        return len(entries)
+
+    def __record(self, method: str, url: str, params: dict | None, response, elapsed_s: float) -> None:
+        content = redact_content(url, response.content or b"")
+        entry = {"key": request_key(method, url, params), "status_code": response.status_code,
+                 "content": base64.b64encode(content).decode("ascii"), "elapsed_s": elapsed_s}
+        with self.__lock:
+            self.__entries.append(entry)
+
+class ReplayTransport(HttpTransport):
+    """
+    Transport that serves responses from a cassette written by RecordingTransport, without any network access.
+    Repeated identical requests are served the recorded responses in order (the last one is then reused).
+    """
+
+    def __init__(self, path: str, latency_scale: float = 0.0) -> None:
+        """
+        Args:
+            path: Cassette file path to read from.
+            latency_scale: Multiplier for the recorded latency of each response (1.0 replays the original
+                           latency, 0.0 serves responses immediately).
+        """
+        self.path = path
+        self.latency_scale = latency_scale
+        self.__responses = {}
+        self.__next_index = {}
+        self.__lock = threading.Lock()
+        with gzip.open(path, "rb") as f:
+            header = json_codec.loads(f.readline())
+            if header.get("version") != 1:
+                raise ValueError(f"ReplayTransport: Unsupported cassette version in {path}.")
+            for line in f:
+                entry = json_codec.loads(line)
+                self.__responses.setdefault(entry["key"], []).append(entry)
+
+    def get(self, url: str, headers: dict | None = None, params: dict | None = None):
+        return self.__replay("GET", url, params)
+
+    def post(self, url: str, headers: dict | None = None, data: bytes | None = None, json: dict | None = None):
+        return self.__replay("POST", url, None)
+
+    def __replay(self, method: str, url: str, params: dict | None) -> ReplayResponse:
+        key = request_key(method, url, params)
+        with self.__lock:
+            entries = self.__responses.get(key)
+            if not entries:
+                raise CassetteMissError(f"ReplayTransport: No recorded response for: {key}")
+            index = self.__next_index.get(key, 0)
+            self.__next_index[key] = index + 1
+            entry = entries[min(index, len(entries) - 1)]
+        if self.latency_scale > 0:
+            time.sleep(entry["elapsed_s"] * self.latency_scale)
+        return ReplayResponse(entry["status_code"], base64.b64decode(entry["content"]))
+
+class HedgedTransport(HttpTransport):
+    """
+    Transport that hedges idempotent GETs to cut tail latency: if a request to one of the hedged endpoints has not
+    completed after the given percentile of that endpoint's recent latencies (per host), a duplicate request is
+    sent and whichever response arrives first is returned. The other request is cancelled if it has not started
+    yet, and otherwise left to complete in the background with its response discarded (requests cannot abort
+    an in-flight call).
+
+    Extra load is bounded: hedging only starts once min_samples latencies of an endpoint have been observed, and
+    at most max_hedge_fraction of an endpoint's requests are hedged. The hedge delay is measured from when a request
+    starts running, so that time spent queued behind other requests does not trigger hedges, and only the latencies
+    of original requests (including those a hedge answered before) are sampled.
+
+    The caller can also admit each hedge through hedge_admission, e.g. to count it against a request budget or
+    concurrency limit: it is called with the URL before a hedge is sent, and returns None to refuse the hedge, or a
+    function to call with the hedge's response (None if it failed) and latency (None if it was not sent) once it
+    completes. Requests, hedges, refused hedges and hedge wins (hedges that answered first) are counted per host
+    and endpoint, see stats(). Other requests are passed through unchanged.
+    """
+    default_endpoints = ("/jobs/runs/list", "/jobs/get", "/clusters/get")
+
+    def __init__(self, inner: HttpTransport | None = None, endpoints: tuple[str, ...] = default_endpoints,
+                 percentile: float = 95.0, min_samples: int = 20, window_size: int = 200,
+                 max_hedge_fraction: float = 0.1, min_delay_s: float = 0.05, max_workers: int = 32) -> None:
+        """
+        Args:
+            inner: Transport used to perform the actual requests.
+            endpoints: Paths (after the API version, e.g. "/jobs/get") of the idempotent GETs to hedge.
+            percentile: Latency percentile of an endpoint after which a request to it is hedged.
+            min_samples: Number of latencies of an endpoint to observe before hedging its requests.
+            window_size: Number of recent latencies per endpoint that the percentile is computed over.
+            max_hedge_fraction: Maximum fraction of an endpoint's requests that are hedged.
+            min_delay_s: Minimum time to wait before hedging a request.
+            max_workers: Maximum number of concurrent hedged-endpoint requests (including hedges).
+        """
+        self.inner = inner or HttpTransport()
+        self.endpoints = tuple(endpoints)
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.max_hedge_fraction = max_hedge_fraction
+        self.min_delay_s = min_delay_s
+        self.hedge_admission = None # Optional function admitting hedges (see above)
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.__lock = threading.Lock()
+        self.__latencies = {} # (host, endpoint) -> recent latencies in seconds
+        self.__counts = {}    # (host, endpoint) -> {"requests", "hedges", "hedges_refused", "hedge_wins"}
+
+    def get(self, url: str, headers: dict | None = None, params: dict | None = None):
+        key = self.__endpoint_key(url)
+        if key is None:
+            return self.inner.get(url, headers=headers, params=params)
+
+        def timed_get(started: threading.Event | None = None):
+            if started is not None:
+                started.set()
+            start = time.perf_counter()
+            response = self.inner.get(url, headers=headers, params=params)
+            return response, time.perf_counter() - start
+
+        def observe_primary(future):
+            if not future.cancelled() and future.exception() is None:
+                self.__observe(key, future.result()[1])
+
+        delay_s = self.__start_request(key)
+        started = threading.Event()
+        primary = self.__executor.submit(timed_get, started)
+        # The primary's latency is observed even if a hedge answers first, so that slow responses are sampled
+        primary.add_done_callback(observe_primary)
+        if delay_s is None or self.__completes_within(primary, started, delay_s):
+            return primary.result()[0]
+        finish_hedge = self.__start_hedge(key, url)
+        if finish_hedge is None:
+            return primary.result()[0]
+
+        def hedged_get():
+            start = time.perf_counter()
+            response = None
+            try:
+                response = self.inner.get(url, headers=headers, params=params)
+                return response, time.perf_counter() - start
+            finally:
+                finish_hedge(response, time.perf_counter() - start)
+
+        hedge = self.__executor.submit(hedged_get)
+        hedge.add_done_callback(lambda future: finish_hedge(None, None) if future.cancelled() else None)
+        done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        winner = primary if primary in done else hedge
+        if winner.exception() is not None and pending:
+            winner = pending.pop() # Fall back to the other request if the first one to complete failed
+        for future in pending:
+            future.cancel()
+        if winner is hedge:
+            self.__count_hedge_win(key)
+        return winner.result()[0]
+
+    def post(self, url: str, headers: dict | None = None, data: bytes | None = None, json: dict | None = None):
+        return self.inner.post(url, headers=headers, data=data, json=json)
+
+    def hedge_delay_s(self, url: str) -> float | None:
+        """Time after which a GET of the given URL is hedged (None if it is not hedged yet)."""
+        key = self.__endpoint_key(url)
+        if key is None:
+            return None
+        with self.__lock:
+            return self.__hedge_delay_s(key)
+
+    def stats(self) -> dict[str, dict[str, dict]]:
+        """
+        Return the requests, hedges, refused hedges and hedge wins of each hedged endpoint by host, with the current
+        hedge delay.
+        """
+        with self.__lock:
+            stats = {}
+            for (host, endpoint), counts in self.__counts.items():
+                delay_s = self.__hedge_delay_s((host, endpoint))
+                stats.setdefault(host, {})[endpoint] = {
+                    **counts, "hedge_delay_ms": round(delay_s * 1000, 1) if delay_s is not None else None}
+            return stats
+
+    def close(self) -> None:
+        self.__executor.shutdown(wait=False, cancel_futures=True)
+
+    def __endpoint_key(self, url: str) -> tuple[str, str] | None:
+        """Return the (host, endpoint) of a URL if its endpoint is hedged, else None."""
+        parsed = urlparse(url)
+        endpoint = next((endpoint for endpoint in self.endpoints if parsed.path.endswith(endpoint)), None)
+        return (parsed.netloc, endpoint) if endpoint is not None else None
+
+    def __hedge_delay_s(self, key: tuple[str, str]) -> float | None:
+        latencies = self.__latencies.get(key)
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay_s, ordered[index])
+
+    def __start_request(self, key: tuple[str, str]) -> float | None:
+        """Count a request and return the time after which to hedge it (None if it is not to be hedged)."""
+        with self.__lock:
+            counts = self.__counts.setdefault(key, {"requests": 0, "hedges": 0, "hedges_refused": 0, "hedge_wins": 0})
+            counts["requests"] += 1
+            return self.__hedge_delay_s(key)
+
+    @staticmethod
+    def __completes_within(future, started: threading.Event, timeout_s: float) -> bool:
+        """Wait for a request to complete within timeout_s of when it started running, and return whether it did."""
+        while not started.wait(timeout=timeout_s):
+            if future.done(): # Cancelled before it started (e.g. by close())
+                return True
+        return future in wait([future], timeout=timeout_s).done
+
+    def __start_hedge(self, key: tuple[str, str], url: str):
+        """
+        Count a hedge and return the function to call once it completes, or None if hedging it would exceed
+        max_hedge_fraction of the endpoint's requests or it is refused by hedge_admission.
+        """
+        with self.__lock:
+            counts = self.__counts[key]
+            if counts["hedges"] + 1 > self.max_hedge_fraction * counts["requests"]:
+                return None
+            finish = (lambda response, elapsed_s: None) if self.hedge_admission is None else self.hedge_admission(url)
+            if finish is None:
+                counts["hedges_refused"] += 1
+                return None
+            counts["hedges"] += 1
+            return finish
+
+    def __count_hedge_win(self, key: tuple[str, str]) -> None:
+        with self.__lock:
+            self.__counts[key]["hedge_wins"] += 1
+
+    def __observe(self, key: tuple[str, str], elapsed_s: float) -> None:
+        with self.__lock:
+            latencies = self.__latencies.setdefault(key, deque(maxlen=self.window_size))
+            latencies.append(elapsed_s)
@@ -0,0 +1,135 @@
+import base64
+import gzip
+import pytest
+import threading
+import time
+from http_transport import *
+
+class FakeResponse:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+class FakeTransport(HttpTransport):
+    def __init__(self):
+        self.counter = 0
+
+    def get(self, url, headers=None, params=None):
+        self.counter += 1
+        if "/secrets/get" in url:
+            return FakeResponse(200, b'{"key":"k","value":"c2VjcmV0"}')
+        return FakeResponse(200, b'{"count":%d}' % self.counter)
+
+    def post(self, url, headers=None, data=None, json=None):
+        return FakeResponse(200, b"ok")
+
+def test_redact_url():
+    assert redact_url("https://hooks.slack.com/services/T0/B1/xyz") == "https://hooks.slack.com/services/REDACTED"
+    assert redact_url("https://myenv.cloud.databricks.com/api/2.2/jobs/get") \
+        == "https://myenv.cloud.databricks.com/api/2.2/jobs/get"
+
+def test_request_key_ignores_param_order():
+    assert request_key("GET", "https://a", {"b": 1, "a": 2}) == request_key("GET", "https://a", {"a": 2, "b": 1})
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    recorder = RecordingTransport(path, inner=FakeTransport())
+    headers = {"Authorization": "Bearer dapiSECRET"}
+    assert recorder.get("https://a/api/2.2/jobs/get", headers=headers, params={"job_id": 1}).content == b'{"count":1}'
+    recorder.get("https://a/api/2.2/jobs/get", headers=headers, params={"job_id": 1})
+    recorder.get("https://a/api/2.0/secrets/get", headers=headers, params={"scope": "s", "key": "k"})
+    recorder.post("https://hooks.slack.com/services/T0/B1/xyz", data=b"{}")
+    assert recorder.save() == 4
+
+    with gzip.open(path, "rb") as f:
+        raw = f.read()
+    assert b"dapiSECRET" not in raw and b"xyz" not in raw and b"c2VjcmV0" not in raw
+
+    replayer = ReplayTransport(path)
+    assert replayer.get("https://a/api/2.2/jobs/get", params={"job_id": 1}).json() == {"count": 1}
+    assert replayer.get("https://a/api/2.2/jobs/get", params={"job_id": 1}).json() == {"count": 2}
+    assert replayer.get("https://a/api/2.2/jobs/get", params={"job_id": 1}).json() == {"count": 2} # Last reused
+    secret = replayer.get("https://a/api/2.0/secrets/get", params={"scope": "s", "key": "k"}).json()
+    assert base64.b64decode(secret["value"]) == b"REDACTED"
+    assert replayer.post("https://hooks.slack.com/services/T9/B9/other", data=b"{}").status_code == 200
+    with pytest.raises(CassetteMissError):
+        replayer.get("https://a/api/2.2/jobs/get", params={"job_id": 2})
+
+class SlowTransport(HttpTransport):
+    """Transport whose GETs take the given number of seconds, in call order (then the last one)."""
+
+    def __init__(self, delays_s):
+        self.delays_s = list(delays_s)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, params=None):
+        with self.lock:
+            delay_s = self.delays_s[min(self.calls, len(self.delays_s) - 1)]
+            self.calls += 1
+        time.sleep(delay_s)
+        return FakeResponse(200, b'{"delay_s":%.2f}' % delay_s)
+
+def test_hedged_transport_hedges_stragglers():
+    url = "https://a/api/2.2/jobs/get"
+    inner = SlowTransport([0.01] * 20 + [0.5, 0.01, 0.01])
+    transport = HedgedTransport(inner, min_samples=20, min_delay_s=0.02, max_hedge_fraction=0.1)
+    for _ in range(20):
+        transport.get(url, params={"job_id": 1})
+    assert transport.hedge_delay_s(url) == pytest.approx(0.02, abs=0.03)
+
+    start = time.perf_counter()
+    assert transport.get(url, params={"job_id": 1}).content == b'{"delay_s":0.01}' # The hedge wins
+    assert time.perf_counter() - start < 0.3
+    counts = transport.stats()["a"]["/jobs/get"]
+    assert (counts["requests"], counts["hedges"], counts["hedge_wins"]) == (21, 1, 1)
+    transport.close()
+
+def test_hedged_transport_samples_primary_latency_when_hedge_wins():
+    url = "https://a/api/2.2/jobs/get"
+    inner = SlowTransport([0.0] * 20 + [0.3, 0.0])
+    transport = HedgedTransport(inner, percentile=100, min_samples=20, min_delay_s=0.02, max_hedge_fraction=0.1)
+    for _ in range(20):
+        transport.get(url)
+    assert transport.get(url).content == b'{"delay_s":0.00}' # The hedge wins
+    deadline = time.perf_counter() + 5.0
+    while transport.hedge_delay_s(url) < 0.3 and time.perf_counter() < deadline:
+        time.sleep(0.01) # The primary completes in the background
+    assert transport.hedge_delay_s(url) >= 0.3
+    transport.close()
+
+def test_hedged_transport_admission_and_queueing():
+    url = "https://a/api/2.2/jobs/get"
+    inner = SlowTransport([0.0] * 20 + [0.3, 0.0])
+    transport = HedgedTransport(inner, min_samples=20, min_delay_s=0.05, max_hedge_fraction=1.0, max_workers=1)
+    admitted_urls = []
+    transport.hedge_admission = lambda hedge_url: admitted_urls.append(hedge_url) # Refuses all hedges (None)
+    for _ in range(20):
+        transport.get(url)
+
+    # With a single worker, the second request waits for the slow first one, which does not make it a straggler
+    threads = [threading.Thread(target=transport.get, args=(url,)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert admitted_urls == [url]
+    counts = transport.stats()["a"]["/jobs/get"]
+    assert (counts["requests"], counts["hedges"], counts["hedges_refused"]) == (22, 0, 1)
+    assert inner.calls == 22
+    transport.close()
+
+def test_hedged_transport_bounds_hedges_and_passes_through():
+    url = "https://a/api/2.2/clusters/get"
+    inner = SlowTransport([0.0] * 10 + [0.02])
+    transport = HedgedTransport(inner, min_samples=10, min_delay_s=0.01, max_hedge_fraction=0.1)
+    for _ in range(30):
+        transport.get(url)
+    counts = transport.stats()["a"]["/clusters/get"]
+    assert counts["requests"] == 30 and 1 <= counts["hedges"] <= 3
+    assert inner.calls == 30 + counts["hedges"]
+
+    transport.get("https://a/api/2.2/jobs/runs/get") # Not hedged
+    assert transport.hedge_delay_s("https://a/api/2.2/jobs/runs/get") is None
+    assert "/jobs/runs/get" not in transport.stats()["a"]
+    transport.close()
@@ -0,0 +1,199 @@
+import heapq
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class JobRunTable:
+    """
+    Column-wise view of the job runs returned by JobAlerter.get_job_runs(), for answering questions like
+    "which are the 10 longest running runs" or "how many stuck runs does each creator have" without re-walking
+    the dict of lists of dicts.
+
+    - Numeric columns (run_id, job_id, start_time, time_from_start_hours and the estimated costs) are NumPy
+      arrays, so filters, sorts and top-k selection are vectorized. If NumPy is not installed, plain lists and
+      Python loops are used instead, with identical results.
+    - Rows can be looked up by run_id in O(1).
+    - Row indices grouped by workspace, creator, job_id and cluster are computed once, on construction.
+    - The original dict of lists of dicts is available via the job_runs_lists property (built lazily), so the
+      table can be passed wherever the output of get_job_runs() was used before.
+
+    Tables are immutable: filter/sort methods return new tables sharing the same run dictionaries.
+    """
+
+    numeric_columns = {"run_id": "int64", "job_id": "int64", "start_time": "int64", "time_from_start_hours": "float64",
+                       "estimated_cost_per_hour": "float64", "estimated_cost_so_far": "float64"}
+    string_columns = ["workspace", "run_name", "creator_user_name", "cluster_id"]
+    group_keys = ["workspace", "creator_user_name", "job_id", "cluster_id"]
+
+    def __init__(self, rows: list[dict], workspaces: list[str], workspace_urls: list[str] | None = None) -> None:
+        """
+        Args:
+            rows: Job run dictionaries (as returned by JobAlerter.get_job_runs()).
+            workspaces: Workspace URL of each row.
+            workspace_urls: All workspace URLs in order, including those without runs (kept in job_runs_lists).
+        """
+        if len(rows) != len(workspaces):
+            raise ValueError("JobRunTable: Each row needs exactly one workspace.")
+        self.__rows = rows
+        self.__workspace_urls = workspace_urls if workspace_urls is not None else list(dict.fromkeys(workspaces))
+        self.__job_runs_lists = None
+
+        self.__columns = {"workspace": workspaces}
+        for name in self.string_columns[1:]:
+            self.__columns[name] = [row.get(name) for row in rows]
+        for name, dtype in self.numeric_columns.items():
+            missing = float("nan") if dtype == "float64" else -1
+            values = [self.__to_number(row.get(name), missing) for row in rows]
+            self.__columns[name] = np.array(values, dtype=dtype) if np is not None else values
+
+        self.__run_index = {}
+        for i, (workspace_url, run_id) in enumerate(zip(workspaces, self.__columns["run_id"])):
+            self.__run_index[(workspace_url, int(run_id))] = i
+            self.__run_index.setdefault(int(run_id), i) # Run IDs are only unique within a workspace
+
+        self.__groups = {}
+        for key in self.group_keys:
+            groups = {}
+            for i, value in enumerate(self.__columns[key]):
+                groups.setdefault(self.__to_key(value), []).append(i)
+            self.__groups[key] = groups
+
+    @classmethod
+    def from_job_runs_lists(cls, job_runs_lists: dict[str, list[dict]]) -> "JobRunTable":
+        """Build a table from the output of JobAlerter.get_job_runs() (a dict of lists of job runs per workspace)."""
+        rows = []
+        workspaces = []
+        for workspace_url, job_runs_list in job_runs_lists.items():
+            rows.extend(job_runs_list)
+            workspaces.extend([workspace_url] * len(job_runs_list))
+        return cls(rows, workspaces, list(job_runs_lists))
+
+    def __len__(self) -> int:
+        return len(self.__rows)
+
+    def __iter__(self):
+        return iter(self.__rows)
+
+    @property
+    def rows(self) -> list[dict]:
+        return self.__rows
+
+    @property
+    def job_runs_lists(self) -> dict[str, list[dict]]:
+        """The runs in the format of JobAlerter.get_job_runs(): a dict of lists of job runs per workspace."""
+        if self.__job_runs_lists is None:
+            job_runs_lists = {url: [] for url in self.__workspace_urls}
+            for workspace_url, row in zip(self.__columns["workspace"], self.__rows):
+                job_runs_lists.setdefault(workspace_url, []).append(row)
+            self.__job_runs_lists = job_runs_lists
+        return self.__job_runs_lists
+
+    def column(self, name: str):
+        """Return a column (a NumPy array for numeric columns if NumPy is installed, else a list)."""
+        if name not in self.__columns:
+            raise KeyError(f"JobRunTable: Unknown column: {name}")
+        return self.__columns[name]
+
+    def get_run(self, run_id: int, workspace_url: str | None = None) -> dict | None:
+        """
+        Return the job run with the given run ID, or None if not found. If workspace_url is not given and several
+        workspaces have a run with this ID, the first one is returned.
+        """
+        key = int(run_id) if workspace_url is None else (workspace_url, int(run_id))
+        index = self.__run_index.get(key)
+        return self.__rows[index] if index is not None else None
+
+    def take(self, indices) -> "JobRunTable":
+        """Return a new table with the rows at the given indices, in that order."""
+        indices = [int(i) for i in indices]
+        workspaces = self.__columns["workspace"]
+        return JobRunTable([self.__rows[i] for i in indices], [workspaces[i] for i in indices], self.__workspace_urls)
+
+    def filter(self, mask) -> "JobRunTable":
+        """Return a new table with the rows where the given boolean mask (array or list) is True."""
+        if np is not None:
+            return self.take(np.flatnonzero(np.asarray(mask, dtype=bool)))
+        return self.take([i for i, keep in enumerate(mask) if keep])
+
+    def older_than(self, hours: float) -> "JobRunTable":
+        """Return a new table with the runs that have been running for more than the given number of hours."""
+        durations = self.__columns["time_from_start_hours"]
+        if np is not None:
+            return self.filter(durations > hours)
+        return self.filter([duration > hours for duration in durations]) # NaN compares False, as in NumPy
+
+    def where(self, name: str, value) -> "JobRunTable":
+        """Return a new table with the rows whose given column equals the value (using the group index if possible)."""
+        if name in self.__groups:
+            return self.take(self.__groups[name].get(self.__to_key(value), []))
+        return self.filter([column_value == value for column_value in self.column(name)])
+
+    def sort_by_duration(self, descending: bool = True) -> "JobRunTable":
+        """Return a new table sorted by run duration (runs without a duration last). The sort is stable."""
+        durations = self.__columns["time_from_start_hours"]
+        if np is not None:
+            keys = np.where(np.isnan(durations), -np.inf if descending else np.inf, durations)
+            order = np.argsort(-keys if descending else keys, kind="stable")
+        else:
+            missing = float("-inf") if descending else float("inf")
+            keys = [missing if duration != duration else duration for duration in durations]
+            order = sorted(range(len(keys)), key=keys.__getitem__, reverse=descending) # Also stable when reversed
+        return self.take(order)
+
+    def top_k_by_duration(self, k: int) -> "JobRunTable":
+        """Return a new table with the k longest running runs, longest first, without sorting the whole table."""
+        return self.top_k_by("time_from_start_hours", k)
+
+    def top_k_by(self, name: str, k: int) -> "JobRunTable":
+        """
+        Return a new table with the k rows with the highest values of a numeric column (e.g. estimated_cost_so_far
+        to rank stuck runs by wasted spend), highest first, without sorting the whole table. Missing values rank last.
+        """
+        if name not in self.numeric_columns:
+            raise KeyError(f"JobRunTable: Cannot rank by non-numeric column: {name}")
+        values = self.__columns[name]
+        k = min(max(k, 0), len(self))
+        if k == 0:
+            return self.take([])
+        if np is not None:
+            keys = np.asarray(values, dtype="float64")
+            keys = np.where(np.isnan(keys), -np.inf, keys)
+            # All rows with at least the k-th highest value, so that ties at the cutoff are broken by row index (as
+            # in the fallback) rather than arbitrarily by the partition
+            kth_key = -np.partition(-keys, k - 1)[k - 1]
+            candidates = np.flatnonzero(keys >= kth_key)
+            order = candidates[np.lexsort((candidates, -keys[candidates]))][:k]
+            return self.take(order)
+        keys = [float("-inf") if value != value else value for value in values]
+        return self.take(heapq.nsmallest(k, range(len(keys)), key=lambda i: (-keys[i], i)))
+
+    def group_indices(self, key: str) -> dict:
+        """
+        Return the precomputed row indices of each value of a group key (workspace, creator_user_name, job_id or
+        cluster_id).
+        """
+        if key not in self.__groups:
+            raise KeyError(f"JobRunTable: Cannot group by {key}. Supported keys: {', '.join(self.group_keys)}")
+        return self.__groups[key]
+
+    def group_by(self, key: str) -> dict:
+        """Return a new table for each value of a group key (see group_indices())."""
+        return {value: self.take(indices) for value, indices in self.group_indices(key).items()}
+
+    def group_counts(self, key: str) -> dict:
+        """Return the number of runs for each value of a group key (see group_indices())."""
+        return {value: len(indices) for value, indices in self.group_indices(key).items()}
+
+    @staticmethod
+    def __to_number(value, missing):
+        try:
+            return missing if value is None else type(missing)(value)
+        except (TypeError, ValueError): # E.g. "Unspecified" placeholders
+            return missing
+
+    @staticmethod
+    def __to_key(value):
+        """Return a hashable group key, with NumPy scalars converted to plain Python values."""
+        return value.item() if hasattr(value, "item") else value
@@ -0,0 +1,76 @@
+import math
+import pytest
+import job_run_table
+from job_run_table import JobRunTable
+
+def make_run(run_id, job_id, hours, creator="a@b.com", cluster_id="c1"):
+    return {"run_id": run_id, "job_id": job_id, "run_name": f"run_{run_id}", "creator_user_name": creator,
+            "start_time": 1000 + run_id, "time_from_start_hours": hours, "cluster_id": cluster_id}
+
+def make_job_runs_lists():
+    return {
+        "https://a": [make_run(1, 10, 5.0), make_run(2, 20, 1.0, creator="c@d.com"), make_run(3, 10, 7.0, cluster_id="c2")],
+        "https://b": [make_run(1, 30, 3.0), {"run_id": 4, "job_id": 10, "cluster_id": "Unspecified"}],
+        "https://c": [],
+    }
+
+@pytest.fixture(params=["numpy", "fallback"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(job_run_table, "np", None)
+    return request.param
+
+def test_lookup_and_dict_view(backend):
+    job_runs_lists = make_job_runs_lists()
+    table = JobRunTable.from_job_runs_lists(job_runs_lists)
+    assert len(table) == 5
+    assert table.job_runs_lists == job_runs_lists
+    assert list(table.job_runs_lists) == ["https://a", "https://b", "https://c"]
+    assert table.get_run(3)["job_id"] == 10
+    assert table.get_run(1)["job_id"] == 10
+    assert table.get_run(1, "https://b")["job_id"] == 30
+    assert table.get_run(99) is None
+    assert list(table.column("run_id")) == [1, 2, 3, 1, 4]
+    assert math.isnan(table.column("time_from_start_hours")[4])
+    with pytest.raises(KeyError):
+        table.column("unknown")
+
+def test_filter_sort_and_top_k(backend):
+    table = JobRunTable.from_job_runs_lists(make_job_runs_lists())
+    assert [run["time_from_start_hours"] for run in table.older_than(2.0)] == [5.0, 7.0, 3.0]
+    assert table.older_than(2.0).job_runs_lists == {"https://a": [table.rows[0], table.rows[2]],
+                                                    "https://b": [table.rows[3]], "https://c": []}
+    assert [run["run_id"] for run in table.sort_by_duration()] == [3, 1, 1, 2, 4]
+    assert [run["run_id"] for run in table.sort_by_duration(descending=False)] == [2, 1, 1, 3, 4]
+    assert [run["run_id"] for run in table.top_k_by_duration(2)] == [3, 1]
+    assert [run["run_id"] for run in table.top_k_by_duration(10)] == [3, 1, 1, 2, 4]
+    assert len(table.top_k_by_duration(0)) == 0
+    assert len(table.top_k_by("estimated_cost_so_far", 2)) == 2 # All missing
+    with pytest.raises(KeyError):
+        table.top_k_by("run_name", 1)
+    assert [run["run_id"] for run in table.filter([True, False, False, False, True])] == [1, 4]
+
+def test_top_k_ties_break_by_row_index(backend):
+    hours = [1.0, 3.0, 2.0, 3.0, 2.0, 2.0, 0.5, 2.0, float("nan"), 2.0]
+    table = JobRunTable([make_run(i, i, h) for i, h in enumerate(hours)], ["https://a"] * len(hours))
+    assert [run["run_id"] for run in table.top_k_by_duration(4)] == [1, 3, 2, 4]
+    assert [run["run_id"] for run in table.top_k_by_duration(9)] == [1, 3, 2, 4, 5, 7, 9, 0, 6]
+    assert [run["run_id"] for run in table.top_k_by_duration(10)][-1] == 8 # Missing values rank last
+
+    # Many ties at the cutoff, which a partition would select among arbitrarily
+    hours = [3.0 if i % 7 == 0 else 2.0 for i in range(1000)]
+    table = JobRunTable([make_run(i, i, h) for i, h in enumerate(hours)], ["https://a"] * len(hours))
+    expected = sorted(range(len(hours)), key=lambda i: (-hours[i], i))[:200]
+    assert [run["run_id"] for run in table.top_k_by_duration(200)] == expected
+
+def test_group_by(backend):
+    table = JobRunTable.from_job_runs_lists(make_job_runs_lists())
+    assert table.group_counts("workspace") == {"https://a": 3, "https://b": 2}
+    assert table.group_counts("job_id") == {10: 3, 20: 1, 30: 1}
+    assert table.group_counts("creator_user_name") == {"a@b.com": 3, "c@d.com": 1, None: 1}
+    assert [run["run_id"] for run in table.group_by("cluster_id")["c1"]] == [1, 2, 1]
+    assert [run["run_id"] for run in table.where("job_id", 10).top_k_by_duration(1)] == [3]
+    with pytest.raises(KeyError):
+        table.group_by("run_name")
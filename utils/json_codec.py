@@ -0,0 +1,78 @@
+import json
+import math
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Re-exported so callers can catch decode errors without caring which backend is active.
+# (orjson.JSONDecodeError is a subclass of json.JSONDecodeError.)
+JSONDecodeError = json.JSONDecodeError
+
+STDLIB_BACKEND = "json"
+ORJSON_BACKEND = "orjson"
+DEFAULT_BACKEND = ORJSON_BACKEND if orjson is not None else STDLIB_BACKEND
+
+# Floats that orjson may write differently from the stdlib: in exponent form (1e16 vs 1e+16), below 1e-4 in fixed
+# form (0.00001 vs 1e-05) or from 1e16 in fixed form. Strings that happen to match only cost a stdlib re-encode.
+_ORJSON_FLOAT_MISMATCH = re.compile(rb"[0-9]e[-+]?[0-9]|(?<![0-9.])0\.0000|[0-9]{17}\.")
+
+def available_backends() -> list[str]:
+    """Return the names of the JSON backends that can be used in the current environment."""
+    backends = [STDLIB_BACKEND]
+    if orjson is not None:
+        backends.append(ORJSON_BACKEND)
+    return backends
+
+def loads(data: bytes | str, backend: str | None = None):
+    """
+    Decode JSON from bytes or a string using the fastest available backend.
+    Raises JSONDecodeError on invalid (or empty) input, including bytes that are not valid UTF-8, regardless of
+    backend, and ValueError if the given backend is not available.
+    """
+    try:
+        if _backend(backend) == ORJSON_BACKEND:
+            return orjson.loads(data)
+        return json.loads(data)
+    except UnicodeDecodeError as e:
+        raise JSONDecodeError(f"Invalid UTF-8: {e.reason}", "", e.start) from e
+
+def dumps(obj, sort_keys: bool = False, backend: str | None = None) -> bytes:
+    """
+    Encode an object as compact UTF-8 JSON bytes using the fastest available backend (compact separators, no
+    ASCII escaping). Output is identical across backends: floats are written as Python's repr() writes them
+    (e.g. 1e+16), and non-finite floats (NaN, Infinity), which are not valid JSON, as null.
+    Raises ValueError if the given backend is not available.
+    """
+    if _backend(backend) == ORJSON_BACKEND:
+        try:
+            encoded = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+        except TypeError:
+            pass # E.g. non-string dict keys or integers > 64 bits; fall back to the stdlib below.
+        else:
+            if _ORJSON_FLOAT_MISMATCH.search(encoded) is None:
+                return encoded
+    try:
+        encoded = json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys, allow_nan=False)
+    except ValueError: # Non-finite floats (rare): write them as null, like orjson
+        encoded = json.dumps(_replace_non_finite(obj), separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys)
+    return encoded.encode("utf-8")
+
+def _backend(backend: str | None) -> str:
+    """Return the name of the backend to use, checking that it is available."""
+    backend = backend or DEFAULT_BACKEND
+    if backend not in available_backends():
+        raise ValueError(f"json_codec: Backend {backend!r} is not available. Available backends: {available_backends()}")
+    return backend
+
+def _replace_non_finite(obj):
+    """Return a copy of an object in which non-finite floats are replaced by None."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _replace_non_finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_replace_non_finite(value) for value in obj]
+    return obj
@@ -0,0 +1,42 @@
+import pytest
+from json_codec import *
+
+SAMPLE = {"runs": [{"run_id": 1, "run_name": "café • run", "start_time": 1742432791940,
+                    "status": {"state": "RUNNING"}, "tags": {}, "ratio": 0.1, "ok": True, "none": None}],
+          "next_page_token": "abc"}
+
+def test_roundtrip():
+    for backend in available_backends():
+        assert loads(dumps(SAMPLE, backend=backend), backend=backend) == SAMPLE
+        assert loads(dumps(SAMPLE, backend=backend).decode("utf-8"), backend=backend) == SAMPLE
+
+def test_backends_identical_output():
+    outputs = set(dumps(SAMPLE, backend=backend) for backend in available_backends())
+    assert len(outputs) == 1
+    outputs = set(dumps(SAMPLE, sort_keys=True, backend=backend) for backend in available_backends())
+    assert len(outputs) == 1
+    outputs = set(dumps([1.5, 123456789.125, -0.25, 2 ** 63], backend=backend) for backend in available_backends())
+    assert outputs == {b"[1.5,123456789.125,-0.25,9223372036854775808]"}
+    # Floats in exponent form are written as repr() writes them, and non-finite floats as null
+    floats = [1e16, 1e-05, 0.0001, 1000000000000000.0, -2.5e-300, float("nan"), float("inf"), None]
+    outputs = set(dumps({"floats": floats, "text": "1e5"}, backend=backend) for backend in available_backends())
+    assert outputs == {b'{"floats":[1e+16,1e-05,0.0001,1000000000000000.0,-2.5e-300,null,null,null],"text":"1e5"}'}
+
+def test_non_str_keys_fall_back():
+    assert dumps({1: "a"}) == b'{"1":"a"}'
+
+def test_decode_error():
+    for backend in available_backends():
+        with pytest.raises(JSONDecodeError):
+            loads(b"", backend=backend)
+        with pytest.raises(JSONDecodeError):
+            loads(b"{not json", backend=backend)
+        with pytest.raises(JSONDecodeError):
+            loads(b'{"a": "\xff"}', backend=backend) # Not valid UTF-8
+
+def test_unavailable_backend():
+    for backend in ["simdjson"] + [ORJSON_BACKEND] * (ORJSON_BACKEND not in available_backends()):
+        with pytest.raises(ValueError, match="not available"):
+            loads(b"{}", backend=backend)
+        with pytest.raises(ValueError, match="not available"):
+            dumps({}, backend=backend)
@@ -0,0 +1,101 @@
+import os
+import threading
+from utils import json_codec
+from utils.time_helpers import epoch_ms_now, hours_to_ms
+
+class MetadataCache:
+    """
+    Persistent cache of rarely changing REST API metadata (job settings, cluster specs) keyed by entity kind and ID,
+    so that each scheduled run of the StuckJobAlerter notebook (a fresh Python process) starts warm and only
+    issues the lookups that are actually stale.
+
+    An entry is stale when it is older than the TTL of its kind, or when the caller knows the entity's current
+    version (e.g. the Spark context ID of a cluster, which changes whenever the cluster restarts) and it differs
+    from the version the entry was stored with. The cache is stored as a JSON file (e.g. on a Unity Catalog
+    volume), written atomically by save(). Bumping the class version invalidates all existing cache files.
+    """
+    version = 1
+    default_ttl_hours = {"job": 1.0, "cluster": 0.25}
+
+    def __init__(self, path: str | None = None, ttl_hours: dict[str, float] | None = None) -> None:
+        """
+        Args:
+            path: Optional file path to persist the cache to. Loaded on instantiation if it exists.
+                  If not given, the cache only lives as long as this instance.
+            ttl_hours: TTL per entity kind, overriding default_ttl_hours. Kinds without a TTL are never cached.
+        """
+        self.path = path
+        self.ttl_hours = {**self.default_ttl_hours, **(ttl_hours or {})}
+        self.hits = 0
+        self.misses = 0 # Includes stale entries
+        self.__lock = threading.Lock()
+        self.__dirty = False
+        self.__entries = self.__load() # Kind -> key -> {"value": ..., "stored_ms": ..., "version": ...}
+
+    def get(self, kind: str, key, version: str | None = None, now_ms: int | None = None):
+        """Return the cached value for an entity, or None if it is missing or stale."""
+        now_ms = epoch_ms_now() if now_ms is None else now_ms
+        with self.__lock:
+            entry = self.__entries.get(kind, {}).get(str(key))
+            if entry is None or self.__is_stale(kind, entry, now_ms) \
+                    or (version is not None and entry["version"] != str(version)):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry["value"]
+
+    def put(self, kind: str, key, value, version: str | None = None, now_ms: int | None = None) -> None:
+        """Store the value for an entity (a JSON-serializable object), optionally with the entity's version."""
+        if kind not in self.ttl_hours:
+            return
+        now_ms = epoch_ms_now() if now_ms is None else now_ms
+        with self.__lock:
+            self.__entries.setdefault(kind, {})[str(key)] = {
+                "value": value, "stored_ms": now_ms, "version": str(version) if version is not None else None}
+            self.__dirty = True
+
+    def invalidate(self, kind: str, key=None) -> None:
+        """Drop the cached value of an entity, or of all entities of a kind if no key is given."""
+        with self.__lock:
+            if key is None:
+                self.__dirty |= bool(self.__entries.pop(kind, None))
+            else:
+                self.__dirty |= self.__entries.get(kind, {}).pop(str(key), None) is not None
+
+    def save(self, now_ms: int | None = None) -> None:
+        """Atomically persist the cache (without stale entries) to its file path, if it changed."""
+        if not self.path:
+            return
+        now_ms = epoch_ms_now() if now_ms is None else now_ms
+        with self.__lock:
+            if not self.__dirty:
+                return
+            entries = {kind: {key: entry for key, entry in kind_entries.items()
+                              if not self.__is_stale(kind, entry, now_ms)}
+                       for kind, kind_entries in self.__entries.items()}
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(json_codec.dumps({"version": self.version, "entries": entries}))
+            os.replace(tmp_path, self.path)
+            self.__dirty = False
+
+    def __is_stale(self, kind: str, entry: dict, now_ms: int) -> bool:
+        return kind not in self.ttl_hours or now_ms - entry["stored_ms"] >= hours_to_ms(self.ttl_hours[kind])
+
+    def __load(self) -> dict:
+        """Load the cache from disk. A missing, corrupt or incompatible file starts an empty cache."""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "rb") as f:
+                data = json_codec.loads(f.read())
+        except (OSError, json_codec.JSONDecodeError) as e:
+            print(f"MetadataCache [WARNING]: Failed to load cache from {self.path} ({e!r}). Starting from empty.")
+            return {}
+        if data.get("version") != self.version:
+            print(f"MetadataCache [WARNING]: Cache version mismatch in {self.path}. Starting from empty.")
+            return {}
+        return data["entries"]
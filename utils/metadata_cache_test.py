@@ -0,0 +1,37 @@
+from metadata_cache import MetadataCache
+
+HOUR_MS = 3600000
+
+def test_ttl_versions_and_persistence(tmp_path):
+    path = str(tmp_path / "cache" / "metadata.json")
+    cache = MetadataCache(path, ttl_hours={"job": 2.0})
+    assert cache.get("job", 1, now_ms=0) is None
+    cache.put("job", 1, {"tags": {"a": "b"}}, now_ms=0)
+    cache.put("cluster", "c1", {"num_workers": 2}, version="ctx1", now_ms=0)
+    cache.put("unknown", "x", {}, now_ms=0) # Kinds without a TTL are not cached
+    assert cache.get("job", "1", now_ms=HOUR_MS) == {"tags": {"a": "b"}}
+    assert cache.get("job", 1, now_ms=2 * HOUR_MS) is None
+    assert cache.get("cluster", "c1", version="ctx1", now_ms=0) == {"num_workers": 2}
+    assert cache.get("cluster", "c1", now_ms=0) == {"num_workers": 2}
+    assert cache.get("cluster", "c1", version="ctx2", now_ms=0) is None
+    assert (cache.hits, cache.misses) == (3, 3)
+
+    cache.save(now_ms=HOUR_MS)
+    cache = MetadataCache(path, ttl_hours={"job": 2.0})
+    assert cache.get("job", 1, now_ms=HOUR_MS) == {"tags": {"a": "b"}}
+    assert cache.get("cluster", "c1", now_ms=HOUR_MS) is None # Saved, but expired (15 minute default TTL)
+    assert cache.get("unknown", "x", now_ms=0) is None
+
+    cache.invalidate("job", 1)
+    assert cache.get("job", 1, now_ms=HOUR_MS) is None
+    cache.save(now_ms=HOUR_MS)
+    assert MetadataCache(path).get("job", 1, now_ms=HOUR_MS) is None
+
+def test_incompatible_file_starts_empty(tmp_path, capsys):
+    path = tmp_path / "metadata.json"
+    path.write_text('{"version": 0, "entries": {"job": {"1": {}}}}')
+    cache = MetadataCache(str(path))
+    assert cache.get("job", 1) is None
+    assert "version mismatch" in capsys.readouterr().out
+    cache.save() # Nothing changed
+    assert path.read_text().startswith('{"version": 0')
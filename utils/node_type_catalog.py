@@ -0,0 +1,151 @@
+import os
+import threading
+from utils import json_codec
+from utils.time_helpers import epoch_ms_now, hours_to_ms
+
+class NodeTypeCatalog:
+    """
+    Cache of each workspace's /clusters/list-node-types response, indexed by node_type_id, used to annotate
+    stuck job runs with their cluster's size and an estimated cost, without extra API calls per run.
+
+    Node types rarely change, so each workspace's catalog is fetched at most once per TTL (a week by default)
+    and, if a path is given, persisted to a JSON file (e.g. on a Unity Catalog volume) across scheduled runs.
+    A failed fetch (e.g. HTTP 403 or 5xx) is not retried for failure_ttl_minutes, so that it does not turn into
+    an extra API call per run.
+
+    Costs are estimates: the REST API does not return prices, so a node type's hourly cost is taken from
+    hourly_costs if listed there, else computed as its number of cores times cost_per_core_hour.
+    """
+    version = 1
+
+    def __init__(self, path: str | None = None, ttl_hours: float = 168.0, cost_per_core_hour: float = 0.0,
+                 hourly_costs: dict[str, float] | None = None, failure_ttl_minutes: float = 15.0) -> None:
+        """
+        Args:
+            path: Optional file path to persist the catalog to. Loaded on instantiation if it exists.
+            ttl_hours: Maximum age of a workspace's cached node types before they are fetched again.
+            failure_ttl_minutes: Time after a failed fetch of a workspace's node types before it is tried again.
+            cost_per_core_hour: Estimated cost of one core for one hour (in any currency, e.g. USD incl. DBUs).
+                                A value <= 0 disables cost estimates for node types not in hourly_costs.
+            hourly_costs: Optional estimated hourly cost per node_type_id, taking precedence over cost_per_core_hour.
+        """
+        self.path = path
+        self.ttl_hours = ttl_hours
+        self.cost_per_core_hour = cost_per_core_hour
+        self.hourly_costs = hourly_costs or {}
+        self.failure_ttl_minutes = failure_ttl_minutes
+        self.__lock = threading.Lock()
+        self.__failed_ms = {} # Workspace URL -> time of the last failed fetch (not persisted)
+        self.__workspace_locks = {} # Workspace URL -> lock, so that concurrent lookups of a workspace share one fetch
+        self.__workspaces = self.__load() # Workspace URL -> {"fetched_ms": ..., "node_types": [...]}
+        self.__indexes = {url: self.__index(entry["node_types"]) for url, entry in self.__workspaces.items()}
+
+    def node_types(self, workspace_url: str, fetch, now_ms: int | None = None) -> dict[str, dict]:
+        """
+        Return the node types of a workspace by node_type_id, calling fetch() (which must return the
+        /clusters/list-node-types response) only if the cached catalog is missing or older than the TTL.
+        After a failed fetch, the stale catalog (if any, else no node types) is returned without fetching again
+        until failure_ttl_minutes have passed. Workspaces are fetched concurrently: only lookups of the same
+        workspace wait for its fetch.
+        """
+        now_ms = epoch_ms_now() if now_ms is None else now_ms
+        with self.__lock:
+            workspace_lock = self.__workspace_locks.setdefault(workspace_url, threading.Lock())
+        with workspace_lock:
+            with self.__lock:
+                entry = self.__workspaces.get(workspace_url)
+                if entry is not None and now_ms - entry["fetched_ms"] < hours_to_ms(self.ttl_hours):
+                    return self.__indexes[workspace_url]
+                cached_index = self.__indexes.get(workspace_url, {})
+                failed_ms = self.__failed_ms.get(workspace_url)
+                if failed_ms is not None and now_ms - failed_ms < self.failure_ttl_minutes * 60000:
+                    return cached_index
+
+            response = fetch()
+            if not isinstance(response, dict) or "node_types" not in response:
+                print(f"NodeTypeCatalog [WARNING]: Failed to list node types in {workspace_url}. "
+                      f"Using the cached catalog, if any, for the next {self.failure_ttl_minutes:g} minutes.")
+                with self.__lock:
+                    self.__failed_ms[workspace_url] = now_ms
+                return cached_index
+
+            index = self.__index(response["node_types"])
+            with self.__lock:
+                self.__workspaces[workspace_url] = {"fetched_ms": now_ms, "node_types": response["node_types"]}
+                self.__indexes[workspace_url] = index
+                self.__failed_ms.pop(workspace_url, None)
+            if self.path:
+                self.save()
+            return index
+
+    def node_hourly_cost(self, node_type: dict) -> float | None:
+        """Return the estimated hourly cost of a single node of the given node type, or None if unknown."""
+        if node_type["node_type_id"] in self.hourly_costs:
+            return float(self.hourly_costs[node_type["node_type_id"]])
+        if self.cost_per_core_hour > 0 and "num_cores" in node_type:
+            return float(node_type["num_cores"]) * self.cost_per_core_hour
+        return None
+
+    def annotate_run(self, run: dict, node_types: dict[str, dict]) -> None:
+        """
+        Augment a given job run (in place) with the size and estimated cost of its cluster, based on its
+        node_type_id, driver_node_type_id and num_workers fields (as set by the cluster info enrichment):
+        - node_cores, node_memory_mb: size of a single worker node.
+        - cluster_cores, cluster_memory_mb: total size of the cluster (driver and workers), if not already set.
+        - estimated_cost_per_hour, estimated_cost_so_far: estimated cost of the cluster per hour, and since the
+          run started (based on time_from_start_hours), if a cost is known for its node types.
+        Runs with unknown node types are left unchanged. The cluster totals and costs are only set if the number
+        of workers is known: a missing num_workers (e.g. an autoscaling cluster, which has autoscale.min_workers
+        and max_workers instead, or a queued run) leaves them unset rather than costing the driver alone.
+        """
+        worker = node_types.get(run.get("node_type_id"))
+        if worker is None:
+            return
+        driver = node_types.get(run.get("driver_node_type_id"), worker)
+
+        run["node_cores"] = worker.get("num_cores")
+        run["node_memory_mb"] = worker.get("memory_mb")
+        num_workers = run.get("num_workers")
+        if not isinstance(num_workers, int) or isinstance(num_workers, bool):
+            return
+        if "cluster_cores" not in run and "num_cores" in worker and "num_cores" in driver:
+            run["cluster_cores"] = driver["num_cores"] + num_workers * worker["num_cores"]
+        if "cluster_memory_mb" not in run and "memory_mb" in worker and "memory_mb" in driver:
+            run["cluster_memory_mb"] = driver["memory_mb"] + num_workers * worker["memory_mb"]
+
+        worker_cost = self.node_hourly_cost(worker)
+        driver_cost = self.node_hourly_cost(driver)
+        if worker_cost is not None and driver_cost is not None:
+            run["estimated_cost_per_hour"] = round(driver_cost + num_workers * worker_cost, 4)
+            if "time_from_start_hours" in run:
+                run["estimated_cost_so_far"] = round(run["estimated_cost_per_hour"] * run["time_from_start_hours"], 2)
+
+    def save(self) -> None:
+        """Atomically persist the catalog to its file path."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with self.__lock:
+            with open(tmp_path, "wb") as f:
+                f.write(json_codec.dumps({"version": self.version, "workspaces": self.__workspaces}))
+            os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def __index(node_types: list[dict]) -> dict[str, dict]:
+        return {node_type["node_type_id"]: node_type for node_type in node_types if "node_type_id" in node_type}
+
+    def __load(self) -> dict:
+        """Load the catalog from disk. A missing, corrupt or incompatible file starts an empty catalog."""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "rb") as f:
+                data = json_codec.loads(f.read())
+        except (OSError, json_codec.JSONDecodeError) as e:
+            print(f"NodeTypeCatalog [WARNING]: Failed to load catalog from {self.path} ({e!r}). Starting from empty.")
+            return {}
+        if data.get("version") != self.version:
+            print(f"NodeTypeCatalog [WARNING]: Catalog version mismatch in {self.path}. Starting from empty.")
+            return {}
+        return data["workspaces"]
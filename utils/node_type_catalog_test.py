@@ -0,0 +1,101 @@
+import threading
+import pytest
+from node_type_catalog import NodeTypeCatalog
+
+HOUR_MS = 3600000
+NODE_TYPES = {"node_types": [{"node_type_id": "m5d.large", "num_cores": 2.0, "memory_mb": 8192},
+                             {"node_type_id": "m5d.xlarge", "num_cores": 4.0, "memory_mb": 16384},
+                             {"node_type_id": "g5.xlarge", "num_cores": 4.0, "memory_mb": 16384}]}
+
+class Fetcher:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.response
+
+def test_cache_ttl_and_persistence(tmp_path):
+    path = str(tmp_path / "catalog" / "node_types.json")
+    fetch = Fetcher(NODE_TYPES)
+    catalog = NodeTypeCatalog(path, ttl_hours=24)
+    assert catalog.node_types("https://a", fetch, now_ms=0)["m5d.large"]["num_cores"] == 2.0
+    catalog.node_types("https://a", fetch, now_ms=23 * HOUR_MS)
+    assert fetch.calls == 1
+
+    # Loaded from disk, then refreshed once the TTL has passed
+    catalog = NodeTypeCatalog(path, ttl_hours=24)
+    assert sorted(catalog.node_types("https://a", fetch, now_ms=HOUR_MS)) == ["g5.xlarge", "m5d.large", "m5d.xlarge"]
+    assert fetch.calls == 1
+    catalog.node_types("https://a", fetch, now_ms=25 * HOUR_MS)
+    assert fetch.calls == 2
+
+    # Failed refreshes keep the stale catalog, and are not retried until the failure TTL has passed
+    failing = Fetcher({"error_code": "PERMISSION_DENIED", "http_status_code": 403})
+    assert "m5d.large" in catalog.node_types("https://a", failing, now_ms=50 * HOUR_MS)
+    assert failing.calls == 1
+    for _ in range(3): # E.g. once per enriched run
+        assert catalog.node_types("https://b", failing, now_ms=50 * HOUR_MS) == {}
+    assert failing.calls == 2
+    assert "m5d.large" in catalog.node_types("https://a", failing, now_ms=50 * HOUR_MS + 60000)
+    assert failing.calls == 2
+    assert "m5d.large" in catalog.node_types("https://b", fetch, now_ms=50 * HOUR_MS + 16 * 60000)
+    assert fetch.calls == 3
+
+def test_workspaces_are_fetched_concurrently():
+    catalog = NodeTypeCatalog()
+    b_fetched = threading.Event()
+    fetch_b = Fetcher(NODE_TYPES)
+
+    def fetch_a():
+        # Only returns once workspace b was fetched, which must not wait for this (slow) fetch to complete
+        assert b_fetched.wait(timeout=5.0)
+        return NODE_TYPES
+
+    thread = threading.Thread(target=catalog.node_types, args=("https://a", fetch_a, 0))
+    thread.start()
+    assert "m5d.large" in catalog.node_types("https://b", fetch_b, now_ms=0)
+    b_fetched.set()
+    thread.join()
+    assert "m5d.large" in catalog.node_types("https://a", Fetcher(None), now_ms=0) # Cached by the first fetch
+    assert fetch_b.calls == 1
+
+def test_corrupt_file_starts_empty(tmp_path, capsys):
+    path = tmp_path / "node_types.json"
+    path.write_text("{not json")
+    assert NodeTypeCatalog(str(path)).node_types("https://a", Fetcher(NODE_TYPES)) != {}
+    assert "WARNING" in capsys.readouterr().out
+
+def test_annotate_run():
+    catalog = NodeTypeCatalog(cost_per_core_hour=0.5, hourly_costs={"g5.xlarge": 10.0})
+    node_types = catalog.node_types("https://a", Fetcher(NODE_TYPES))
+
+    run = {"node_type_id": "m5d.large", "driver_node_type_id": "m5d.xlarge", "num_workers": 3,
+           "time_from_start_hours": 2.5}
+    catalog.annotate_run(run, node_types)
+    assert run["node_cores"] == 2.0 and run["node_memory_mb"] == 8192
+    assert run["cluster_cores"] == 10.0 and run["cluster_memory_mb"] == 16384 + 3 * 8192
+    assert run["estimated_cost_per_hour"] == 2.0 + 3 * 1.0
+    assert run["estimated_cost_so_far"] == 12.5
+
+    # Cluster size from /clusters/get is kept
+    run = {"node_type_id": "g5.xlarge", "driver_node_type_id": "g5.xlarge", "num_workers": 0, "cluster_cores": 99.0}
+    catalog.annotate_run(run, node_types)
+    assert run["cluster_cores"] == 99.0
+    assert run["estimated_cost_per_hour"] == 10.0
+    assert "estimated_cost_so_far" not in run
+
+    # Autoscaling clusters (and queued runs) have no num_workers: their size and cost are unknown
+    run = {"node_type_id": "m5d.large", "autoscale": {"min_workers": 2, "max_workers": 8}, "time_from_start_hours": 1.0}
+    catalog.annotate_run(run, node_types)
+    assert run["node_cores"] == 2.0
+    assert not {"cluster_cores", "estimated_cost_per_hour", "estimated_cost_so_far"} & set(run)
+
+    run = {"node_type_id": "unknown"}
+    catalog.annotate_run(run, node_types)
+    assert run == {"node_type_id": "unknown"}
+
+    run = {"node_type_id": "m5d.large", "num_workers": 1}
+    NodeTypeCatalog().annotate_run(run, node_types) # No prices
+    assert run["cluster_cores"] == 4.0 and "estimated_cost_per_hour" not in run
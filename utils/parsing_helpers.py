@@ -1,4 +1,6 @@
+import hashlib
 import json
+from utils import json_codec
 
 def pretty_print_json(object_to_serialize: dict[str, str]) -> None:
     """Helper for more readable printing in JSON format."""
@@ -9,4 +11,13 @@ def get_counts_in_dict_list(dict_list: dict) -> dict:
     counts = {}
     for key in dict_list:
         counts[key] = len(dict_list[key])
-    return counts
\ No newline at end of file
+    return counts
+
+def content_hash(obj: dict, fields: list[str] | None = None) -> str:
+    """
+    Return a short, stable hash of a JSON-serializable dictionary (optionally restricted to the given fields).
+    Key order does not affect the result.
+    """
+    if fields is not None:
+        obj = {k: obj[k] for k in fields if k in obj}
+    return hashlib.blake2b(json_codec.dumps(obj, sort_keys=True), digest_size=8).hexdigest()
@@ -4,4 +4,9 @@ from parsing_helpers import *
 def test_get_counts_in_dict_list(): 
     dict_list = {"A": [1], "B": [1, 2, 3], "C": []}
     counts = get_counts_in_dict_list(dict_list)
-    assert counts == {'A': 1, 'B': 3, 'C': 0}
\ No newline at end of file
+    assert counts == {'A': 1, 'B': 3, 'C': 0}
+
+def test_content_hash():
+    assert content_hash({"a": 1, "b": {"c": [1, 2]}}) == content_hash({"b": {"c": [1, 2]}, "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 2})
+    assert content_hash({"a": 1, "b": 2}, fields=["a", "missing"]) == content_hash({"a": 1})
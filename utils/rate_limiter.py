@@ -0,0 +1,39 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter: allows bursts of up to `burst` requests, refilled at `rate_per_s`.
+    Callers block in acquire() until a token is available, so concurrent workers share a single rate limit
+    (e.g. per workspace) without coordinating with each other.
+    """
+
+    def __init__(self, rate_per_s: float, burst: float | None = None, clock=time.monotonic, sleep=time.sleep) -> None:
+        """
+        Args:
+            rate_per_s: Sustained number of requests per second. A value <= 0 disables rate limiting.
+            burst: Maximum number of requests that can be made at once (defaults to one second's worth, min 1).
+            clock, sleep: Time functions, e.g. to be replaced in tests.
+        """
+        self.rate_per_s = rate_per_s
+        self.burst = burst if burst is not None else max(1.0, rate_per_s)
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__tokens = self.burst
+        self.__updated = clock()
+        self.__lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take the given number of tokens, waiting until they are available. Returns the time waited in seconds."""
+        if self.rate_per_s <= 0:
+            return 0.0
+        with self.__lock:
+            now = self.__clock()
+            self.__tokens = min(self.burst, self.__tokens + (now - self.__updated) * self.rate_per_s)
+            self.__updated = now
+            # Reserve the tokens right away (possibly going into debt), so that waiters are served in order
+            self.__tokens -= tokens
+            wait_s = -self.__tokens / self.rate_per_s if self.__tokens < 0 else 0.0
+        if wait_s > 0:
+            self.__sleep(wait_s)
+        return wait_s
@@ -0,0 +1,28 @@
+import pytest
+from rate_limiter import TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def test_token_bucket_burst_then_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_s=10.0, burst=5, clock=clock, sleep=clock.sleep)
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+    assert bucket.acquire() == pytest.approx(0.1)
+    assert clock.now == pytest.approx(0.1)
+    clock.now += 10.0 # Refills up to the burst size only
+    assert sum(bucket.acquire() for _ in range(5)) == 0.0
+    assert bucket.acquire() == pytest.approx(0.1)
+
+def test_token_bucket_disabled():
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_s=0.0, clock=clock, sleep=clock.sleep)
+    assert sum(bucket.acquire() for _ in range(1000)) == 0.0
+    assert clock.now == 0.0
@@ -0,0 +1,98 @@
+import math
+import threading
+
+class RequestBudget:
+    """
+    Per-scan, per-workspace budget of REST API calls, so that the alerter never takes more than its share of a
+    workspace's rate limits (which it shares with production orchestration).
+
+    Every call is counted per endpoint. Calls are grouped into categories that are given up in degradation_order
+    as the budget runs low: each category may only spend the budget down to its reserve (a fraction of the budget
+    kept for the categories after it). Optional enrichment (cluster activity, cluster info, full run details and
+    job tags) is thus skipped before listing job runs, which may spend the budget down to zero. Endpoints outside
+    these categories (e.g. cancelling runs) are counted and never refused.
+
+    Call start_scan() at the start of each scan of a workspace (JobAlerter does so in get_workspace_job_runs()).
+    """
+    # Error code of the responses to refused calls (which are not sent)
+    exhausted_error_code = "REQUEST_BUDGET_EXHAUSTED"
+    # Categories, from the first to be given up to the last
+    degradation_order = ("cluster_activity", "cluster_info", "run_details", "job_tags", "listing")
+    endpoint_categories = {
+        "/clusters/events": "cluster_activity",
+        "/clusters/get": "cluster_info",
+        "/clusters/list-node-types": "cluster_info",
+        "/jobs/runs/get": "run_details",
+        "/jobs/get": "job_tags",
+        "/jobs/runs/list": "listing",
+    }
+    default_reserves = {"cluster_activity": 0.4, "cluster_info": 0.3, "run_details": 0.2, "job_tags": 0.1, "listing": 0.0}
+
+    def __init__(self, max_requests: int, reserves: dict[str, float] | None = None) -> None:
+        """
+        Args:
+            max_requests: Maximum number of REST API calls per workspace per scan. A value <= 0 only counts calls.
+            reserves: Fraction of the budget each category must leave for the categories after it in
+                      degradation_order (defaults to default_reserves).
+        """
+        self.max_requests = max_requests
+        self.reserves = {**self.default_reserves, **(reserves or {})}
+        unknown = set(self.reserves) - set(self.degradation_order)
+        if unknown:
+            raise ValueError(f"RequestBudget: Unknown categories {sorted(unknown)}. Expected {self.degradation_order}.")
+        self.__lock = threading.Lock()
+        self.__consumed = {} # Workspace URL -> endpoint -> number of calls made
+        self.__refused = {}  # Workspace URL -> endpoint -> number of calls refused
+
+    def start_scan(self, workspace_url: str) -> None:
+        """Reset the workspace's counts for a new scan."""
+        with self.__lock:
+            self.__consumed[workspace_url] = {}
+            self.__refused[workspace_url] = {}
+
+    def try_acquire(self, workspace_url: str, endpoint: str) -> bool:
+        """Count a call to the given endpoint, or return False (counting it as refused) if it is not within budget."""
+        category = self.endpoint_categories.get(endpoint)
+        with self.__lock:
+            consumed = self.__consumed.setdefault(workspace_url, {})
+            if self.max_requests > 0 and category is not None:
+                reserve = math.ceil(self.reserves[category] * self.max_requests - 1e-9) # E.g. 0.3 * 10 is not exact
+                if sum(consumed.values()) + 1 > self.max_requests - reserve:
+                    refused = self.__refused.setdefault(workspace_url, {})
+                    refused[endpoint] = refused.get(endpoint, 0) + 1
+                    return False
+            consumed[endpoint] = consumed.get(endpoint, 0) + 1
+            return True
+
+    def count(self, workspace_url: str, endpoint: str) -> None:
+        """Count a call that is exempt from the budget (e.g. polling runs being cancelled, outside of a scan)."""
+        with self.__lock:
+            consumed = self.__consumed.setdefault(workspace_url, {})
+            consumed[endpoint] = consumed.get(endpoint, 0) + 1
+
+    def remaining(self, workspace_url: str) -> int | None:
+        """Number of calls left in the workspace's budget (None if there is no budget)."""
+        if self.max_requests <= 0:
+            return None
+        with self.__lock:
+            return max(0, self.max_requests - sum(self.__consumed.get(workspace_url, {}).values()))
+
+    def report(self) -> dict[str, dict]:
+        """
+        Return the consumed versus budgeted calls of the last scan of each workspace: the budget, the calls made
+        (in total and per endpoint), the calls refused per endpoint, and the categories that were degraded.
+        """
+        with self.__lock:
+            report = {}
+            for workspace_url in self.__consumed:
+                consumed = dict(self.__consumed[workspace_url])
+                refused = dict(self.__refused.get(workspace_url, {}))
+                degraded = {self.endpoint_categories[endpoint] for endpoint in refused}
+                report[workspace_url] = {
+                    "budget": self.max_requests if self.max_requests > 0 else None,
+                    "consumed": sum(consumed.values()),
+                    "consumed_by_endpoint": consumed,
+                    "refused_by_endpoint": refused,
+                    "degraded": [category for category in self.degradation_order if category in degraded],
+                }
+            return report
@@ -0,0 +1,44 @@
+import pytest
+from request_budget import RequestBudget
+
+WORKSPACE = "https://ws.example.com"
+
+def test_request_budget_degrades_enrichment_before_listing():
+    budget = RequestBudget(10) # Reserves: activity 4, cluster info 3, run details 2, tags 1, listing 0
+    assert [budget.try_acquire(WORKSPACE, "/clusters/events") for _ in range(7)] == [True] * 6 + [False]
+    assert budget.try_acquire(WORKSPACE, "/clusters/get")
+    assert not budget.try_acquire(WORKSPACE, "/clusters/get")
+    assert budget.try_acquire(WORKSPACE, "/jobs/runs/get")
+    assert budget.try_acquire(WORKSPACE, "/jobs/get")
+    assert not budget.try_acquire(WORKSPACE, "/jobs/get")
+    assert budget.try_acquire(WORKSPACE, "/jobs/runs/list")
+    assert budget.remaining(WORKSPACE) == 0
+    assert not budget.try_acquire(WORKSPACE, "/jobs/runs/list")
+    assert budget.try_acquire(WORKSPACE, "/jobs/runs/cancel") # Not budgeted, only counted
+
+    report = budget.report()[WORKSPACE]
+    assert report["budget"] == 10
+    assert report["consumed"] == 11
+    assert report["consumed_by_endpoint"] == {"/clusters/events": 6, "/clusters/get": 1, "/jobs/runs/get": 1,
+                                              "/jobs/get": 1, "/jobs/runs/list": 1, "/jobs/runs/cancel": 1}
+    assert report["refused_by_endpoint"] == {"/clusters/events": 1, "/clusters/get": 1, "/jobs/get": 1,
+                                             "/jobs/runs/list": 1}
+    assert report["degraded"] == ["cluster_activity", "cluster_info", "job_tags", "listing"]
+
+def test_request_budget_is_per_workspace_and_per_scan():
+    budget = RequestBudget(2)
+    other = "https://other.example.com"
+    assert budget.try_acquire(WORKSPACE, "/jobs/runs/list") and budget.try_acquire(WORKSPACE, "/jobs/runs/list")
+    assert not budget.try_acquire(WORKSPACE, "/jobs/runs/list")
+    assert budget.try_acquire(other, "/jobs/runs/list")
+    budget.start_scan(WORKSPACE)
+    assert budget.remaining(WORKSPACE) == 2
+    assert budget.report()[WORKSPACE]["refused_by_endpoint"] == {}
+
+def test_request_budget_disabled_only_counts():
+    budget = RequestBudget(0)
+    assert all(budget.try_acquire(WORKSPACE, "/clusters/events") for _ in range(100))
+    assert budget.remaining(WORKSPACE) is None
+    assert budget.report()[WORKSPACE]["consumed"] == 100
+    with pytest.raises(ValueError):
+        RequestBudget(10, reserves={"unknown": 0.5})
@@ -0,0 +1,154 @@
+import os
+import threading
+from utils import json_codec
+from utils.time_helpers import epoch_ms_now, hours_to_ms
+
+class ScanCheckpoint:
+    """
+    Checkpoint of a scan's progress, so that a scan that outlives the Databricks task timeout (or otherwise dies)
+    can be resumed by the next run of the notebook instead of starting over from the first page.
+
+    For each workspace, the checkpoint holds the processed (enriched) job runs, the number of qualifying runs and
+    the page token to continue listing from, plus the pipeline stages that completed (e.g. "scanned", "posted").
+    It is stored as an append-only JSON lines file (e.g. on local disk or a Unity Catalog volume): a header
+    with the scan arguments, then one line per commit, written and flushed to disk in a single write. A commit
+    is thus atomic: a torn last line (from a crash mid-write) is ignored on load, and the scan resumes from the
+    previous commit, redoing at most one page. Resuming rewrites the file compactly (atomically, via os.replace).
+
+    A checkpoint is resumed if it was written for the same scan arguments and its last commit is at most
+    max_age_hours old; otherwise a new one is started. Call finish() once the results have been used (e.g. the
+    alerts posted), so that the next scan starts from scratch.
+
+    Resumed runs are not checked again: a run that finished after it was committed is still reported as running,
+    with its durations (of the run and its running tasks) and estimated cost updated to the current time. To that
+    end, JobAlerter commits simplified runs with the few task fields it needs. max_age_hours bounds how stale resumed runs can be, so it
+    should be about the interval between scheduled scans (the default is hourly). A longer age saves more of a
+    slow scan's progress, at the cost of alerting on more runs that have since finished.
+    """
+    version = 1
+
+    def __init__(self, path: str, max_age_hours: float = 1.0) -> None:
+        """
+        Args:
+            path: File path of the checkpoint.
+            max_age_hours: Maximum age of the last commit for the checkpoint to be resumed (see above).
+        """
+        self.path = path
+        self.max_age_hours = max_age_hours
+        self.resumed = False # Whether the current scan was resumed from an existing checkpoint
+        self.__lock = threading.Lock()
+        self.__scan_args = None
+        self.__workspaces = {} # Workspace URL -> state (see workspace())
+
+    def open(self, scan_args: dict, now_ms: int | None = None) -> bool:
+        """
+        Resume the checkpoint file if it matches the scan arguments (and is recent enough), or start a new one.
+        Does nothing if the checkpoint is already open for the same arguments. Returns whether it was resumed.
+        """
+        now_ms = epoch_ms_now() if now_ms is None else now_ms
+        with self.__lock:
+            if self.__scan_args == scan_args:
+                return self.resumed
+            self.__scan_args = scan_args
+            self.__workspaces, last_commit_ms = self.__load(scan_args)
+            self.resumed = last_commit_ms is not None and now_ms - last_commit_ms <= hours_to_ms(self.max_age_hours)
+            if not self.resumed:
+                self.__workspaces = {}
+            # Rewrite the file with one commit per workspace, which also drops a torn last line (if any), so that
+            # new commits are appended after valid ones. The time of the last commit is kept, so that the age of
+            # the checkpoint is not reset by resuming it.
+            commit_ms = last_commit_ms if self.resumed else now_ms
+            records = [{"version": self.version, "scan_args": scan_args, "timestamp_ms": commit_ms}]
+            for workspace_url, state in self.__workspaces.items():
+                records.append({"workspace_url": workspace_url, "runs": state["runs"], "num_runs": state["num_runs"],
+                                "page_token": state["page_token"], "timestamp_ms": commit_ms})
+                records.extend({"workspace_url": workspace_url, "stage": stage, "timestamp_ms": commit_ms}
+                               for stage in sorted(state["stages"]))
+            tmp_path = self.path + ".tmp"
+            self.__write(records, path=tmp_path, mode="wb")
+            os.replace(tmp_path, self.path)
+            return self.resumed
+
+    def workspace(self, workspace_url: str) -> dict | None:
+        """
+        Return the checkpointed state of a workspace (None if nothing was committed for it): its processed
+        runs, num_runs (qualifying runs listed so far), page_token (to continue listing from, None once listed)
+        and stages (set of completed stages).
+        """
+        with self.__lock:
+            state = self.__workspaces.get(workspace_url)
+            if state is None:
+                return None
+            return {"runs": list(state["runs"]), "num_runs": state["num_runs"], "page_token": state["page_token"],
+                    "stages": set(state["stages"])}
+
+    def commit_page(self, workspace_url: str, runs: list[dict], num_runs: int, page_token: str | None) -> None:
+        """Commit the processed runs of a page, with the number of runs listed so far and the next page token."""
+        self.__commit({"workspace_url": workspace_url, "runs": runs, "num_runs": num_runs, "page_token": page_token})
+
+    def commit_stage(self, workspace_url: str, stage: str, runs: list[dict] | None = None,
+                     num_runs: int | None = None) -> None:
+        """Commit the completion of a stage for a workspace, optionally with (more of) its processed runs."""
+        record = {"workspace_url": workspace_url, "stage": stage, "runs": runs or []}
+        if num_runs is not None:
+            record["num_runs"] = num_runs
+        self.__commit(record)
+
+    def finish(self) -> None:
+        """Delete the checkpoint file, so that the next scan starts from scratch."""
+        with self.__lock:
+            self.__scan_args = None
+            self.__workspaces = {}
+            self.resumed = False
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def __commit(self, record: dict) -> None:
+        with self.__lock:
+            if self.__scan_args is None:
+                raise RuntimeError("ScanCheckpoint: open() must be called before committing.")
+            self.__apply(self.__workspaces, record)
+            self.__write([{**record, "timestamp_ms": epoch_ms_now()}])
+
+    @staticmethod
+    def __apply(workspaces: dict, record: dict) -> None:
+        state = workspaces.setdefault(record["workspace_url"],
+                                      {"runs": [], "num_runs": 0, "page_token": None, "stages": set()})
+        state["runs"].extend(record.get("runs", []))
+        if "num_runs" in record:
+            state["num_runs"] = record["num_runs"]
+        if "page_token" in record:
+            state["page_token"] = record["page_token"]
+        if "stage" in record:
+            state["stages"].add(record["stage"])
+
+    def __write(self, records: list[dict], path: str | None = None, mode: str = "ab") -> None:
+        path = path or self.path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, mode) as f:
+            f.write(b"".join(json_codec.dumps(record) + b"\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __load(self, scan_args: dict) -> tuple[dict, int | None]:
+        """Load the committed workspace states and the time of the last commit (None if not resumable)."""
+        if not os.path.exists(self.path):
+            return {}, None
+        workspaces = {}
+        last_commit_ms = None
+        with open(self.path, "rb") as f:
+            for i, line in enumerate(f):
+                try:
+                    record = json_codec.loads(line)
+                except json_codec.JSONDecodeError:
+                    print(f"ScanCheckpoint [WARNING]: Ignoring torn commit in {self.path}.")
+                    break
+                if i == 0:
+                    if record.get("version") != self.version or record.get("scan_args") != scan_args:
+                        return {}, None
+                else:
+                    self.__apply(workspaces, record)
+                last_commit_ms = record["timestamp_ms"]
+        return workspaces, last_commit_ms
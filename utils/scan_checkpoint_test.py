@@ -0,0 +1,58 @@
+from scan_checkpoint import ScanCheckpoint
+from time_helpers import epoch_ms_now, hours_to_ms
+
+WORKSPACE = "https://ws.example.com"
+SCAN_ARGS = {"older_than_hours": 2.0, "limit": 0}
+
+def test_checkpoint_resumes_committed_pages(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    checkpoint = ScanCheckpoint(path)
+    assert not checkpoint.open(SCAN_ARGS)
+    assert checkpoint.workspace(WORKSPACE) is None
+    checkpoint.commit_page(WORKSPACE, [{"run_id": 1}], 1, "25")
+    checkpoint.commit_page(WORKSPACE, [{"run_id": 2}, {"run_id": 3}], 3, "50")
+    checkpoint.commit_stage("https://other.example.com", "scanned", runs=[{"run_id": 4}], num_runs=1)
+
+    resumed = ScanCheckpoint(path)
+    assert resumed.open(SCAN_ARGS) and resumed.resumed
+    assert resumed.workspace(WORKSPACE) == {"runs": [{"run_id": 1}, {"run_id": 2}, {"run_id": 3}], "num_runs": 3,
+                                            "page_token": "50", "stages": set()}
+    assert resumed.workspace("https://other.example.com")["stages"] == {"scanned"}
+    assert resumed.open(SCAN_ARGS) # Already open for the same arguments
+
+    resumed.finish()
+    assert not ScanCheckpoint(path).open(SCAN_ARGS)
+
+def test_checkpoint_ignores_torn_commit(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    checkpoint = ScanCheckpoint(path)
+    checkpoint.open(SCAN_ARGS)
+    checkpoint.commit_page(WORKSPACE, [{"run_id": 1}], 1, "25")
+    with open(path, "ab") as f:
+        f.write(b'{"workspace_url": "https://ws.example.com", "runs": [{"run_')
+
+    resumed = ScanCheckpoint(path)
+    assert resumed.open(SCAN_ARGS)
+    assert resumed.workspace(WORKSPACE)["page_token"] == "25"
+    resumed.commit_page(WORKSPACE, [{"run_id": 2}], 2, None) # Appended after the valid commits
+    assert ScanCheckpoint(path).open(SCAN_ARGS)
+    assert ScanCheckpoint(path).open(SCAN_ARGS) # Resuming does not lose commits
+    final = ScanCheckpoint(path)
+    final.open(SCAN_ARGS)
+    assert final.workspace(WORKSPACE)["runs"] == [{"run_id": 1}, {"run_id": 2}]
+
+def test_checkpoint_starts_over_for_other_args_or_stale(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    checkpoint = ScanCheckpoint(path, max_age_hours=1.0)
+    checkpoint.open(SCAN_ARGS)
+    checkpoint.commit_page(WORKSPACE, [{"run_id": 1}], 1, "25")
+
+    assert not ScanCheckpoint(path).open({**SCAN_ARGS, "limit": 10})
+    assert not ScanCheckpoint(path).open(SCAN_ARGS) # Overwritten by the scan with other arguments
+
+    checkpoint = ScanCheckpoint(path, max_age_hours=1.0)
+    checkpoint.open(SCAN_ARGS)
+    checkpoint.commit_page(WORKSPACE, [{"run_id": 1}], 1, "25")
+    stale = ScanCheckpoint(path, max_age_hours=1.0)
+    assert not stale.open(SCAN_ARGS, now_ms=epoch_ms_now() + hours_to_ms(2.0))
+    assert stale.workspace(WORKSPACE) is None
@@ -0,0 +1,269 @@
+import bisect
+import mmap
+import os
+import shutil
+import struct
+import sys
+from utils.parsing_helpers import content_hash
+from utils.time_helpers import epoch_ms_now, hours_to_ms
+
+class ScanHistoryStore:
+    """
+    Append-only, columnar history of stuck job runs found by each scan, for questions like
+    "how often is job X stuck" without re-querying the Databricks REST API.
+
+    On-disk layout (under the store directory):
+    - CURRENT: name of the active generation directory (swapped atomically on compaction).
+    - <generation>/<column>.col: one fixed-width little-endian file per column. Row i of the history is
+      entry i of every column file. Columns are read through memory mapping, so queries only touch the
+      columns (and, for time-bounded queries, the row range) they need.
+    - <generation>/strings.bin: string dictionary of length-prefixed UTF-8 strings. String columns store
+      the index of their value in this dictionary.
+
+    Rows are appended in scan order, so the scan_time_ms column is sorted and time ranges are found by
+    binary search. Partially written appends (e.g. the process was killed) are discarded on open.
+    Each column file is mapped once per generation (and remapped when appends outgrow the mapping); call
+    close() to release the mappings.
+    """
+
+    # Column name -> struct/array typecode. "I" columns hold string dictionary indices.
+    columns = {
+        "scan_time_ms": "q",
+        "workspace": "I",
+        "job_id": "q",
+        "run_id": "q",
+        "start_time_ms": "q",
+        "duration_ms": "q",
+        "cluster": "I",
+        "tags_hash": "Q",
+    }
+    string_columns = ["workspace", "cluster"]
+
+    def __init__(self, path: str, retention_days: float | None = None, compaction_slack_days: float = 1.0) -> None:
+        """
+        Args:
+            path: Directory of the store. Created if it does not exist.
+            retention_days: If set, compact() drops rows from scans older than this many days. append_scan()
+                            calls compact() once the oldest rows are compaction_slack_days past retention_days.
+            compaction_slack_days: Time past the retention period after which rows are dropped, so that the
+                                   store is rewritten about once per compaction_slack_days rather than on every scan.
+        """
+        if sys.byteorder != "little":
+            raise RuntimeError("ScanHistoryStore: Memory-mapped columns require a little-endian platform.")
+        self.path = path
+        self.retention_days = retention_days
+        self.compaction_slack_days = compaction_slack_days
+        self.__mappings = {} # Column name -> mmap of its file in the current generation
+        os.makedirs(path, exist_ok=True)
+
+        current_path = os.path.join(path, "CURRENT")
+        if not os.path.exists(current_path):
+            self.__write_generation(self.__new_generation_name(), {name: b"" for name in self.columns}, [])
+        with open(current_path, "r") as f:
+            self.__generation = f.read().strip()
+        self.__load()
+
+    def __len__(self) -> int:
+        return self.__num_rows
+
+    def append_scan(self, job_runs_lists: dict[str, list[dict]], scan_time_ms: int | None = None) -> int:
+        """
+        Append compact records of the given scan results (in the format outputted by JobAlerter.get_job_runs())
+        and return the number of rows appended. Compacts the store if its oldest rows are past retention (see
+        compaction_slack_days).
+        """
+        scan_time_ms = epoch_ms_now() if scan_time_ms is None else scan_time_ms
+        if self.__num_rows > 0 and scan_time_ms < self.__last_scan_time_ms:
+            raise ValueError("ScanHistoryStore: Scans must be appended in chronological order.")
+
+        rows = {name: [] for name in self.columns}
+        for workspace_url, job_runs_list in job_runs_lists.items():
+            for run in job_runs_list:
+                rows["scan_time_ms"].append(scan_time_ms)
+                rows["workspace"].append(self.__string_id(workspace_url))
+                rows["job_id"].append(int(run["job_id"]))
+                rows["run_id"].append(int(run["run_id"]))
+                rows["start_time_ms"].append(int(run["start_time"]))
+                rows["duration_ms"].append(int(run.get("time_from_start", scan_time_ms - run["start_time"])))
+                rows["cluster"].append(self.__string_id(str(run.get("cluster_id", ""))))
+                rows["tags_hash"].append(int(content_hash(run.get("job_tags", {})), 16))
+
+        num_new_rows = len(rows["scan_time_ms"])
+        if num_new_rows == 0:
+            return 0
+
+        # New strings are written before the rows referencing them, so a crash never leaves dangling indices.
+        self.__flush_new_strings()
+        for name, typecode in self.columns.items():
+            with open(self.__column_path(name), "ab") as f:
+                f.write(struct.pack(f"<{num_new_rows}{typecode}", *rows[name]))
+        self.__num_rows += num_new_rows
+        self.__last_scan_time_ms = scan_time_ms
+        if self.retention_days is not None and self.column("scan_time_ms")[0] \
+                < scan_time_ms - hours_to_ms((self.retention_days + self.compaction_slack_days) * 24):
+            self.compact(now_ms=scan_time_ms)
+        return num_new_rows
+
+    def column(self, name: str) -> memoryview:
+        """Return a read-only, memory-mapped view of a column (indexable like a list of ints)."""
+        if name not in self.columns:
+            raise KeyError(f"ScanHistoryStore: Unknown column: {name}")
+        if self.__num_rows == 0:
+            return memoryview(b"").cast(self.columns[name])
+        mapped = self.__mappings.get(name)
+        if mapped is None or len(mapped) < self.__num_rows * struct.calcsize(self.columns[name]):
+            # Views returned earlier keep the previous mapping alive until they are released
+            with open(self.__column_path(name), "rb") as f:
+                mapped = self.__mappings[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped).cast(self.columns[name])
+        return view[:self.__num_rows]
+
+    def row_range(self, since_ms: int | None = None, until_ms: int | None = None) -> range:
+        """Return the range of row indices for scans in [since_ms, until_ms), found by binary search."""
+        scan_times = self.column("scan_time_ms")
+        start = 0 if since_ms is None else bisect.bisect_left(scan_times, since_ms)
+        end = len(scan_times) if until_ms is None else bisect.bisect_left(scan_times, until_ms)
+        return range(start, max(start, end))
+
+    def rows(self, columns: list[str], since_ms: int | None = None, until_ms: int | None = None):
+        """
+        Yield rows (as tuples in the order of the given columns) for scans in [since_ms, until_ms).
+        Only the requested columns are read. String columns are decoded from the dictionary.
+        """
+        row_range = self.row_range(since_ms, until_ms)
+        views = [self.column(name)[row_range.start:row_range.stop] for name in columns]
+        decoders = [self.__strings.__getitem__ if name in self.string_columns else None for name in columns]
+        for values in zip(*views):
+            yield tuple(decode(value) if decode else value for decode, value in zip(decoders, values))
+
+    def stuck_scan_counts(self, since_ms: int | None = None, until_ms: int | None = None) -> dict[tuple[str, int], int]:
+        """Return the number of scans in which each (workspace, job_id) had at least one stuck run."""
+        seen = set()
+        for scan_time_ms, workspace, job_id in self.rows(["scan_time_ms", "workspace", "job_id"], since_ms, until_ms):
+            seen.add((scan_time_ms, workspace, job_id))
+        counts = {}
+        for _, workspace, job_id in seen:
+            counts[(workspace, job_id)] = counts.get((workspace, job_id), 0) + 1
+        return counts
+
+    def compact(self, now_ms: int | None = None) -> int:
+        """
+        Rewrite the store into a new generation, dropping rows older than the retention period (if set) and
+        strings no longer referenced. The new generation is swapped in atomically. Returns the number of rows dropped.
+        """
+        now_ms = epoch_ms_now() if now_ms is None else now_ms
+        since_ms = None
+        if self.retention_days is not None:
+            since_ms = now_ms - hours_to_ms(self.retention_days * 24)
+        row_range = self.row_range(since_ms=since_ms)
+
+        strings = []
+        string_ids = {}
+        column_data = {}
+        for name, typecode in self.columns.items():
+            values = self.column(name)[row_range.start:row_range.stop]
+            if name in self.string_columns:
+                remapped = []
+                for value in values:
+                    string = self.__strings[value]
+                    if string not in string_ids:
+                        string_ids[string] = len(strings)
+                        strings.append(string)
+                    remapped.append(string_ids[string])
+                values = remapped
+            column_data[name] = struct.pack(f"<{len(values)}{typecode}", *values)
+
+        del values # Release the last column view, so that close() can unmap it
+        old_generation = self.__generation
+        self.close()
+        self.__write_generation(self.__new_generation_name(), column_data, strings)
+        with open(os.path.join(self.path, "CURRENT"), "r") as f:
+            self.__generation = f.read().strip()
+        shutil.rmtree(os.path.join(self.path, old_generation), ignore_errors=True)
+
+        num_dropped = self.__num_rows - len(row_range)
+        self.__load()
+        return num_dropped
+
+    def close(self) -> None:
+        """
+        Release the column mappings (the store can still be used, columns are mapped again on demand).
+        Mappings still referenced by views returned by column() or rows() are unmapped once those are released.
+        """
+        for mapped in self.__mappings.values():
+            try:
+                mapped.close()
+            except BufferError:
+                pass # Still exported to a view
+        self.__mappings.clear()
+
+    def __column_path(self, name: str) -> str:
+        return os.path.join(self.path, self.__generation, name + ".col")
+
+    def __strings_path(self) -> str:
+        return os.path.join(self.path, self.__generation, "strings.bin")
+
+    def __new_generation_name(self) -> str:
+        existing = [name for name in os.listdir(self.path) if name.startswith("gen-")]
+        number = max([int(name[4:]) for name in existing], default=0) + 1
+        return f"gen-{number:06d}"
+
+    def __write_generation(self, generation: str, column_data: dict[str, bytes], strings: list[str]) -> None:
+        """Write a complete generation directory, then atomically point CURRENT at it."""
+        generation_path = os.path.join(self.path, generation)
+        os.makedirs(generation_path)
+        for name, data in column_data.items():
+            with open(os.path.join(generation_path, name + ".col"), "wb") as f:
+                f.write(data)
+        with open(os.path.join(generation_path, "strings.bin"), "wb") as f:
+            f.write(self.__encode_strings(strings))
+        tmp_path = os.path.join(self.path, "CURRENT.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(generation)
+        os.replace(tmp_path, os.path.join(self.path, "CURRENT"))
+
+    def __load(self) -> None:
+        """Load the string dictionary and row count, discarding any partially written trailing data."""
+        with open(self.__strings_path(), "rb") as f:
+            data = f.read()
+        self.__strings = []
+        offset = 0
+        while offset + 4 <= len(data):
+            (length,) = struct.unpack_from("<I", data, offset)
+            if offset + 4 + length > len(data):
+                break
+            self.__strings.append(data[offset + 4:offset + 4 + length].decode("utf-8"))
+            offset += 4 + length
+        if offset != len(data):
+            os.truncate(self.__strings_path(), offset)
+        self.__string_ids = {string: i for i, string in enumerate(self.__strings)}
+        self.__num_flushed_strings = len(self.__strings)
+
+        self.__num_rows = min(os.path.getsize(self.__column_path(name)) // struct.calcsize(typecode)
+                              for name, typecode in self.columns.items())
+        for name, typecode in self.columns.items():
+            if os.path.getsize(self.__column_path(name)) != self.__num_rows * struct.calcsize(typecode):
+                os.truncate(self.__column_path(name), self.__num_rows * struct.calcsize(typecode))
+        self.__last_scan_time_ms = self.column("scan_time_ms")[-1] if self.__num_rows > 0 else 0
+
+    def __string_id(self, string: str) -> int:
+        string_id = self.__string_ids.get(string)
+        if string_id is None:
+            string_id = len(self.__strings)
+            self.__strings.append(string)
+            self.__string_ids[string] = string_id
+        return string_id
+
+    def __flush_new_strings(self) -> None:
+        if self.__num_flushed_strings < len(self.__strings):
+            with open(self.__strings_path(), "ab") as f:
+                f.write(self.__encode_strings(self.__strings[self.__num_flushed_strings:]))
+            self.__num_flushed_strings = len(self.__strings)
+
+    @staticmethod
+    def __encode_strings(strings: list[str]) -> bytes:
+        encoded = []
+        for string in strings:
+            data = string.encode("utf-8")
+            encoded.append(struct.pack("<I", len(data)) + data)
+        return b"".join(encoded)
@@ -0,0 +1,77 @@
+import os
+import pytest
+from scan_history import ScanHistoryStore
+
+DAY_MS = 24 * 3600000
+
+def make_run(run_id, job_id, cluster_id="c1", tags=None):
+    return {"run_id": run_id, "job_id": job_id, "start_time": 1000, "time_from_start": 5000,
+            "cluster_id": cluster_id, "job_tags": tags or {}}
+
+def test_append_and_query(tmp_path):
+    store = ScanHistoryStore(str(tmp_path / "history"))
+    assert len(store) == 0
+    assert list(store.rows(["job_id"])) == []
+
+    store.append_scan({"https://a": [make_run(1, 10), make_run(2, 20, "c2")], "https://b": []}, scan_time_ms=DAY_MS)
+    store.append_scan({"https://a": [make_run(1, 10)], "https://b": [make_run(3, 10, "c3")]}, scan_time_ms=2 * DAY_MS)
+    assert len(store) == 4
+    assert list(store.column("run_id")) == [1, 2, 1, 3]
+    assert list(store.rows(["workspace", "cluster"], since_ms=2 * DAY_MS)) == [("https://a", "c1"), ("https://b", "c3")]
+    assert store.stuck_scan_counts() == {("https://a", 10): 2, ("https://a", 20): 1, ("https://b", 10): 1}
+    assert store.stuck_scan_counts(until_ms=2 * DAY_MS) == {("https://a", 10): 1, ("https://a", 20): 1}
+
+    with pytest.raises(ValueError):
+        store.append_scan({"https://a": [make_run(1, 10)]}, scan_time_ms=DAY_MS)
+
+    # Reopen from disk
+    store = ScanHistoryStore(str(tmp_path / "history"))
+    assert list(store.column("job_id")) == [10, 20, 10, 10]
+    assert list(store.rows(["cluster"]))[-1] == ("c3",)
+
+def test_partial_append_discarded(tmp_path):
+    path = str(tmp_path / "history")
+    store = ScanHistoryStore(path)
+    store.append_scan({"https://a": [make_run(1, 10)]}, scan_time_ms=DAY_MS)
+    generation = open(os.path.join(path, "CURRENT")).read()
+    with open(os.path.join(path, generation, "run_id.col"), "ab") as f:
+        f.write(b"\x01\x02\x03") # Torn write
+    with open(os.path.join(path, generation, "strings.bin"), "ab") as f:
+        f.write(b"\xff\x00\x00\x00ab") # Torn string record
+    store = ScanHistoryStore(path)
+    assert len(store) == 1
+    store.append_scan({"https://a": [make_run(2, 10, "c9")]}, scan_time_ms=2 * DAY_MS)
+    assert list(ScanHistoryStore(path).rows(["run_id", "cluster"])) == [(1, "c1"), (2, "c9")]
+
+def test_compact_with_retention(tmp_path):
+    path = str(tmp_path / "history")
+    store = ScanHistoryStore(path, retention_days=7)
+    store.append_scan({"https://a": [make_run(1, 10, "old")]}, scan_time_ms=DAY_MS)
+    store.append_scan({"https://a": [make_run(2, 10, "new")]}, scan_time_ms=9 * DAY_MS)
+    assert store.compact(now_ms=10 * DAY_MS) == 1
+    assert list(store.rows(["run_id", "cluster"])) == [(2, "new")]
+    assert len([name for name in os.listdir(path) if name.startswith("gen-")]) == 1
+    assert list(ScanHistoryStore(path).rows(["workspace"])) == [("https://a",)]
+
+def test_append_compacts_past_retention(tmp_path):
+    path = str(tmp_path / "history")
+    store = ScanHistoryStore(path, retention_days=7, compaction_slack_days=1)
+    store.append_scan({"https://a": [make_run(1, 10)]}, scan_time_ms=DAY_MS)
+    store.append_scan({"https://a": [make_run(2, 10)]}, scan_time_ms=9 * DAY_MS) # Within the slack
+    assert len(store) == 2
+    store.append_scan({"https://a": [make_run(3, 10)]}, scan_time_ms=9 * DAY_MS + 1)
+    assert list(store.column("run_id")) == [2, 3]
+    assert len([name for name in os.listdir(path) if name.startswith("gen-")]) == 1
+
+def test_columns_are_mapped_once(tmp_path):
+    store = ScanHistoryStore(str(tmp_path / "history"))
+    store.append_scan({"https://a": [make_run(1, 10)]}, scan_time_ms=DAY_MS)
+    view = store.column("run_id")
+    assert store.column("run_id").obj is view.obj
+    store.append_scan({"https://a": [make_run(2, 10)]}, scan_time_ms=2 * DAY_MS)
+    assert list(store.column("run_id")) == [1, 2] # Remapped, as the file outgrew the mapping
+    assert list(view) == [1] # Earlier views stay valid
+    del view
+    store.close()
+    assert list(store.column("run_id")) == [1, 2]
+    store.close()
@@ -0,0 +1,111 @@
+import os
+import sys
+import threading
+from collections import Counter
+from utils.time_helpers import epoch_ms_now
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling profiler for scans, e.g. to find CPU hot spots of get_job_runs() and Slack rendering
+    in the real production configuration, without hand-editing the notebook.
+
+    While running, a background thread periodically records the call stack of every thread that was started after
+    the profiler (e.g. enrichment workers and pipeline stages), plus the thread that started it. Threads that were
+    already running (e.g. a notebook kernel's own threads) are ignored. Samples are wall-clock, so time spent
+    waiting on REST API responses shows up as well.
+
+    Results are written as collapsed stacks (one "frame;frame;frame count" line per stack, the input format of
+    flame graph tools such as flamegraph.pl or speedscope) and a short text summary of the top functions.
+    Can be used as a context manager, or via start() and stop() (e.g. across notebook cells).
+    """
+
+    def __init__(self, interval_s: float = 0.005) -> None:
+        """
+        Args:
+            interval_s: Time between samples. Lower values give more detail at a higher overhead.
+        """
+        self.interval_s = interval_s
+        self.stacks = Counter() # Collapsed stack -> number of samples
+        self.num_samples = 0
+        self.__stop = threading.Event()
+        self.__thread = None
+        self.__ignored_thread_ids = set()
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        if self.__thread is not None:
+            raise RuntimeError("SamplingProfiler: Already started.")
+        self.__ignored_thread_ids = set(sys._current_frames()) - {threading.get_ident()}
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__sample, name="SamplingProfiler", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        if self.__thread is None:
+            return
+        self.__stop.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def top_functions(self, n: int = 20) -> list[tuple[str, int, int]]:
+        """
+        Return the n functions with the most samples as (function, self samples, total samples), sorted by
+        self samples. Self samples are those where the function was running itself; total samples include
+        the functions it called.
+        """
+        self_samples = Counter()
+        total_samples = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_samples[frames[-1]] += count
+            for frame in set(frames):
+                total_samples[frame] += count
+        top = sorted(total_samples, key=lambda frame: (-self_samples[frame], -total_samples[frame], frame))[:n]
+        return [(frame, self_samples[frame], total_samples[frame]) for frame in top]
+
+    def summary(self, n: int = 20) -> str:
+        """Return a text table of the top n functions (see top_functions())."""
+        lines = [f"{sum(self.stacks.values())} thread samples ({self.num_samples} every {self.interval_s * 1000:.1f} ms)",
+                 f"{'self %':>7} {'total %':>7}  function"]
+        for frame, self_count, total_count in self.top_functions(n):
+            lines.append(f"{self.__percent(self_count):>7} {self.__percent(total_count):>7}  {frame}")
+        return "\n".join(lines)
+
+    def write(self, output_dir: str, name: str = "scan", top_n: int = 20) -> tuple[str, str]:
+        """
+        Write the collapsed stacks and the top-N summary to <name>-<epoch ms>.collapsed and <name>-<epoch ms>.txt
+        in the given directory, and return both paths.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        prefix = os.path.join(output_dir, f"{name}-{epoch_ms_now()}")
+        with open(prefix + ".collapsed", "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(prefix + ".txt", "w") as f:
+            f.write(self.summary(top_n) + "\n")
+        return prefix + ".collapsed", prefix + ".txt"
+
+    def __sample(self) -> None:
+        own_thread_id = threading.get_ident()
+        while not self.__stop.wait(self.interval_s):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread_id or thread_id in self.__ignored_thread_ids:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(frames))] += 1
+            self.num_samples += 1
+
+    def __percent(self, count: int) -> str:
+        """Return a count as a percentage of all thread samples."""
+        total = sum(self.stacks.values())
+        return f"{100 * count / total:.1f}" if total else "0.0"
@@ -0,0 +1,41 @@
+import threading
+import time
+from scan_profiler import SamplingProfiler
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+def wait_for_stop(stop):
+    stop.wait()
+
+def test_samples_new_threads_only(tmp_path):
+    stop = threading.Event()
+    existing = threading.Thread(target=wait_for_stop, args=(stop,))
+    existing.start()
+    try:
+        with SamplingProfiler(interval_s=0.001) as profiler:
+            worker = threading.Thread(target=busy_loop, args=(0.1,))
+            worker.start()
+            worker.join()
+    finally:
+        stop.set()
+        existing.join()
+
+    assert profiler.num_samples > 10
+    assert any("busy_loop" in stack for stack in profiler.stacks)
+    assert not any("wait_for_stop" in stack for stack in profiler.stacks) # Started before the profiler
+    # The busy worker and the main thread waiting for it are sampled about equally often
+    top_functions = {function.split(" ")[0]: (self_samples, total_samples)
+                     for function, self_samples, total_samples in profiler.top_functions(3)}
+    assert 0 < top_functions["busy_loop"][0] <= top_functions["busy_loop"][1]
+
+    collapsed_path, summary_path = profiler.write(str(tmp_path / "profiles"))
+    with open(collapsed_path) as f:
+        lines = f.read().splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    with open(summary_path) as f:
+        assert "busy_loop" in f.read()
@@ -18,6 +18,10 @@ def ms_since(epoch_ms: int) -> int:
     seconds_since_epoch_start = (datetime.datetime.utcnow() - datetime.datetime(1970, 1, 1)).total_seconds()
     return int(seconds_since_epoch_start * 1000) - epoch_ms
 
+def epoch_ms_now() -> int:
+    """Returns the current time in epoch milliseconds (UTC), consistent with ms_since()."""
+    return ms_since(0)
+
 def hours_to_ms(hours: float) -> int:
     return int(hours * 3600000)
 
@@ -7,6 +7,10 @@ def test_epoch_ms_to_datetime():
     epoch_ms = 1742432791940
     assert epoch_ms_to_datetime(epoch_ms) == "2025-03-20 01:06:31.940000"
 
+def test_epoch_ms_now():
+    now = epoch_ms_now()
+    assert abs(ms_since(now)) < 1000
+
 def test_hours_to_ms():
     hrs = 1.3
     assert abs(hours_to_ms(hrs) - 3600000 * 1.3) < FLOAT_EPSILON
@@ -1,30 +1,88 @@
 from dataclasses import dataclass
-from pyspark.dbutils import DBUtils
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Only available on Databricks clusters; not needed for the (pure) parsing helpers below.
+    from pyspark.dbutils import DBUtils
 
 @dataclass
 class JobParams:
     """Class for retrieval of job parameters in workflows associated with the StuckJobAlerter notebook."""
     run_duration_threshold_hrs: float
+    task_duration_threshold_hrs: float
+    max_runs_per_workspace: int
+    list_windows: int
+    request_budget_per_workspace: int
+    hedge_percentile: float
+    max_concurrency_per_workspace: int
     workspaces_to_check: list[str]
     secret_scope_name: str
     token_secret_names: list[str]
     slack_webhook_secret_name: str
+    alert_routes: list[tuple[str, str, str]]
+    alert_ledger_path: str
+    scan_history_path: str
+    node_type_cache_path: str
+    metadata_cache_path: str
+    scan_checkpoint_path: str
+    profile_output_dir: str
+    cost_per_core_hour: float
+    cluster_activity_window_hours: float
+    cancel_after_hours: float
+    remediation_dry_run: bool
+    remediation_audit_log_path: str
 
-    def __init__(self, dbutils: DBUtils) -> None:
+    def __init__(self, dbutils: "DBUtils") -> None:
         # Explicitly define parameters so that they can be retrieved from the workflow.
         # Note: the strings here for the parameter names must match the ones defined in the workflow.
         dbutils.widgets.text("run_duration_threshold_hrs", defaultValue="0")
+        dbutils.widgets.text("task_duration_threshold_hrs", defaultValue="0")
+        dbutils.widgets.text("max_runs_per_workspace", defaultValue="0")
+        dbutils.widgets.text("list_windows", defaultValue="1")
+        dbutils.widgets.text("request_budget_per_workspace", defaultValue="0")
+        dbutils.widgets.text("hedge_percentile", defaultValue="0")
+        dbutils.widgets.text("max_concurrency_per_workspace", defaultValue="0")
         dbutils.widgets.text("workspaces_to_check", defaultValue="[]")
         dbutils.widgets.text("secret_scope_name", defaultValue="")
         dbutils.widgets.text("token_secret_names", defaultValue="[]")
         dbutils.widgets.text("slack_webhook_secret_name", defaultValue="")
+        dbutils.widgets.text("alert_routes", defaultValue="[]")
+        dbutils.widgets.text("alert_ledger_path", defaultValue="")
+        dbutils.widgets.text("scan_history_path", defaultValue="")
+        dbutils.widgets.text("node_type_cache_path", defaultValue="")
+        dbutils.widgets.text("metadata_cache_path", defaultValue="")
+        dbutils.widgets.text("scan_checkpoint_path", defaultValue="")
+        dbutils.widgets.text("profile_output_dir", defaultValue="")
+        dbutils.widgets.text("cost_per_core_hour", defaultValue="0")
+        dbutils.widgets.text("cluster_activity_window_hours", defaultValue="0")
+        dbutils.widgets.text("cancel_after_hours", defaultValue="0")
+        dbutils.widgets.text("remediation_dry_run", defaultValue="true")
+        dbutils.widgets.text("remediation_audit_log_path", defaultValue="")
 
         # Retrieve actual parameter values from the workflow
         self.run_duration_threshold_hrs = float(dbutils.widgets.get("run_duration_threshold_hrs"))
+        self.task_duration_threshold_hrs = float(dbutils.widgets.get("task_duration_threshold_hrs"))
+        self.max_runs_per_workspace = int(dbutils.widgets.get("max_runs_per_workspace"))
+        self.list_windows = int(dbutils.widgets.get("list_windows"))
+        self.request_budget_per_workspace = int(dbutils.widgets.get("request_budget_per_workspace"))
+        self.hedge_percentile = float(dbutils.widgets.get("hedge_percentile"))
+        self.max_concurrency_per_workspace = int(dbutils.widgets.get("max_concurrency_per_workspace"))
         self.workspaces_to_check = self.parse_workspaces(dbutils.widgets.get("workspaces_to_check"))
         self.secret_scope_name = dbutils.widgets.get("secret_scope_name")
         self.token_secret_names = self.parse_secret_names(dbutils.widgets.get("token_secret_names"))
         self.slack_webhook_secret_name = dbutils.widgets.get("slack_webhook_secret_name")
+        self.alert_routes = self.parse_alert_routes(dbutils.widgets.get("alert_routes"))
+        self.alert_ledger_path = dbutils.widgets.get("alert_ledger_path")
+        self.scan_history_path = dbutils.widgets.get("scan_history_path")
+        self.node_type_cache_path = dbutils.widgets.get("node_type_cache_path")
+        self.metadata_cache_path = dbutils.widgets.get("metadata_cache_path")
+        self.scan_checkpoint_path = dbutils.widgets.get("scan_checkpoint_path")
+        self.profile_output_dir = dbutils.widgets.get("profile_output_dir")
+        self.cost_per_core_hour = float(dbutils.widgets.get("cost_per_core_hour"))
+        self.cluster_activity_window_hours = float(dbutils.widgets.get("cluster_activity_window_hours"))
+        self.cancel_after_hours = float(dbutils.widgets.get("cancel_after_hours"))
+        self.remediation_dry_run = self.parse_bool(dbutils.widgets.get("remediation_dry_run"))
+        self.remediation_audit_log_path = dbutils.widgets.get("remediation_audit_log_path")
     
     @staticmethod
     def parse_workspaces(workspaces_str: str) -> list[str]:
@@ -36,6 +94,30 @@ class JobParams:
         """Helper to parse a list of secret names from a string in the format '[secret_name1, secret_name2, ...]'."""
         return JobParams.parse_str_list(secrets_str)
     
+    @staticmethod
+    def parse_alert_routes(routes_str: str) -> list[tuple[str, str, str]]:
+        """
+        Helper to parse alert routing rules from a string in the format '[kind:value=secret_name, ...]', e.g.
+        '[tag:team:data=data_webhook, creator:alice@example.com=alice_webhook]'. Returns (kind, value, secret_name)
+        tuples, where kind is "tag", "creator" or "workspace" (see slackbot/alert_router.py).
+        """
+        routes = []
+        for route in JobParams.parse_str_list(routes_str):
+            selector, _, secret_name = route.rpartition("=")
+            kind, _, value = selector.partition(":")
+            if not kind or not value or not secret_name:
+                raise ValueError(f"JobParams: Invalid alert route '{route}'. Expected 'kind:value=secret_name'.")
+            routes.append((kind, value, secret_name))
+        return routes
+
+    @staticmethod
+    def parse_bool(bool_str: str) -> bool:
+        """Helper to parse a boolean from a string such as 'true' or 'false' (case insensitive)."""
+        value = bool_str.strip().lower()
+        if value not in ("true", "false"):
+            raise ValueError(f"JobParams: Invalid boolean '{bool_str}'. Expected 'true' or 'false'.")
+        return value == "true"
+
     @staticmethod
     def parse_str_list(str_list: str) -> list[str]:
         """Helper to parse a list of strings from a string in the format '[str1, str2, ...]'."""
@@ -25,4 +25,19 @@ def test_parse_secret_names():
     assert JobParams.parse_secret_names("") \
         == []
     assert JobParams.parse_secret_names("[]") \
-        == []
\ No newline at end of file
+        == []
+
+def test_parse_alert_routes():
+    assert JobParams.parse_alert_routes("[]") == []
+    assert JobParams.parse_alert_routes("[tag:team:data=data_webhook, creator:alice@example.com=alice_webhook]") \
+        == [("tag", "team:data", "data_webhook"), ("creator", "alice@example.com", "alice_webhook")]
+    assert JobParams.parse_alert_routes("[workspace:https://myenv.cloud.databricks.com=ws_webhook]") \
+        == [("workspace", "https://myenv.cloud.databricks.com", "ws_webhook")]
+    with pytest.raises(ValueError):
+        JobParams.parse_alert_routes("[tag:team]")
+
+def test_parse_bool():
+    assert JobParams.parse_bool("true") and JobParams.parse_bool(" True ")
+    assert not JobParams.parse_bool("false")
+    with pytest.raises(ValueError):
+        JobParams.parse_bool("yes")